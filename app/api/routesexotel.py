@@ -1,29 +1,41 @@
 import time
 import redis
 import json
-import platform
-import contextlib
-import threading
 import logging
 import uuid
-import threading
 from typing import Optional, Dict
 from flask import Blueprint, request, Response, jsonify, make_response
 from functools import wraps
 from datetime import datetime
 import signal
 import sys
-from contextlib import contextmanager
 from app.utils.exceptions import SessionError, TranscriptionError, SlotFillingError
 from app.core.services import SlotFillingService, CloudRunOptimizedService
 from app.utils.sms_utils import send_sms
-from app.core.models import UserSession
+from app.core.models import UserSession, SlotSchema
+from app.core.response_templates import ResponseTemplates
+from app.core import metrics
+from app.core import deadline
+from app.core.tracing import tracer
 from app.config import Config
 
 logger = logging.getLogger(__name__)
 
 voice_agent = Blueprint("voice_agent", __name__)
 
+
+@voice_agent.before_request
+def bind_call_context():
+    metrics.bind("exotel", "unknown")
+    tracer.begin(request.values.get("session_id"), request.values.get("CallSid"))
+    metrics.IN_FLIGHT.labels("exotel").inc()
+
+
+@voice_agent.teardown_request
+def end_call_context(exc):
+    metrics.IN_FLIGHT.labels("exotel").dec()
+
+
 config = Config()
 GCS_BUCKET = "realestateinbound"
 DLQ_KEY = "recording_failures_dlq"
@@ -90,6 +102,8 @@ redis_manager = RedisManager(config)
 AUDIO_BASE_URL = f"https://storage.googleapis.com/{GCS_BUCKET}"
 WELCOME_AUDIO = f"{AUDIO_BASE_URL}/WelcomeRealestateInbound.wav"
 ERROR_AUDIO = f"{AUDIO_BASE_URL}/error_audio.wav"
+ERROR_TEXT = "Sorry, we encountered an error. Please try again later."
+RATE_LIMITED_TEXT = "You have made too many calls recently. Please try again later."
 
 # Decorator for error handling and monitoring
 def handle_errors(error_response_func=None):
@@ -98,7 +112,8 @@ def handle_errors(error_response_func=None):
         def decorated_function(*args, **kwargs):
             start_time = time.time()
             try:
-                result = f(*args, **kwargs)
+                with tracer.span(f.__name__):
+                    result = f(*args, **kwargs)
                 duration = time.time() - start_time
                 logger.info(f"{f.__name__} completed in {duration:.3f}s")
                 return result
@@ -111,31 +126,6 @@ def handle_errors(error_response_func=None):
         return decorated_function
     return decorator
 
-# Request timeout context manager
-@contextlib.contextmanager
-def request_timeout(seconds):
-    if platform.system() == "Windows":
-        # On Windows, signal.SIGALRM is not available, so we simulate
-        timer = threading.Timer(seconds, lambda: (_ for _ in ()).throw(TimeoutError(f"Request timeout after {seconds} seconds")))
-        timer.start()
-        try:
-            yield
-        finally:
-            timer.cancel()
-    else:
-        # On Linux/Unix, use SIGALRM
-        import signal
-        def timeout_handler(signum, frame):
-            raise TimeoutError(f"Request timeout after {seconds} seconds")
-        old_handler = signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(seconds)
-        try:
-            yield
-        finally:
-            signal.alarm(0)
-            signal.signal(signal.SIGALRM, old_handler)
-
-
 class SessionManager:
     """Production-ready session management with comprehensive error handling"""
     
@@ -275,88 +265,76 @@ class SessionManager:
 
 
 class ExomlGenerator:
-    """Production Exoml generation with validation for Exotel Dynamic Webhook Control"""
+    """Production Exoml generation with validation for Exotel Dynamic Webhook Control.
+
+    Like TwiML, responses are precompiled per prompt into JSON byte templates
+    (exoml_templates below) and served as-is instead of through jsonify.
+    """
     
     @staticmethod
     def _validate_url(url: str) -> bool:
         """Validate audio URL"""
-        return url and (url.startswith('https://') or url.startswith('http://')) and len(url) < 500
+        return bool(url) and url.startswith(('https://', 'http://')) and len(url) < 500
 
     @staticmethod
-    def create_play_record_response(audio_url: str, record_action_url: str, 
-                                  recording_callback_url: str, max_length: int) -> dict:
-        """Generate validated Exoml for play + record"""
-        if not all([
-            ExomlGenerator._validate_url(audio_url),
-            ExomlGenerator._validate_url(record_action_url),
-            ExomlGenerator._validate_url(recording_callback_url),
-            1 <= max_length <= 3600  # Exotel supports up to 3600 seconds
-        ]):
-            raise ValueError("Invalid Exoml parameters")
-        
-        return {
-            "Exoml": [
-                {
-                    "Play": {
-                        "url": audio_url
-                    }
-                },
-                {
-                    "Record": {
-                        "max_length": max_length,
-                        "finish_on_key": "#",
-                        "play_beep": True,
-                        "timeout": 5,
-                        "action": record_action_url,
-                        "status_callback": recording_callback_url
-                    }
+    def _source(verbs: list) -> str:
+        return json.dumps({"Exoml": verbs}, separators=(",", ":"))
+
+    @staticmethod
+    def record_source(audio_url: str) -> str:
+        """Play + record"""
+        if not ExomlGenerator._validate_url(audio_url) or not 1 <= config.MAX_RECORD_LENGTH <= 3600:
+            raise ValueError("Invalid Exoml parameters")  # Exotel supports up to 3600 seconds
+        return ExomlGenerator._source([
+            {"Play": {"url": audio_url}},
+            {
+                "Record": {
+                    "max_length": config.MAX_RECORD_LENGTH,
+                    "finish_on_key": "#",
+                    "play_beep": True,
+                    "timeout": 5,
+                    "action": "${base_url}/process-recording?session_id=${session_id}",
+                    "status_callback": "${base_url}/recording-status?session_id=${session_id}"
                 }
-            ]
-        }
+            }
+        ])
 
     @staticmethod
-    def create_play_hangup_response(audio_url: str) -> dict:
-        """Generate validated Exoml for play + hangup"""
+    def hangup_source(audio_url: str) -> str:
+        """Play + hangup"""
         if not ExomlGenerator._validate_url(audio_url):
             raise ValueError("Invalid audio URL")
-        
-        return {
-            "Exoml": [
-                {
-                    "Play": {
-                        "url": audio_url
-                    }
-                },
-                {
-                    "Hangup": {}
-                }
-            ]
-        }
+        return ExomlGenerator._source([{"Play": {"url": audio_url}}, {"Hangup": {}}])
+
+    @staticmethod
+    def say_source(text: str) -> str:
+        """Say + hangup"""
+        if not text or len(text) > 1000 or "${" in text:
+            raise ValueError("Invalid Exoml text")
+        return ExomlGenerator._source([
+            {"Say": {"text": text, "voice": "woman", "language": "en"}},
+            {"Hangup": {}}
+        ])
+
+    @staticmethod
+    def create_play_record_response(audio_url: str, base_url: str, session_id: str) -> bytes:
+        """Generate validated Exoml for play + record"""
+        return exoml_templates.render("record", audio_url, base_url, session_id)
+
+    @staticmethod
+    def create_play_hangup_response(audio_url: str) -> bytes:
+        """Generate validated Exoml for play + hangup"""
+        return exoml_templates.render("hangup", audio_url)
 
     @staticmethod
-    def create_say_hangup_response(text: str, voice: str = "woman", language: str = "en") -> dict:
+    def create_say_hangup_response(text: str) -> bytes:
         """Generate Exoml for say + hangup"""
-        return {
-            "Exoml": [
-                {
-                    "Say": {
-                        "text": text,
-                        "voice": voice,
-                        "language": language
-                    }
-                },
-                {
-                    "Hangup": {}
-                }
-            ]
-        }
+        return exoml_templates.render("say", text)
 
     @staticmethod
-    def create_error_response() -> dict:
+    def create_error_response() -> bytes:
         """Generate error Exoml response"""
-        return ExomlGenerator.create_say_hangup_response(
-            "Sorry, we encountered an error. Please try again later."
-        )
+        return ExomlGenerator.create_say_hangup_response(ERROR_TEXT)
 
 class AudioUrlBuilder:
     """Production audio URL management with caching and validation"""
@@ -393,6 +371,26 @@ class AudioUrlBuilder:
         
         return AudioUrlBuilder._url_cache[cache_key]
 
+def _exoml_prompts():
+    prompts = [("record", WELCOME_AUDIO), ("say", ERROR_TEXT), ("say", RATE_LIMITED_TEXT)]
+    for lang in config.PROMPT_LANGUAGES:
+        prompts += [("record", AudioUrlBuilder.get_slot_audio_url(slot.id, lang)) for slot in SlotSchema().slots]
+        prompts.append(("hangup", AudioUrlBuilder.get_confirmation_audio_url(lang)))
+    return prompts
+
+
+exoml_templates = ResponseTemplates(
+    "exoml",
+    {"record": ExomlGenerator.record_source, "hangup": ExomlGenerator.hangup_source,
+     "say": ExomlGenerator.say_source},
+    lambda value: json.dumps(value)[1:-1],
+    _exoml_prompts(),
+)
+
+
+def exoml_response(body: bytes, status: int = 200) -> Response:
+    return Response(body, status=status, mimetype="application/json")
+
 def post_call_cleanup_async(slots_filled: Dict, virtual_number: str, user_mobile: str, lang_code: str):
     """Production async post-call cleanup with comprehensive error handling"""
     try:
@@ -405,8 +403,8 @@ def post_call_cleanup_async(slots_filled: Dict, virtual_number: str, user_mobile
             logger.info("User did not respond to rent/buy prompt. SMS will NOT be sent.")
             return
 
-        # Process with timeout
-        with request_timeout(30):
+        # Process within a budget
+        with deadline.budget(30):
             summary_text = SlotFillingService.lead_info_text(slots_filled)
             custom_message = (
                 f"Below is the Tenant requirements:\n"
@@ -457,6 +455,24 @@ def health_check():
     
     return jsonify(health_status), 200 if health_status["status"] == "ok" else 503
 
+@voice_agent.route("/metrics")
+def metrics_endpoint():
+    """Prometheus exposition, aggregated across gunicorn workers"""
+    body, content_type = metrics.exposition()
+    return Response(body, content_type=content_type)
+
+@voice_agent.route("/calls/<session_id>/timeline")
+def call_timeline(session_id):
+    """Every traced request, dependency call and job of one call, turn by turn"""
+    try:
+        timeline = tracer.timeline(session_id)
+    except Exception as e:
+        logger.error(f"Timeline lookup failed for {session_id}: {e}")
+        return jsonify({"error": "internal error"}), 500
+    if timeline is None:
+        return jsonify({"error": "no trace for this call"}), 404
+    return jsonify(timeline), 200
+
 @voice_agent.route("/")
 def home():
     """Service information endpoint"""
@@ -468,10 +484,10 @@ def home():
     })
 
 @voice_agent.route("/answer", methods=["POST", "GET"])
-@handle_errors(lambda: jsonify(ExomlGenerator.create_error_response()))
+@handle_errors(lambda: exoml_response(ExomlGenerator.create_error_response()))
 def answer():
     """Handle incoming call from Exotel"""
-    with request_timeout(config.REQUEST_TIMEOUT):
+    with deadline.budget(config.REQUEST_TIMEOUT):
         # Validate Exotel request parameters
         user_mobile = request.values.get("From", "").strip()
         virtual_number = request.values.get("To", "").strip()
@@ -488,18 +504,19 @@ def answer():
         refill_interval = 300     # 5 minute window
 
         try:
-            allowed = SessionManager.token_bucket(redis_manager.redis, user_mobile, limit, refill_interval)
+            with metrics.stage("rate_limit"):
+                allowed = SessionManager.token_bucket(redis_manager.redis, user_mobile, limit, refill_interval)
+            metrics.rate_limit_decision("allowed" if allowed else "caller")
             if not allowed:
                 logger.warning(f"Rate limit exceeded for {user_mobile}")
-                return jsonify(ExomlGenerator.create_say_hangup_response(
-                    "You have made too many calls recently. Please try again later."
-                ))
+                return exoml_response(ExomlGenerator.create_say_hangup_response(RATE_LIMITED_TEXT))
         except Exception as e:
             logger.error(f"Rate limiting error: {e}")
-            return jsonify(ExomlGenerator.create_error_response()), 429
+            return exoml_response(ExomlGenerator.create_error_response(), 429)
 
         # Create session
         session_id = str(uuid.uuid4())
+        tracer.start_call(session_id, call_sid)
         session_data = UserSession(
             session_id=session_id,
             user_mobile=user_mobile,
@@ -519,23 +536,16 @@ def answer():
         if not base_url.startswith('https://'):
             logger.warning("Non-HTTPS base URL detected")
         
-        record_action_url = f"{base_url}/process-recording?session_id={session_id}"
-        recording_status_callback_url = f"{base_url}/recording-status?session_id={session_id}"
-        
-        logger.info(f"URLs - Audio: {WELCOME_AUDIO}, Action: {record_action_url}, Callback: {recording_status_callback_url}")
-
         # Generate Exoml response
-        exoml_response = ExomlGenerator.create_play_record_response(
-            WELCOME_AUDIO, record_action_url, recording_status_callback_url, config.MAX_RECORD_LENGTH
-        )
+        exoml_body = ExomlGenerator.create_play_record_response(WELCOME_AUDIO, base_url, session_id)
 
         logger.info(f"New session: {session_id} ({user_mobile} -> {virtual_number})")
-        return jsonify(exoml_response)
+        return exoml_response(exoml_body)
     
 @voice_agent.route("/process-recording", methods=["POST", "GET"])
-@handle_errors(lambda: jsonify(ExomlGenerator.create_error_response()))
+@handle_errors(lambda: exoml_response(ExomlGenerator.create_error_response()))
 def process_recording():
-    with request_timeout(config.REQUEST_TIMEOUT):
+    with deadline.budget(config.REQUEST_TIMEOUT):
         # Exotel parameters
         user_mobile = request.values.get("From", "").strip()
         virtual_number = request.values.get("To", "").strip()
@@ -578,9 +588,12 @@ def process_recording():
         raw_session = redis_manager.redis.get(session_key)
         if raw_session:
             session_data = UserSession.model_validate(json.loads(raw_session))
+            metrics.bind(language=session_data.language)
+            tracer.start_call(session_data.session_id, call_sid)
         else:
             logger.info(f"Creating new session in else block")
             session_id = str(uuid.uuid4())
+            tracer.start_call(session_id, call_sid)
             session_data = UserSession(
                 session_id=session_id,
                 user_mobile=user_mobile,
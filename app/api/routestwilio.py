@@ -1,90 +1,58 @@
 import time
-import redis
 import json
-import platform
-import contextlib
-import threading
+import base64
 import logging
 import uuid
-import threading
 from typing import Optional, Dict
 from flask import Blueprint, request, Response, jsonify, make_response
+from flask_sock import Sock
+from simple_websocket import ConnectionClosed
 from functools import wraps
-from datetime import datetime
 import signal
 import sys
-from contextlib import contextmanager
-from app.utils.exceptions import SessionError, TranscriptionError, SlotFillingError
+from xml.sax.saxutils import escape as xml_escape
+from app.utils.exceptions import SessionError, TranscriptionError, SlotFillingError, DeadlineExceeded
 from app.core.services import SlotFillingService, CloudRunOptimizedService
 from app.utils.sms_utils import send_sms
-from app.core.models import UserSession
+from app.core.models import UserSession, SlotSchema
+from app.core.redis_manager import redis_manager
+from app.core.sessions import SessionManager
+from app.core.rate_limit import allow_call
+from app.core.jobs import post_call_jobs
+from app.core.sms import sms_dispatcher
+from app.core.dlq import recording_dlq, add_failed_recording
+from app.core.recordings import RecordingReadiness, SpeculativeTranscription
+from app.core.stt import stt_router
+from app.core.streaming import DeepgramStreamingTranscriber, StreamingTurn
+from app.core.response_templates import ResponseTemplates
+from app.core import metrics
+from app.core import deadline
+from app.core.tracing import tracer
 from app.config import Config
 
 logger = logging.getLogger(__name__)
+# High-volume per-turn detail, sampled by LOG_SAMPLE_RATES
+verbose_logger = logging.getLogger(f"{__name__}.verbose")
 
 voice_agent = Blueprint("voice_agent", __name__)
+sock = Sock()
+
+
+@voice_agent.before_request
+def bind_call_context():
+    # Language is bound once the session is loaded; /answer starts the trace itself
+    metrics.bind("twilio", "unknown")
+    tracer.begin(request.values.get("session_id"), request.values.get("CallSid"))
+    metrics.IN_FLIGHT.labels("twilio").inc()
+
+
+@voice_agent.teardown_request
+def end_call_context(exc):
+    metrics.IN_FLIGHT.labels("twilio").dec()
+
 
 config = Config()
 GCS_BUCKET = "realestateinbound"
-DLQ_KEY = "recording_failures_dlq"
-
-# Redis connection with retry logic and health monitoring
-class RedisManager:
-    def __init__(self, config: Config):
-        self.config = config
-        self._pool = None
-        self._redis = None
-        self._initialize_connection()
-    
-    def _initialize_connection(self):
-        """Initialize Redis connection with retry logic"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                self._pool = redis.ConnectionPool.from_url(
-                    self.config.REDIS_URL,
-                    max_connections=self.config.REDIS_MAX_CONNECTIONS,
-                    retry_on_timeout=True,
-                    socket_keepalive=True,
-                    socket_keepalive_options={},
-                    health_check_interval=30
-                )
-                self._redis = redis.Redis(
-                    connection_pool=self._pool,
-                    socket_connect_timeout=5,
-                    socket_timeout=5,
-                    decode_responses=False
-                )
-                # Test connection
-                self._redis.ping()
-                logger.info("Redis connection established successfully")
-                break
-            except Exception as e:
-                logger.error(f"Redis connection attempt {attempt + 1} failed: {e}")
-                if attempt == max_retries - 1:
-                    raise ConnectionError(f"Failed to connect to Redis after {max_retries} attempts")
-                time.sleep(2 ** attempt)  # Exponential backoff
-    
-    @property
-    def redis(self):
-        """Get Redis client with health check"""
-        try:
-            self._redis.ping()
-            return self._redis
-        except Exception as e:
-            logger.warning(f"Redis connection lost, reinitializing: {e}")
-            self._initialize_connection()
-            return self._redis
-    
-    def is_healthy(self) -> bool:
-        """Check Redis health"""
-        try:
-            self._redis.ping()
-            return True
-        except Exception:
-            return False
-
-redis_manager = RedisManager(config)
 
 # Audio URL templates
 AUDIO_BASE_URL = f"https://storage.googleapis.com/{GCS_BUCKET}"
@@ -98,9 +66,10 @@ def handle_errors(error_response_func=None):
         def decorated_function(*args, **kwargs):
             start_time = time.time()
             try:
-                result = f(*args, **kwargs)
+                with tracer.span(f.__name__):
+                    result = f(*args, **kwargs)
                 duration = time.time() - start_time
-                logger.info(f"{f.__name__} completed in {duration:.3f}s")
+                verbose_logger.info(f"{f.__name__} completed in {duration:.3f}s")
                 return result
             except Exception as e:
                 duration = time.time() - start_time
@@ -111,210 +80,72 @@ def handle_errors(error_response_func=None):
         return decorated_function
     return decorator
 
-# Request timeout context manager
-@contextlib.contextmanager
-def request_timeout(seconds):
-    if platform.system() == "Windows":
-        # On Windows, signal.SIGALRM is not available, so we simulate
-        timer = threading.Timer(seconds, lambda: (_ for _ in ()).throw(TimeoutError(f"Request timeout after {seconds} seconds")))
-        timer.start()
-        try:
-            yield
-        finally:
-            timer.cancel()
-    else:
-        # On Linux/Unix, use SIGALRM
-        import signal
-        def timeout_handler(signum, frame):
-            raise TimeoutError(f"Request timeout after {seconds} seconds")
-        old_handler = signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(seconds)
-        try:
-            yield
-        finally:
-            signal.alarm(0)
-            signal.signal(signal.SIGALRM, old_handler)
-
+class TwiMLGenerator:
+    """Production TwiML generation with validation.
 
-class SessionManager:
-    """Production-ready session management with comprehensive error handling"""
-    
+    Responses are compiled per prompt into byte templates (see
+    twiml_templates below); the audio URL is validated and escaped once, at
+    compile time, and only the base URL and session id are filled per request.
+    """
     @staticmethod
-    def get_session(session_id: str) -> Optional[UserSession]:
-        """Get session data with validation and error handling"""
-        if not session_id or len(session_id) > 100:  # Validate session ID
-            raise SessionError("Invalid session ID")
-        
-        try:
-            val = redis_manager.redis.get(f"session:{session_id}")
-            if not val:
-                return None
-            
-            session_data = UserSession.model_validate(json.loads(val))
-            
-            # Validate session hasn't expired
-            if time.time() - session_data.last_interaction_time > config.SESSION_TIMEOUT:
-                SessionManager.delete_session(session_id)
-                return None
-            
-            # Check for too many interactions (potential abuse)
-            if session_data.interaction_count > config.MAX_INTERACTIONS:
-                logger.warning(f"Session {session_id} exceeded max interactions")
-                SessionManager.delete_session(session_id)
-                return None
-                
-            return session_data
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON in session {session_id}: {e}")
-            SessionManager.delete_session(session_id)
-            return None
-        except Exception as e:
-            logger.error(f"Error retrieving session {session_id}: {e}")
-            return None
+    def _validate_url(url: str) -> bool:
+        """Validate audio URL"""
+        return bool(url) and url.startswith(('https://', 'http://')) and len(url) < 500
 
     @staticmethod
-    def save_session(session_id: str, data: UserSession) -> bool:
-        """Save session with validation and error handling"""
-        if not session_id or not data:
-            return False
-        
-        try:
-            # Validate data before saving
-            if not hasattr(data, 'session_id') or data.session_id != session_id:
-                raise SessionError("Session ID mismatch")
-            
-            redis_manager.redis.set(
-                f"session:{session_id}",
-                json.dumps(data.model_dump()),
-                ex=config.SESSION_TIMEOUT
-            )
-            return True
-        except Exception as e:
-            logger.error(f"Error saving session {session_id}: {e}")
-            return False
-        
-    @staticmethod
-    def token_bucket(redis_client, user_key: str, limit: int, refill_interval: int) -> bool:
-        """
-        Advanced Redis token bucket implementation
-        - limit: allowed requests in interval
-        - refill_interval: window size (seconds)
-        """
-        now = int(time.time())
-        redis_key = f"ratelimit:{user_key}"
-
-        pipe = redis_client.pipeline()
-
-        # Add timestamp to sorted set
-        pipe.zadd(redis_key, {str(now): now})
-
-        # Remove expired timestamps outside interval
-        pipe.zremrangebyscore(redis_key, 0, now - refill_interval)
-
-        # Count remaining tokens in window
-        pipe.zcard(redis_key)
-
-        # Set expiry for housekeeping
-        pipe.expire(redis_key, refill_interval * 2)
-
-        # Execute atomically
-        _, _, count, _ = pipe.execute()
-
-        # Allow if within limit
-        if count > limit:
-            return False
-        return True
+    def _audio(audio_url: str) -> str:
+        if not TwiMLGenerator._validate_url(audio_url):
+            raise ValueError("Invalid audio URL")
+        return xml_escape(audio_url)
 
     @staticmethod
-    def delete_session(session_id: str) -> bool:
-        """Delete session with error handling"""
-        try:
-            redis_manager.redis.delete(f"session:{session_id}")
-            logger.info(f"Session {session_id} deleted")
-            return True
-        except Exception as e:
-            logger.error(f"Error deleting session {session_id}: {e}")
-            return False
+    def record_source(audio_url: str) -> str:
+        """Play + record"""
+        if not 1 <= config.MAX_RECORD_LENGTH <= 120:
+            raise ValueError("Invalid TwiML parameters")
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<Response><Play>{TwiMLGenerator._audio(audio_url)}</Play>'
+            f'<Record maxLength="{config.MAX_RECORD_LENGTH}" '
+            'action="${base_url}/process-recording?session_id=${session_id}" '
+            'recordingStatusCallback="${base_url}/recording-status?session_id=${session_id}" '
+            'playBeep="true" timeout="5" /></Response>'
+        )
 
     @staticmethod
-    def update_interaction(session_data: UserSession) -> UserSession:
-        """Safe atomic interaction update with Redis transaction"""
-        redis_key = f"session:{session_data.session_id}"
-
-        with redis_manager.redis.pipeline() as pipe:
-            while True:
-                try:
-                    pipe.watch(redis_key)
-                    raw_session = pipe.get(redis_key)
-                    if not raw_session:
-                        raise SessionError("Session expired")
-
-                    current_data = json.loads(raw_session)
-                    current_data["interaction_count"] += 1
-                    current_data["last_interaction_time"] = time.time()
-
-                    if current_data["interaction_count"] > config.MAX_INTERACTIONS:
-                        pipe.unwatch()
-                        SessionManager.delete_session(session_data.session_id)
-                        raise SessionError("Maximum interactions exceeded")
-
-                    pipe.multi()
-                    pipe.set(redis_key, json.dumps(current_data), ex=config.SESSION_TIMEOUT)
-                    pipe.execute()
-
-                    # Also update local session_data object to keep it consistent in memory
-                    session_data.interaction_count = current_data["interaction_count"]
-                    session_data.last_interaction_time = current_data["last_interaction_time"]
-
-                    return session_data
-
-                except redis.WatchError:
-                    logger.warning("Redis watch conflict. Retrying atomic update...")
-                    time.sleep(0.1)
-
+    def stream_source(audio_url: str) -> str:
+        """Play + bidirectional media stream"""
+        # Twilio drops query strings from stream URLs; the session travels as a parameter
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<Response><Play>{TwiMLGenerator._audio(audio_url)}</Play>'
+            '<Connect action="${base_url}/stream-turn?session_id=${session_id}">'
+            '<Stream url="${ws_base}/media-stream">'
+            '<Parameter name="session_id" value="${session_id}" />'
+            '</Stream></Connect></Response>'
+        )
 
-class TwiMLGenerator:
-    """Production TwiML generation with validation"""
     @staticmethod
-    def _validate_url(url: str) -> bool:
-        """Validate audio URL"""
-        return url and url.startswith('https://') or url.startswith('http://') and len(url) < 500
+    def hangup_source(audio_url: str) -> str:
+        """Play + hangup"""
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<Response><Play>{TwiMLGenerator._audio(audio_url)}</Play><Hangup/></Response>'
+        )
 
     @staticmethod
-    def create_play_record_response(audio_url: str, record_action_url: str, 
-                                  recording_callback_url: str, max_length: int) -> str:
-        """Generate validated TwiML for play + record"""
-        if not all([
-            TwiMLGenerator._validate_url(audio_url),
-            TwiMLGenerator._validate_url(record_action_url),
-            TwiMLGenerator._validate_url(recording_callback_url),
-            1 <= max_length <= 120
-        ]):
-            raise ValueError("Invalid TwiML parameters")
-        
-        return f"""<?xml version="1.0" encoding="UTF-8"?>
-        <Response>
-            <Play>{audio_url}</Play>
-            <Record maxLength="{max_length}" action="{record_action_url}" 
-                   recordingStatusCallback="{recording_callback_url}" 
-                   playBeep="true" timeout="5" />
-        </Response>"""
+    def create_listen_response(audio_url: str, base_url: str, session_id: str) -> bytes:
+        """Play a prompt, then capture the answer with Record or a live media stream"""
+        shape = "stream" if config.CONVERSATION_MODE == "stream" else "record"
+        return twiml_templates.render(shape, audio_url, base_url, session_id)
 
     @staticmethod
-    def create_play_hangup_response(audio_url: str) -> str:
+    def create_play_hangup_response(audio_url: str) -> bytes:
         """Generate validated TwiML for play + hangup"""
-        if not TwiMLGenerator._validate_url(audio_url):
-            raise ValueError("Invalid audio URL")
-        
-        return f"""<?xml version="1.0" encoding="UTF-8"?>
-        <Response>
-            <Play>{audio_url}</Play>
-            <Hangup/>
-        </Response>"""
+        return twiml_templates.render("hangup", audio_url)
 
     @staticmethod
-    def create_error_response() -> str:
+    def create_error_response() -> bytes:
         """Generate error TwiML response"""
         return TwiMLGenerator.create_play_hangup_response(ERROR_AUDIO)
 
@@ -353,40 +184,122 @@ class AudioUrlBuilder:
         
         return AudioUrlBuilder._url_cache[cache_key]
 
-def post_call_cleanup_async(slots_filled: Dict, virtual_number: str, user_mobile: str, lang_code: str):
-    """Production async post-call cleanup with comprehensive error handling"""
+    @staticmethod
+    def prompt_urls(languages) -> Dict[str, list]:
+        """Every recorded prompt: slot questions for listening turns, the rest end the call"""
+        listen = [WELCOME_AUDIO]
+        hangup = [ERROR_AUDIO]
+        for lang in languages:
+            listen += [AudioUrlBuilder.get_slot_audio_url(slot.id, lang) for slot in SlotSchema().slots]
+            hangup.append(AudioUrlBuilder.get_confirmation_audio_url(lang))
+        return {"listen": listen, "hangup": hangup}
+
+
+def _twiml_prompts():
+    urls = AudioUrlBuilder.prompt_urls(config.PROMPT_LANGUAGES)
+    listen = "stream" if config.CONVERSATION_MODE == "stream" else "record"
+    return [(listen, url) for url in urls["listen"]] + [("hangup", url) for url in urls["hangup"]]
+
+
+twiml_templates = ResponseTemplates(
+    "twiml",
+    {"record": TwiMLGenerator.record_source, "stream": TwiMLGenerator.stream_source,
+     "hangup": TwiMLGenerator.hangup_source},
+    lambda value: xml_escape(value, {'"': "&quot;"}),
+    _twiml_prompts(),
+)
+
+@post_call_jobs.handler("lead_summary")
+def post_call_cleanup(slots_filled: Dict, virtual_number: str, user_mobile: str, lang_code: str):
+    """Build the lead summary for a completed call and queue its SMS (runs on the job queue)"""
+    # Validate inputs
+    if not slots_filled or not virtual_number or not user_mobile:
+        logger.error("Invalid cleanup parameters")
+        return
+
+    if not slots_filled.get("rent_or_buy"):
+        logger.info("User did not respond to rent/buy prompt. SMS will NOT be sent.")
+        return
+
+    # A blown budget or error leaves the job to be retried
+    with deadline.budget(30):
+        summary_text = SlotFillingService.lead_info_text(slots_filled)
+        custom_message = (
+            f"Below is the Tenant requirements:\n"
+            f"tenant mobile number: {user_mobile}\n"
+            f"{summary_text}"
+        )
+
+        logger.info(f"Cleanup completed for and sending customer to {user_mobile}, {custom_message}")
+
+    if config.SMS_ENABLED:
+        # Separate job so a failed send is retried without rebuilding the summary
+        post_call_jobs.enqueue("lead_sms", {"virtual_number": virtual_number, "message": custom_message})
+
+@post_call_jobs.handler("lead_sms")
+def send_lead_sms(virtual_number: str, message: str):
+    """Text a lead to the agent behind the virtual number, or add it to their digest"""
+    sid = sms_dispatcher.submit(virtual_number, message)
+    if sid:
+        logger.info(f"SMS sent: {sid}")
+
+def listen_twiml(audio_url: str, base_url: str, session_id: str) -> bytes:
+    """Play a prompt, then capture the answer with Record or a live media stream"""
+    return TwiMLGenerator.create_listen_response(audio_url, base_url, session_id)
+
+def next_turn_twiml(session_data: UserSession, base_url: str) -> bytes:
+    """Prompt for the next missing slot, or confirm and end the call"""
+    session_id = session_data.session_id
+    next_slot_id = SlotFillingService.next_missing_slot(session_data.slots_filled)
+    verbose_logger.info(f"Current slots: {session_data.slots_filled}")
+    verbose_logger.info(f"Next slot to fill: {next_slot_id}")
+
+    if next_slot_id:
+        # Continue conversation
+        audio_url = AudioUrlBuilder.get_slot_audio_url(next_slot_id, session_data.language)
+        verbose_logger.info(f"Sending url to play for the twilio {audio_url}")
+        twiml = listen_twiml(audio_url, base_url, session_id)
+
+    else:
+        # End conversation
+        audio_url = AudioUrlBuilder.get_confirmation_audio_url(session_data.language)
+        twiml = TwiMLGenerator.create_play_hangup_response(audio_url)
+
+        logger.info(f"Call completed for {session_id}: {len(session_data.slots_filled)} slots filled")
+
+        # Lead summary and SMS run on the post-call job queue
+        try:
+            post_call_jobs.enqueue("lead_summary", {
+                "slots_filled": session_data.slots_filled,
+                "virtual_number": session_data.virtual_number,
+                "user_mobile": session_data.user_mobile,
+                "lang_code": session_data.language,
+            })
+        except Exception as e:
+            logger.error(f"Could not queue post-call job for {session_id}: {e} "
+                         f"(slots: {session_data.slots_filled})")
+
+        SessionManager.delete_session(session_id)
+
+    return twiml
+
+def out_of_time(e: Exception) -> bool:
+    """A stage or the request ran out of budget, as opposed to failing"""
+    return isinstance(e, DeadlineExceeded) or deadline.expired()
+
+def reprompt_response(session_data: UserSession, language: Optional[str] = None) -> Response:
+    """Ask for the same slot again after a turn that ran out of time.
+
+    The turn still counts toward MAX_INTERACTIONS. It is not dead-lettered:
+    the caller gets another chance, and a replay would send a second lead.
+    """
     try:
-        # Validate inputs
-        if not slots_filled or not virtual_number or not user_mobile:
-            logger.error("Invalid cleanup parameters")
-            return
-
-        if not slots_filled.get("rent_or_buy"):
-            logger.info("User did not respond to rent/buy prompt. SMS will NOT be sent.")
-            return
-
-        # Process with timeout
-        with request_timeout(30):
-            summary_text = SlotFillingService.lead_info_text(slots_filled)
-            custom_message = (
-                f"Below is the Tenant requirements:\n"
-                f"tenant mobile number: {user_mobile}\n"
-                f"{summary_text}"
-            )
-            
-            logger.info(f"Cleanup completed for and sending customer to {user_mobile}, {custom_message}")
-            
-            # SMS sending (implement when ready)
-            # try:
-            #     sid, personal_number = send_sms(virtual_number, custom_message)
-            #     logger.info(f"SMS sent: {sid}")
-            # except Exception as e:
-            #     logger.error(f"SMS failed: {e}")
-            
-    except TimeoutError:
-        logger.error("Post-call cleanup timeout")
-    except Exception as e:
-        logger.error(f"Post-call cleanup error: {e}", exc_info=True)
+        session_data = SessionManager.apply_turn(session_data.session_id, {}, language)
+    except SessionError as e:
+        logger.warning(f"Session limit exceeded for {session_data.session_id}: {e}")
+        SessionManager.delete_session(session_data.session_id)
+        return Response(TwiMLGenerator.create_play_hangup_response(ERROR_AUDIO), mimetype="application/xml")
+    return Response(next_turn_twiml(session_data, request.url_root.rstrip('/')), mimetype="application/xml")
 
 # Health check with comprehensive monitoring
 @voice_agent.route("/health")
@@ -400,23 +313,48 @@ def health_check():
         "checks": {}
     }
     
-    # Redis health
+    # Redis health and response time (one PING)
     health_status["checks"]["redis"] = {
-        "status": "ok" if redis_manager.is_healthy() else "error",
-        "response_time": None
+        "status": "ok",
+        "response_time": None,
+        "circuit": redis_manager.breaker.stats()
     }
-    
-    # Test Redis response time
     try:
-        start = time.time()
-        redis_manager.redis.ping()
-        health_status["checks"]["redis"]["response_time"] = round((time.time() - start) * 1000, 2)
+        health_status["checks"]["redis"]["response_time"] = redis_manager.ping()
     except Exception as e:
+        health_status["checks"]["redis"]["status"] = "error"
         health_status["checks"]["redis"]["error"] = str(e)
         health_status["status"] = "degraded"
+
+    # LLM slot-extraction cache effectiveness (this worker)
+    health_status["checks"]["slot_cache"] = SlotFillingService.cache_stats()
+    health_status["checks"]["session_cache"] = SessionManager.cache_stats()
+    # Per STT provider: circuit, recent attempts, latency and routing score (this worker)
+    health_status["checks"]["stt"] = stt_router.stats()
+    health_status["checks"]["response_templates"] = twiml_templates.stats()
+    health_status["checks"]["post_call_jobs"] = post_call_jobs.stats()
+    health_status["checks"]["recording_dlq"] = recording_dlq.stats()
     
     return jsonify(health_status), 200 if health_status["status"] == "ok" else 503
 
+@voice_agent.route("/metrics")
+def metrics_endpoint():
+    """Prometheus exposition, aggregated across gunicorn workers"""
+    body, content_type = metrics.exposition()
+    return Response(body, content_type=content_type)
+
+@voice_agent.route("/calls/<session_id>/timeline")
+def call_timeline(session_id):
+    """Every traced request, dependency call and job of one call, turn by turn"""
+    try:
+        timeline = tracer.timeline(session_id)
+    except Exception as e:
+        logger.error(f"Timeline lookup failed for {session_id}: {e}")
+        return jsonify({"error": "internal error"}), 500
+    if timeline is None:
+        return jsonify({"error": "no trace for this call"}), 404
+    return jsonify(timeline), 200
+
 @voice_agent.route("/")
 def home():
     """Service information endpoint"""
@@ -430,7 +368,7 @@ def home():
 @voice_agent.route("/answer", methods=["POST","GET"])
 @handle_errors(lambda: Response(TwiMLGenerator.create_error_response(), mimetype="application/xml"))
 def answer():
-    with request_timeout(config.REQUEST_TIMEOUT):
+    with deadline.budget(config.REQUEST_TIMEOUT):
         # Validate Twilio request
         user_mobile = request.values.get("From", "").strip()
         virtual_number = request.values.get("To", "").strip()
@@ -450,13 +388,15 @@ def answer():
         # except Exception as e:
         #     logger.error(f"Rate limiting error: {e}")
 
-        limit = 5                 # Max requests
-        refill_interval = 300     # 5 minute window
+        # The session id is the call's trace id, so pick it before any work is traced
+        session_id = str(uuid.uuid4())
+        tracer.start_call(session_id, request.values.get("CallSid"))
 
         try:
-            allowed = SessionManager.token_bucket(redis_manager.redis, user_mobile, limit, refill_interval)
-            if not allowed:
-                logger.warning(f"Rate limit exceeded for {user_mobile}")
+            decision = allow_call(user_mobile, virtual_number)
+            if not decision.allowed:
+                logger.warning(f"Rate limit exceeded for {user_mobile} -> {virtual_number} "
+                               f"({decision.limited_by}, retry in {decision.retry_after:.0f}s)")
                 raise ValueError("Rate limit exceeded")
         except Exception as e:
             logger.error(f"Rate limiting error: {e}")
@@ -464,7 +404,6 @@ def answer():
             return jsonify({"error": "Too Many Requests"}), 429
 
         # Create session
-        session_id = str(uuid.uuid4())
         session_data = UserSession(
             session_id=session_id,
             user_mobile=user_mobile,
@@ -484,14 +423,9 @@ def answer():
         if not base_url.startswith('https://'):
             logger.warning("Non-HTTPS base URL detected")
         
-        record_action_url = f"{base_url}/process-recording?session_id={session_id}"
-        recording_status_callback_url = f"{base_url}/recording-status?session_id={session_id}"
-        logger.info(f"{WELCOME_AUDIO},{record_action_url},{recording_status_callback_url},{config.MAX_RECORD_LENGTH}")
-
         # Generate TwiML
-        twiml = TwiMLGenerator.create_play_record_response(
-            WELCOME_AUDIO, record_action_url, recording_status_callback_url, config.MAX_RECORD_LENGTH
-        )
+        twiml = listen_twiml(WELCOME_AUDIO, base_url, session_id)
+        verbose_logger.info(f"{WELCOME_AUDIO},{base_url},{config.CONVERSATION_MODE},{config.MAX_RECORD_LENGTH}")
 
         logger.info(f"New session: {session_id} ({user_mobile} -> {virtual_number})")
         return Response(twiml, mimetype="application/xml")
@@ -501,7 +435,7 @@ def answer():
 def process_recording():
     session_id = None
     
-    with request_timeout(config.REQUEST_TIMEOUT):
+    with deadline.budget(config.REQUEST_TIMEOUT):
         # Get and validate session
         session_id = request.args.get("session_id") or request.form.get("session_id")
         if not session_id:
@@ -512,55 +446,35 @@ def process_recording():
         if not session_data or session_data.end_of_conversation:
             logger.info(f"Invalid or ended session: {session_id}")
             return Response(status=200)
+        metrics.bind(language=session_data.language)
 
         # Validate recording URL
         recording_url = request.values.get("RecordingUrl", "").strip()
         if not recording_url or not recording_url.startswith('https://'):
-            logger.warning(f"Recording failure for session {session_id}, slot {slot}")
-
-            # Push into DLQ queue
-            dlq_payload = {
-                "session_id": session_id,
-                "user_mobile": session_data.user_mobile,
-                "virtual_number": session_data.virtual_number,
-                "slots_filled": session_data.slots_filled,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "error": "Invalid or missing recording URL",
-                "recording_url": recording_url
-            }
-            redis_manager.redis.lpush(DLQ_KEY, json.dumps(dlq_payload))
-
-            return jsonify({
-                "Exoml": {
-                    "Say": {
-                        "text": "Sorry, we could not get your response. Please try again.",
-                        "voice": "woman",
-                        "language": "en"
-                    },
-                    "Hangup": {}
-                }
-            })
-
-
-        # Update session
-        try:
-            session_data = SessionManager.update_interaction(session_data)
-        except SessionError as e:
-            logger.warning(f"Session limit exceeded for {session_id}: {e}")
-            SessionManager.delete_session(session_id)
-            return Response(TwiMLGenerator.create_play_hangup_response(ERROR_AUDIO), mimetype="application/xml")
-
-        # Process transcription with timeout
+            logger.warning(f"Recording failure for session {session_id}: missing or invalid URL")
+            add_failed_recording(session_data, recording_url, "Invalid or missing recording URL")
+            return Response(TwiMLGenerator.create_error_response(), mimetype="application/xml")
+
+        # Pick up the transcription /recording-status started speculatively,
+        # or wait for the media and run it here
+        recording_key = request.values.get("RecordingSid", "").strip() or recording_url
+        stt_timeout = CloudRunOptimizedService.timeout_for(request.values.get("RecordingDuration"))
         try:
-            transcription_result = CloudRunOptimizedService.transcribe_audio(recording_url,12)
+            transcription_result = SpeculativeTranscription.resolve(
+                session_id, recording_key, recording_url, stt_timeout
+            )
             if not transcription_result or not hasattr(transcription_result, 'text'):
                 raise TranscriptionError("Invalid transcription result")
             
-            session_data.language = getattr(transcription_result, "language", "en")
-            logger.info(f"Session {session_id}: '{transcription_result.text[:100]}' [{session_data.language}]")
+            language = getattr(transcription_result, "language", "en")
+            logger.info(f"Session {session_id}: '{transcription_result.text[:100]}' [{language}]")
             
         except Exception as e:
+            if out_of_time(e):
+                logger.warning(f"Transcription out of time for {session_id}, reprompting: {e}")
+                return reprompt_response(session_data)
             logger.error(f"Transcription failed for {session_id}: {e}")
+            add_failed_recording(session_data, recording_url, f"Transcription failed: {e}")
             raise TranscriptionError(f"Transcription failed: {e}")
 
         # Process slot filling with validation
@@ -568,72 +482,165 @@ def process_recording():
             filled_slots = SlotFillingService.extract_slots_with_llm(
                 transcription_result.text,
                 session_data.slots_filled,
-                session_data.language
+                language
             )
             
             if not isinstance(filled_slots, dict):
                 raise SlotFillingError("Invalid slot filling result")
             
-            session_data.slots_filled.update(filled_slots)
-            
         except Exception as e:
+            if out_of_time(e):
+                logger.warning(f"Slot filling out of time for {session_id}, reprompting: {e}")
+                return reprompt_response(session_data, language)
             logger.error(f"Slot filling failed for {session_id}: {e}")
+            add_failed_recording(session_data, recording_url, f"Slot filling failed: {e}", language)
             raise SlotFillingError(f"Slot filling failed: {e}")
 
-        # Determine next action
-        next_slot_id = SlotFillingService.next_missing_slot(session_data.slots_filled)
-        base_url = request.url_root.rstrip('/')
-        logger.info(f"Current slots: {session_data.slots_filled}")
-        logger.info(f"Next slot to fill: {next_slot_id}")
-
-        if next_slot_id:
-            # Continue conversation
-            audio_url = AudioUrlBuilder.get_slot_audio_url(next_slot_id, session_data.language)
-            logger.info(f"Sending url to play for the twilio {audio_url}")
-            record_action_url = f"{base_url}/process-recording?session_id={session_id}"
-            recording_callback_url = f"{base_url}/recording-status?session_id={session_id}"
-            
-            twiml = TwiMLGenerator.create_play_record_response(
-                audio_url, record_action_url, recording_callback_url, config.MAX_RECORD_LENGTH
-            )
-            
-            SessionManager.save_session(session_id, session_data)
-            
-        else:
-            # End conversation
-            audio_url = AudioUrlBuilder.get_confirmation_audio_url(session_data.language)
-            twiml = TwiMLGenerator.create_play_hangup_response(audio_url)
-            
-            logger.info(f"Call completed for {session_id}: {len(session_data.slots_filled)} slots filled")
-            
-            # Async cleanup
-            threading.Thread(
-                target=post_call_cleanup_async,
-                args=(session_data.slots_filled, session_data.virtual_number, 
-                      session_data.user_mobile, session_data.language),
-                daemon=True
-            ).start()
-            
+        # Count the turn and merge its slots in one atomic update
+        try:
+            session_data = SessionManager.apply_turn(session_id, filled_slots, language)
+        except SessionError as e:
+            logger.warning(f"Session limit exceeded for {session_id}: {e}")
             SessionManager.delete_session(session_id)
+            return Response(TwiMLGenerator.create_play_hangup_response(ERROR_AUDIO), mimetype="application/xml")
 
+        # Determine next action
+        twiml = next_turn_twiml(session_data, request.url_root.rstrip('/'))
         return Response(twiml, mimetype="application/xml")
     
+@sock.route("/media-stream", bp=voice_agent)
+def media_stream(ws):
+    """Twilio Media Streams socket: transcribes one caller turn live.
+
+    Audio frames go straight to the streaming transcriber. When it detects the
+    end of the turn the slots are stored and the socket is closed, which makes
+    Twilio request the <Connect> action URL (/stream-turn) for the next prompt.
+    """
+    session_data = None
+    transcriber = None
+    turn = None
+    turn_ends_at = None
+    try:
+        while not (turn and turn.done.is_set()):
+            # Twilio sends a frame every 20 ms for the whole stream, silence
+            # included, so the turn limit is checked on every message
+            if turn_ends_at and time.monotonic() > turn_ends_at:
+                logger.info(f"Stream turn timed out for {session_data.session_id}")
+                break
+            raw = ws.receive(timeout=0.5)
+            if raw is None:
+                continue
+
+            message = json.loads(raw)
+            event = message.get("event")
+            if event == "start":
+                session_id = message["start"].get("customParameters", {}).get("session_id")
+                if session_id:
+                    tracer.start_call(session_id, message["start"].get("callSid"))
+                try:
+                    session_data = SessionManager.get_session(session_id)
+                except SessionError:
+                    session_data = None
+                if not session_data or session_data.end_of_conversation:
+                    logger.info(f"Invalid or ended session on media stream: {session_id}")
+                    return
+
+                filled, language = dict(session_data.slots_filled), session_data.language
+                metrics.bind(language=language)
+                turn = StreamingTurn(
+                    lambda text: SlotFillingService.extract_slots_with_llm(text, filled, language)
+                )
+                transcriber = DeepgramStreamingTranscriber(turn.on_result, language=language)
+                transcriber.start()
+                turn_ends_at = time.monotonic() + config.STREAM_TURN_TIMEOUT
+                logger.info(f"Media stream started for {session_id}")
+            elif event == "media" and transcriber:
+                transcriber.send(base64.b64decode(message["media"]["payload"]))
+            elif event == "stop":
+                # Caller hung up mid-turn; keep whatever was said
+                break
+    except ConnectionClosed:
+        logger.info(f"Media stream closed mid-turn for {session_data.session_id if session_data else 'unknown session'}")
+    except Exception as e:
+        logger.error(f"Media stream failed: {e}", exc_info=True)
+    finally:
+        # Store the turn however the loop ended, so a socket error keeps the partial slots
+        if turn:
+            try:
+                if not turn.done.is_set():
+                    transcriber.finish()
+                complete_stream_turn(session_data, turn)
+            except Exception as e:
+                logger.error(f"Failed to store streamed turn for {session_data.session_id}: {e}", exc_info=True)
+        if transcriber:
+            transcriber.close()
+
+def complete_stream_turn(session_data: UserSession, turn: StreamingTurn):
+    """Count the interaction and store the slots extracted from a streamed turn"""
+    session_id = session_data.session_id
+    text = turn.text
+    logger.info(f"Session {session_id}: '{text[:100]}' [{session_data.language}] (streamed)")
+    filled_slots = turn.slots() if text else {}
+    if not isinstance(filled_slots, dict):
+        raise SlotFillingError("Invalid slot filling result")
+
+    try:
+        SessionManager.apply_turn(session_id, filled_slots)
+    except SessionError as e:
+        logger.warning(f"Session limit exceeded for {session_id}: {e}")
+        SessionManager.delete_session(session_id)
+
+@voice_agent.route("/stream-turn", methods=["POST","GET"])
+@handle_errors(lambda: Response(TwiMLGenerator.create_error_response(), mimetype="application/xml"))
+def stream_turn():
+    """<Connect> action URL: the media stream for a turn has closed"""
+    with deadline.budget(config.REQUEST_TIMEOUT):
+        session_id = request.args.get("session_id") or request.form.get("session_id")
+        if not session_id:
+            logger.error("No session ID provided")
+            return Response(status=200)
+
+        session_data = SessionManager.get_session(session_id)
+        if not session_data or session_data.end_of_conversation:
+            logger.info(f"Invalid or ended session: {session_id}")
+            return Response(TwiMLGenerator.create_play_hangup_response(ERROR_AUDIO), mimetype="application/xml")
+
+        twiml = next_turn_twiml(session_data, request.url_root.rstrip('/'))
+        return Response(twiml, mimetype="application/xml")
+
 @voice_agent.route("/dlq", methods=["GET"])
 def dlq_inspect():
+    """Failed recordings, newest first: ?cursor=<next_cursor>&count=50&dead=1"""
     try:
-        dlq_items = redis_manager.redis.lrange(DLQ_KEY, 0, 50)
-        parsed = [json.loads(item) for item in dlq_items]
-        return jsonify(parsed), 200
+        page = recording_dlq.page(
+            request.args.get("cursor") or None,
+            request.args.get("count", 50, type=int),
+            dead=request.args.get("dead", "").lower() in ("1", "true"),
+        )
+        page["stats"] = recording_dlq.stats()
+        return jsonify(page), 200
     except Exception as e:
         logger.error(f"DLQ inspect failed: {e}")
         return jsonify({"error": "internal error"}), 500
 
-    
+@voice_agent.route("/dlq/replay", methods=["POST"])
+def dlq_replay():
+    """Queue dead (out of attempts) recordings for replay again: ?count=100"""
+    try:
+        requeued = recording_dlq.requeue_dead(request.args.get("count", 100, type=int))
+        logger.info(f"DLQ: {requeued} dead recordings queued for replay")
+        return jsonify({"requeued": requeued}), 200
+    except Exception as e:
+        logger.error(f"DLQ replay failed: {e}")
+        return jsonify({"error": "internal error"}), 500
+
 @voice_agent.route("/recording-status", methods=["POST"])
 @handle_errors()
 def recording_status():
     try:
         recording_url = request.values.get("RecordingUrl", "").strip()
+        recording_sid = request.values.get("RecordingSid", "").strip()
+        status = request.values.get("RecordingStatus", "completed")
         session_id = request.values.get("session_id")
         slot = request.values.get("slot", "unknown")
 
@@ -649,6 +656,17 @@ def recording_status():
                 </Response>
             """, 200, {'Content-Type': 'application/xml'})
 
+        recording_key = recording_sid or recording_url
+        if status == "completed" and session_id and len(session_id) <= 100:
+            # Overlap download + STT with Twilio's call to the action URL
+            SpeculativeTranscription.start(
+                session_id, recording_key, recording_url,
+                CloudRunOptimizedService.timeout_for(request.values.get("RecordingDuration"))
+            )
+
+        # Wake the /process-recording handler waiting on this recording
+        RecordingReadiness.signal(recording_key, status)
+
         logger.info(f"Recording status {session_id}: {status}")
         return "OK", 200
     except Exception as e:
@@ -9,20 +9,112 @@ class Config:
     TESTING = os.getenv("TESTING", "False").lower() == "true"
     SECRET_KEY = os.getenv("SECRET_KEY") or secrets.token_hex(32)
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    # OpenAI-compatible endpoint, e.g. a proxy or the load-test fake (None: api.openai.com)
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
     OPENTTS_URL = os.getenv("OPENTTS_URL", "https://opentts-service-842014299446.us-central1.run.app/api/tts")
     WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "small")
     MAX_RECORD_LENGTH = int(os.getenv("MAX_RECORD_LENGTH", "15"))
-    REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
+    # Budget per webhook request; downloads, STT, the LLM and Redis waits get what is left of it.
+    # Twilio abandons a webhook after 15s, so a reprompt must be ready well before that
+    REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "12"))
     TEMP_DIR = os.getenv("TEMP_DIR") or None
+    # Languages with recorded prompts; responses for these are precompiled at startup
+    PROMPT_LANGUAGES = [lang.strip() for lang in os.getenv("PROMPT_LANGUAGES", "en,hi,te,ta").split(",") if lang.strip()]
     MAX_INTERACTIONS = 16
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT = os.getenv("LOG_FORMAT", "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    # JSON lines (Cloud Logging fields) instead of LOG_FORMAT
+    LOG_JSON = os.getenv("LOG_JSON", "True").lower() == "true"
+    # Records buffered for the log writer thread; beyond this they are dropped, not waited on
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Fraction of INFO/DEBUG records kept per logger (children included)
+    LOG_SAMPLE_RATES = os.getenv(
+        "LOG_SAMPLE_RATES",
+        "app.api.routestwilio.verbose=0.1,app.core.services.verbose=0.1,app.core.recordings.verbose=0.1",
+    )
     MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
     RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "1.5"))
     ASSEMBLYAI_API_KEY = os.environ.get("ASSEMBLYAI_API_KEY")
+    ASSEMBLYAI_API_URL = os.environ.get("ASSEMBLYAI_API_URL", "https://api.assemblyai.com/v2")
     REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
-    REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", "20"))
+    REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", "5"))
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", "5"))
+    REDIS_CONNECT_TIMEOUT = float(os.environ.get("REDIS_CONNECT_TIMEOUT", "5"))
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+    REDIS_RETRIES = int(os.environ.get("REDIS_RETRIES", "1"))
+    REDIS_BREAKER_THRESHOLD = int(os.environ.get("REDIS_BREAKER_THRESHOLD", "5"))
+    REDIS_BREAKER_RESET = float(os.environ.get("REDIS_BREAKER_RESET", "10"))
     SESSION_TIMEOUT = int(os.environ.get("SESSION_TIMEOUT", "3600"))
+    SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "1000"))
+    # Token buckets: capacity calls, refilled evenly over the window (seconds)
+    RATE_LIMIT_CALLER_CAPACITY = int(os.environ.get("RATE_LIMIT_CALLER_CAPACITY", "5"))
+    RATE_LIMIT_CALLER_WINDOW = int(os.environ.get("RATE_LIMIT_CALLER_WINDOW", "300"))
+    RATE_LIMIT_NUMBER_CAPACITY = int(os.environ.get("RATE_LIMIT_NUMBER_CAPACITY", "100"))
+    RATE_LIMIT_NUMBER_WINDOW = int(os.environ.get("RATE_LIMIT_NUMBER_WINDOW", "60"))
+    RATE_LIMIT_LOCAL_KEYS = int(os.environ.get("RATE_LIMIT_LOCAL_KEYS", "10000"))
+    RECORDING_READY_TIMEOUT = float(os.environ.get("RECORDING_READY_TIMEOUT", "4"))
+    RECORDING_READY_TTL = int(os.environ.get("RECORDING_READY_TTL", "300"))
+    RECORDING_POLL_INTERVAL = float(os.environ.get("RECORDING_POLL_INTERVAL", "0.25"))
+    RECORDING_POLL_BUDGET = float(os.environ.get("RECORDING_POLL_BUDGET", "2"))
+    STT_TIMEOUT = int(os.environ.get("STT_TIMEOUT", "12"))
+    # Download + STT budget for a recording of known length: base plus per second
+    # of audio, capped at STT_TIMEOUT (which applies when the length is unknown)
+    STT_TIMEOUT_BASE = float(os.environ.get("STT_TIMEOUT_BASE", "4"))
+    STT_TIMEOUT_PER_SECOND = float(os.environ.get("STT_TIMEOUT_PER_SECOND", "0.5"))
+    OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", "8"))
+    STT_RESULT_TTL = int(os.environ.get("STT_RESULT_TTL", "120"))
+    SLOT_FAST_PATH = os.getenv("SLOT_FAST_PATH", "True").lower() == "true"
+    FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.85"))
+    PROMPT_MAX_EXAMPLES = int(os.getenv("PROMPT_MAX_EXAMPLES", "4"))
+    SLOT_CACHE_ENABLED = os.getenv("SLOT_CACHE_ENABLED", "True").lower() == "true"
+    SLOT_CACHE_SIZE = int(os.getenv("SLOT_CACHE_SIZE", "2048"))
+    SLOT_CACHE_LOCAL_TTL = int(os.getenv("SLOT_CACHE_LOCAL_TTL", "3600"))
+    SLOT_CACHE_REDIS_TTL = int(os.getenv("SLOT_CACHE_REDIS_TTL", "86400"))
     TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN")
     TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID")
     DEEPGRAM_API_KEY = os.environ.get("DEEPGRAM_API_KEY")
+    DEEPGRAM_API_URL = os.environ.get("DEEPGRAM_API_URL", "https://api.deepgram.com/v1/listen")
+    STT_MAX_WORKERS = int(os.environ.get("STT_MAX_WORKERS", "32"))
+    # Recorded-turn STT providers in order of preference (those without an API key
+    # are skipped). Each is ranked by its recent p90 latency and error rate; with
+    # STT_HEDGE the next one also gets the audio once the first is past its p90
+    # (STT_HEDGE_DELAY until it has STT_MIN_SAMPLES of the last STT_LATENCY_WINDOW)
+    STT_PROVIDERS = os.environ.get("STT_PROVIDERS", "deepgram,assemblyai")
+    STT_HEDGE = os.getenv("STT_HEDGE", "True").lower() == "true"
+    STT_HEDGE_DELAY = float(os.environ.get("STT_HEDGE_DELAY", "2"))
+    STT_MIN_SAMPLES = int(os.environ.get("STT_MIN_SAMPLES", "20"))
+    STT_LATENCY_WINDOW = int(os.environ.get("STT_LATENCY_WINDOW", "200"))
+    STT_BREAKER_THRESHOLD = int(os.environ.get("STT_BREAKER_THRESHOLD", "5"))
+    STT_BREAKER_RESET = float(os.environ.get("STT_BREAKER_RESET", "30"))
+    HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "32"))
+    # "record" (Play + Record per turn) or "stream" (Play + Connect/Stream with live STT)
+    CONVERSATION_MODE = os.getenv("CONVERSATION_MODE", "record").lower()
+    DEEPGRAM_STREAMING_URL = os.environ.get("DEEPGRAM_STREAMING_URL", "wss://api.deepgram.com/v1/listen")
+    DEEPGRAM_STREAMING_MODEL = os.environ.get("DEEPGRAM_STREAMING_MODEL", "nova-2-phonecall")
+    STREAM_ENDPOINTING_MS = int(os.environ.get("STREAM_ENDPOINTING_MS", "300"))
+    STREAM_UTTERANCE_END_MS = int(os.environ.get("STREAM_UTTERANCE_END_MS", "1000"))
+    STREAM_TURN_TIMEOUT = float(os.environ.get("STREAM_TURN_TIMEOUT", "20"))
+    STREAM_CONNECT_TIMEOUT = float(os.environ.get("STREAM_CONNECT_TIMEOUT", "5"))
+    # Post-call jobs (lead summary, SMS): consumer threads per worker process,
+    # seconds before an unacknowledged job is retried, deliveries before it is dead
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+    JOB_VISIBILITY_TIMEOUT = float(os.environ.get("JOB_VISIBILITY_TIMEOUT", "60"))
+    JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+    SMS_ENABLED = os.getenv("SMS_ENABLED", "False").lower() == "true"
+    # Lead SMS: sends per second per Twilio account and per sender number, the
+    # longest a job waits for a slot, and the digest window in seconds (0 = off)
+    SMS_ACCOUNT_RATE = float(os.environ.get("SMS_ACCOUNT_RATE", "10"))
+    SMS_NUMBER_RATE = float(os.environ.get("SMS_NUMBER_RATE", "1"))
+    SMS_MAX_WAIT = float(os.environ.get("SMS_MAX_WAIT", "10"))
+    SMS_DIGEST_WINDOW = float(os.environ.get("SMS_DIGEST_WINDOW", "0"))
+    # Failed recordings: concurrent replays per worker, seconds between attempts, attempts
+    DLQ_REPLAY_WORKERS = int(os.environ.get("DLQ_REPLAY_WORKERS", "4"))
+    DLQ_RETRY_INTERVAL = float(os.environ.get("DLQ_RETRY_INTERVAL", "30"))
+    DLQ_MAX_ATTEMPTS = int(os.environ.get("DLQ_MAX_ATTEMPTS", "10"))
+    # Call tracing: where finished spans go ("redis", "memory", "file" or "off"),
+    # the JSON-lines file for "file", how long a call's spans are kept and the cap per call
+    TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "redis")
+    TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+    TRACE_TTL = int(os.environ.get("TRACE_TTL", "86400"))
+    TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", "1000"))
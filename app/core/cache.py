@@ -0,0 +1,89 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.redis_manager import redis_manager
+
+logger = logging.getLogger(__name__)
+
+
+class TwoTierCache:
+    """In-process LRU in front of a shared Redis cache.
+
+    The local tier is bounded by entry count (least recently used entries are
+    evicted) and per-entry TTL; the Redis tier is shared by every worker and
+    instance and bounded by TTL (plus the server's maxmemory policy). Values
+    must be JSON serializable.
+    """
+
+    def __init__(self, namespace: str, max_entries: int, local_ttl: int, redis_ttl: int):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "evictions": 0, "errors": 0}
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{hashlib.sha1(key.encode()).hexdigest()}"
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _store_local(self, key: str, value: Any):
+        with self._lock:
+            self._local[key] = (time.time() + self.local_ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key, or None"""
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._local.move_to_end(key)
+                    self._stats["local_hits"] += 1
+                    return entry[1]
+                del self._local[key]
+
+        try:
+            raw = redis_manager.redis.get(self._redis_key(key))
+        except Exception as e:
+            logger.warning(f"Cache {self.namespace} Redis read failed: {e}")
+            self._count("errors")
+            raw = None
+
+        if raw is None:
+            self._count("misses")
+            return None
+
+        value = json.loads(raw)
+        self._store_local(key, value)
+        self._count("redis_hits")
+        return value
+
+    def set(self, key: str, value: Any):
+        """Write value to both tiers"""
+        self._store_local(key, value)
+        try:
+            redis_manager.redis.set(self._redis_key(key), json.dumps(value), ex=self.redis_ttl)
+        except Exception as e:
+            logger.warning(f"Cache {self.namespace} Redis write failed: {e}")
+            self._count("errors")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this worker"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["local_size"] = len(self._local)
+        lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["local_hits"] + stats["redis_hits"]) / lookups, 3) if lookups else None
+        return stats
@@ -0,0 +1,109 @@
+import time
+import logging
+import threading
+from typing import Callable, Tuple, Type
+from app.utils.exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Fail fast while a dependency is down.
+
+    Closed: calls pass through; ``failure_threshold`` consecutive failures open
+    the circuit. Open: calls raise CircuitOpenError without touching the
+    dependency. After ``reset_timeout`` seconds the circuit is half-open and a
+    single probe call is let through; its outcome closes or re-opens it.
+    Only ``failure_exceptions`` count as failures: any other error means the
+    dependency answered. ``ignored_exceptions`` (checked first) are raised
+    before the dependency is reached and say nothing about its health.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float,
+                 failure_exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+                 ignored_exceptions: Tuple[Type[BaseException], ...] = ()):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_exceptions = failure_exceptions
+        self.ignored_exceptions = ignored_exceptions
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to the dependency now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit {self.name} opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def _release(self):
+        with self._lock:
+            self._probing = False
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Run fn through the breaker"""
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        try:
+            result = fn(*args, **kwargs)
+        except self.ignored_exceptions:
+            self._release()
+            raise
+        except self.failure_exceptions:
+            self.record_failure()
+            raise
+        except Exception:
+            self.record_success()
+            raise
+        except BaseException:
+            # Interrupted (request timeout, greenlet kill): no health signal either way
+            self._release()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            failures = self._failures
+        return {"state": self.state, "consecutive_failures": failures}
@@ -0,0 +1,62 @@
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+from app.utils.exceptions import DeadlineExceeded
+
+
+class Deadline(NamedTuple):
+    expires_at: float   # time.monotonic()
+    budget: float       # seconds it had when set
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+# Deadline of the request (or job) being handled. Work handed to executors
+# runs in a copy of the context, so it inherits the caller's deadline
+_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def budget(seconds: float):
+    """Finish the block within `seconds`, or sooner if an enclosing deadline expires first"""
+    current = _deadline.get()
+    now = time.monotonic()
+    expires_at = now + seconds
+    if current is not None and current.expires_at < expires_at:
+        expires_at = current.expires_at
+    token = _deadline.set(Deadline(expires_at, expires_at - now))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left (negative once expired), or None without a deadline"""
+    current = _deadline.get()
+    return current.remaining() if current is not None else None
+
+
+def expired() -> bool:
+    current = _deadline.get()
+    return current is not None and current.remaining() <= 0
+
+
+def timeout(cap: float, what: str = "operation") -> float:
+    """Timeout for one blocking call: `cap`, cut to what is left of the deadline.
+
+    Raises DeadlineExceeded instead of starting a call with no budget left.
+    """
+    current = _deadline.get()
+    if current is None:
+        return cap
+    left = current.remaining()
+    if left <= 0:
+        raise DeadlineExceeded(what, current.budget)
+    return min(cap, left)
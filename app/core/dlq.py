@@ -0,0 +1,84 @@
+import logging
+import json
+from datetime import datetime
+from typing import Dict, Optional
+from app.config import Config
+from app.core.jobs import JobQueue, post_call_jobs
+from app.core.redis_manager import redis_manager
+from app.core.services import CloudRunOptimizedService, SlotFillingService
+
+logger = logging.getLogger(__name__)
+
+# The dead-letter list used before the stream
+LEGACY_DLQ_KEY = "recording_failures_dlq"
+
+# Failed recordings: a job queue whose consumers replay each failure.
+# Replay concurrency is bounded by the consumer count, and a failed replay
+# waits DLQ_RETRY_INTERVAL before the next attempt.
+recording_dlq = JobQueue(
+    "recordings",
+    workers=Config.DLQ_REPLAY_WORKERS,
+    visibility_timeout=Config.DLQ_RETRY_INTERVAL,
+    max_attempts=Config.DLQ_MAX_ATTEMPTS,
+)
+
+
+def add_failed_recording(session_data, recording_url: str, error: str,
+                         language: Optional[str] = None) -> Optional[str]:
+    """Dead-letter a turn whose transcription or extraction failed"""
+    payload = {
+        "session_id": session_data.session_id,
+        "user_mobile": session_data.user_mobile,
+        "virtual_number": session_data.virtual_number,
+        "slots_filled": session_data.slots_filled,
+        "language": language or session_data.language,
+        "recording_url": recording_url,
+        "error": str(error)[:500],
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
+    try:
+        return recording_dlq.enqueue("replay_recording", payload)
+    except Exception as e:
+        logger.error(f"DLQ write failed for {session_data.session_id}: {e} ({json.dumps(payload)})")
+        return None
+
+
+@recording_dlq.handler("replay_recording")
+def replay_recording(session_id: str, user_mobile: str, virtual_number: str, slots_filled: Dict,
+                     language: str, recording_url: str, **_):
+    """Re-run transcription and extraction, then hand the recovered lead to post-call jobs.
+
+    The caller was sent the error prompt when the turn failed, so the call is
+    over; the recovered slots go out as a lead summary like a completed call.
+    """
+    slots = dict(slots_filled)
+    if recording_url and recording_url.startswith("https://"):
+        result = CloudRunOptimizedService.transcribe_audio(recording_url, timeout=Config.STT_TIMEOUT)
+        language = getattr(result, "language", None) or language
+        if result.text:
+            extracted = SlotFillingService.extract_slots_with_llm(result.text, slots, language)
+            slots.update({k: v for k, v in extracted.items() if v is not None})
+    logger.info(f"Replayed recording for {session_id}: {len(slots)} slots")
+    post_call_jobs.enqueue("lead_summary", {
+        "slots_filled": slots,
+        "virtual_number": virtual_number,
+        "user_mobile": user_mobile,
+        "lang_code": language,
+    })
+
+
+def migrate_legacy_dlq(batch: int = 100) -> int:
+    """Move entries from the old DLQ list into the stream; returns how many"""
+    moved = 0
+    client = redis_manager.redis
+    while True:
+        items = client.rpop(LEGACY_DLQ_KEY, batch)
+        if not items:
+            return moved
+        for item in items:
+            entry = json.loads(item)
+            entry.setdefault("language", "en")
+            entry.setdefault("recording_url", "")
+            recording_dlq.enqueue("replay_recording", entry)
+        moved += len(items)
+        logger.info(f"Moved {moved} entries from {LEGACY_DLQ_KEY} to {recording_dlq.stream}")
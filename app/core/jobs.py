@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+import redis
+from app.config import Config
+from app.core.redis_manager import redis_manager
+from app.core import metrics
+from app.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Longest XREADGROUP block; must stay below the Redis socket timeout
+_BLOCK_MS = 2000
+
+
+class Job(NamedTuple):
+    id: str
+    kind: str
+    payload: dict
+    deliveries: int = 1     # times handed to a consumer, this one included
+    trace: Optional[str] = None     # trace position of the enqueuing request (Tracer.carrier)
+
+
+class JobQueue:
+    """Background jobs in a Redis stream, run by a fixed pool of consumer threads.
+
+    enqueue() appends to the stream; every process that calls start() runs
+    `workers` consumers in one consumer group, so a burst of jobs waits in
+    Redis instead of spawning threads. A job is acknowledged (and deleted)
+    when its handler returns. If the handler raises, or the process dies
+    mid-job, the entry stays pending; once it has been idle for
+    `visibility_timeout` seconds any consumer claims it again, which is the
+    retry backoff. After `max_attempts` deliveries it moves to the dead
+    stream. Delivery is at least once, so handlers must tolerate a repeat.
+    """
+
+    def __init__(self, name: str, workers: int = 2, visibility_timeout: float = 60,
+                 max_attempts: int = 5, max_length: int = 100000):
+        self.name = name
+        self.stream = f"jobs:{name}"
+        self.dead_stream = f"jobs:{name}:dead"
+        self.group = name
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.max_length = max_length
+        self._handlers: Dict[str, Callable] = {}
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._group_ready = False
+        self._stats = {"enqueued": 0, "processed": 0, "failed": 0, "retried": 0, "dead": 0}
+
+    def handler(self, kind: str):
+        """Register the function that runs jobs of this kind (payload as keyword arguments)"""
+        def register(fn):
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def enqueue(self, kind: str, payload: dict) -> str:
+        """Queue a job; returns its stream id"""
+        fields = {"k": kind, "p": json.dumps(payload)}
+        carrier = tracer.carrier()
+        if carrier:
+            fields["t"] = carrier
+        job_id = redis_manager.redis.xadd(self.stream, fields, maxlen=self.max_length, approximate=True)
+        self._count("enqueued")
+        return job_id.decode() if isinstance(job_id, bytes) else job_id
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            redis_manager.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def start(self):
+        """Start this process' consumers (once per process, after any fork)"""
+        with self._lock:
+            if any(thread.is_alive() for thread in self._threads):
+                return
+            self._stopping.clear()
+            prefix = f"{socket.gethostname()}-{os.getpid()}"
+            self._threads = [
+                threading.Thread(target=self._run, args=(f"{prefix}-{n}",),
+                                 name=f"{self.name}-jobs-{n}", daemon=True)
+                for n in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Job queue {self.name}: {self.workers} consumers started")
+
+    def stop(self, timeout: float = 5):
+        """Stop consuming; a job still running is claimed again after the visibility timeout"""
+        self._stopping.set()
+        deadline = time.time() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.time()))
+
+    @staticmethod
+    def _parse(entries, deliveries: Optional[Dict[str, int]] = None) -> List[Job]:
+        jobs = []
+        for entry_id, fields in entries:
+            entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+            if not fields:
+                continue  # trimmed from the stream while pending
+            trace = fields.get(b"t")
+            jobs.append(Job(entry_id, fields[b"k"].decode(), json.loads(fields[b"p"]),
+                            (deliveries or {}).get(entry_id, 1), trace.decode() if trace else None))
+        return jobs
+
+    def _read(self, consumer: str) -> List[Job]:
+        response = redis_manager.redis.xreadgroup(
+            self.group, consumer, {self.stream: ">"}, count=1, block=_BLOCK_MS
+        )
+        return self._parse(response[0][1]) if response else []
+
+    def _claim_stale(self, consumer: str) -> List[Job]:
+        """Jobs whose consumer failed or vanished, idle past the visibility timeout"""
+        client = redis_manager.redis
+        response = client.xautoclaim(
+            self.stream, self.group, consumer,
+            min_idle_time=int(self.visibility_timeout * 1000), start_id="0-0", count=1,
+        )
+        entries = response[1]
+        if not entries:
+            return []
+        ids = [entry_id for entry_id, _ in entries]
+        pending = client.xpending_range(self.stream, self.group, min=ids[0], max=ids[-1],
+                                        count=len(ids), consumername=consumer)
+        deliveries = {
+            (item["message_id"].decode() if isinstance(item["message_id"], bytes) else item["message_id"]):
+                item["times_delivered"]
+            for item in pending
+        }
+        jobs = self._parse(entries, deliveries)
+        self._count("retried", len(jobs))
+        return jobs
+
+    def _ack(self, job: Job):
+        pipe = redis_manager.redis.pipeline(transaction=False)
+        pipe.xack(self.stream, self.group, job.id)
+        pipe.xdel(self.stream, job.id)
+        pipe.execute()
+
+    def _bury(self, job: Job, reason: str):
+        """Move a job that keeps failing to the dead stream"""
+        fields = {"k": job.kind, "p": json.dumps(job.payload), "id": job.id,
+                  "deliveries": job.deliveries, "reason": reason[:500], "ts": time.time()}
+        if job.trace:
+            fields["t"] = job.trace
+        pipe = redis_manager.redis.pipeline(transaction=True)
+        pipe.xadd(self.dead_stream, fields, maxlen=self.max_length, approximate=True)
+        pipe.xack(self.stream, self.group, job.id)
+        pipe.xdel(self.stream, job.id)
+        pipe.execute()
+        self._count("dead")
+        logger.error(f"Job {self.name}/{job.kind} {job.id} dead after {job.deliveries} deliveries: {reason}")
+
+    def _process(self, job: Job):
+        metrics.bind(f"jobs:{self.name}",
+                     job.payload.get("language") or job.payload.get("lang_code") or "unknown")
+        handler = self._handlers.get(job.kind)
+        if handler is None:
+            self._bury(job, f"no handler for {job.kind}")
+            return
+        if job.deliveries > self.max_attempts:
+            self._bury(job, "max attempts exceeded")
+            return
+        try:
+            with tracer.resumed(job.trace), tracer.span(f"job {self.name}/{job.kind}", job_id=job.id,
+                                                        delivery=job.deliveries):
+                handler(**job.payload)
+        except Exception as e:
+            # Left pending: claimed again once idle for the visibility timeout
+            self._count("failed")
+            logger.warning(f"Job {self.name}/{job.kind} {job.id} failed "
+                           f"(delivery {job.deliveries}/{self.max_attempts}): {e}")
+            if job.deliveries >= self.max_attempts:
+                self._bury(job, str(e))
+            return
+        self._ack(job)
+        self._count("processed")
+
+    def _run(self, consumer: str):
+        next_claim = 0.0
+        errors = 0
+        while not self._stopping.is_set():
+            try:
+                self._ensure_group()
+                jobs = []
+                if time.time() >= next_claim:
+                    # One at a time, so a claimed job never sits idle behind
+                    # others long enough to be claimed again; keep claiming
+                    # while there are stale jobs, then check back later
+                    jobs = self._claim_stale(consumer)
+                    if not jobs:
+                        next_claim = time.time() + self.visibility_timeout / 2
+                for job in jobs or self._read(consumer):
+                    self._process(job)
+                errors = 0
+            except Exception as e:
+                # Redis down or circuit open: back off instead of spinning
+                errors += 1
+                logger.error(f"Job queue {self.name} consumer {consumer}: {e}")
+                self._stopping.wait(min(30, 0.5 * 2 ** errors))
+
+    def page(self, cursor: Optional[str] = None, count: int = 50, dead: bool = False) -> Dict[str, object]:
+        """Newest-first page of queued (or dead) jobs; pass next_cursor back for the next page"""
+        count = max(1, min(count, 500))
+        stream = self.dead_stream if dead else self.stream
+        entries = redis_manager.redis.xrevrange(stream, max=f"({cursor}" if cursor else "+",
+                                                min="-", count=count)
+        items = []
+        for entry_id, fields in entries:
+            item = {key.decode(): value.decode() for key, value in fields.items()}
+            item["id"] = entry_id.decode()
+            item["p"] = json.loads(item["p"])
+            items.append(item)
+        next_cursor = items[-1]["id"] if len(items) == count else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def requeue_dead(self, count: int = 100) -> int:
+        """Move the oldest dead jobs back onto the queue, e.g. after an outage; returns how many"""
+        client = redis_manager.redis
+        entries = client.xrange(self.dead_stream, count=max(1, min(count, 1000)))
+        for entry_id, fields in entries:
+            pipe = client.pipeline(transaction=True)
+            requeued = {"k": fields[b"k"], "p": fields[b"p"]}
+            if b"t" in fields:
+                requeued["t"] = fields[b"t"]
+            pipe.xadd(self.stream, requeued, maxlen=self.max_length, approximate=True)
+            pipe.xdel(self.dead_stream, entry_id)
+            pipe.execute()
+        return len(entries)
+
+    def stats(self) -> Dict[str, object]:
+        """Backlog in Redis plus this process' counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["consumers"] = sum(thread.is_alive() for thread in self._threads)
+        try:
+            client = redis_manager.redis
+            pipe = client.pipeline(transaction=False)
+            pipe.xlen(self.stream)
+            pipe.xpending(self.stream, self.group)
+            pipe.xlen(self.dead_stream)
+            backlog, pending, dead = pipe.execute()
+            stats["backlog"] = backlog                  # queued + in progress
+            stats["pending"] = pending["pending"]       # delivered, not yet acknowledged
+            stats["dead_letters"] = dead
+        except Exception as e:
+            stats["error"] = str(e)
+        return stats
+
+
+post_call_jobs = JobQueue(
+    "postcall",
+    workers=Config.JOB_WORKERS,
+    visibility_timeout=Config.JOB_VISIBILITY_TIMEOUT,
+    max_attempts=Config.JOB_MAX_ATTEMPTS,
+)
@@ -0,0 +1,92 @@
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Optional, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from app.core.tracing import tracer
+
+# Labels of the call being handled: (provider, language). Handlers bind them
+# per request; work handed to executors runs in a copy of the context
+_labels: contextvars.ContextVar[Tuple[str, str]] = contextvars.ContextVar(
+    "metric_labels", default=("background", "unknown")
+)
+
+# Network stages take seconds, Redis and local work milliseconds
+_STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16)
+_REDIS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 2.5)
+
+STAGE_SECONDS = Histogram(
+    "voice_agent_stage_seconds", "Time per call-handling stage",
+    ["stage", "provider", "language"], buckets=_STAGE_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "voice_agent_stage_errors_total", "Stage calls that raised",
+    ["stage", "provider", "language"],
+)
+REDIS_SECONDS = Histogram(
+    "voice_agent_redis_seconds", "Redis round trips by command (PIPELINE for pipelines)",
+    ["command", "provider", "language"], buckets=_REDIS_BUCKETS,
+)
+# Summed over live workers: compare with workers x worker_connections for saturation
+IN_FLIGHT = Gauge(
+    "voice_agent_requests_in_flight", "Requests being handled",
+    ["provider"], multiprocess_mode="livesum",
+)
+# kind: primary, hedge or failover; outcome: ok, failed, abandoned (lost a hedge race),
+# circuit_open or out_of_time (no budget left to call it)
+STT_ATTEMPTS = Counter(
+    "voice_agent_stt_attempts_total", "Recorded-turn transcription attempts by provider",
+    ["provider", "kind", "outcome"],
+)
+RATE_LIMIT_DECISIONS = Counter(
+    "voice_agent_rate_limit_decisions_total", "Call admission decisions",
+    ["provider", "decision"],
+)
+
+
+def bind(provider: Optional[str] = None, language: Optional[str] = None):
+    """Set the labels for the rest of this request (or job)"""
+    current_provider, current_language = _labels.get()
+    _labels.set((provider or current_provider, language or current_language))
+
+
+def labels() -> Tuple[str, str]:
+    return _labels.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one stage (and a span of the call's trace); an exception counts as an error and propagates"""
+    provider, language = _labels.get()
+    start = time.perf_counter()
+    try:
+        with tracer.span(name):
+            yield
+    except BaseException:
+        STAGE_ERRORS.labels(name, provider, language).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(name, provider, language).observe(time.perf_counter() - start)
+
+
+def observe_redis(command: str, seconds: float):
+    provider, language = _labels.get()
+    REDIS_SECONDS.labels(command, provider, language).observe(seconds)
+
+
+def rate_limit_decision(decision: str):
+    """"allowed", or what limited the call ("caller", "number", ...)"""
+    RATE_LIMIT_DECISIONS.labels(_labels.get()[0], decision).inc()
+
+
+def exposition() -> Tuple[bytes, str]:
+    """Prometheus text for every worker when PROMETHEUS_MULTIPROC_DIR is set, else this process"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,116 @@
+import json
+import hashlib
+import logging
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Optional
+from app.core.models import SlotID, SlotSchema
+
+logger = logging.getLogger(__name__)
+_slot_schema = SlotSchema()
+
+# Identical for every request so it forms a stable prompt prefix
+PROMPT_INSTRUCTION = """You are an expert assistant for a real estate slot-filling bot.Extract **only** the slots mentioned by the user, using only the slot keys listed below.If multiple values for a slot are present, output them as a comma-separated string in the same JSON key (e.g., "location": "Bangalore, Hyderabad").
+Normalize BHK values to "1BHK", "2BHK", etc.Output **only** valid slot keys (from the list below) and only for new or updated slots. Omit any slot not mentioned.ALWAYS extract the full facing value as heard, e.g., "East facing" or "West facing", not just "East" or "West".
+Do **not** hallucinate keys or values.Respond with **only** a valid JSON object, with no extra text or explanation."""
+
+SLOT_DESCRIPTIONS = {
+    SlotID.tenant_name: 'Name (e.g. "Amit", "Ms. Smith")',
+    SlotID.rent_or_buy: '"rent" or "buy"',
+    SlotID.location: 'Area(s), comma-separated if many',
+    SlotID.bhk_type: '"1BHK", "2BHK", "3 bed apartment", etc., or variations ("2 bed", "one bedroom"->"1BHK")',
+    SlotID.tenant_type: 'e.g. "bachelors", "family"',
+    SlotID.facing: 'Direction, e.g. "East"',
+    SlotID.floor_pref: 'Floor, e.g. "Ground", "Upper", "5th floor"',
+    SlotID.budget: 'Amount/range, e.g. "25000 to 30000"',
+    SlotID.furnishing: '"furnished", "semi-furnished", "unfurnished"',
+    SlotID.possession_date: 'date or time frame e.g., "immediately", "from July 2024", "next month", "within 15days"',
+    SlotID.profession_details: 'profession or occupation e.g., "Software Engineer", "Teacher", "Businessman"',
+}
+
+SLOT_EXAMPLES = [
+    ("I am Amit. Looking for a 2BHK rental in Kondapur.",
+     {"tenant_name": "Amit", "rent_or_buy": "rent", "bhk_type": "2BHK", "location": "Kondapur"}),
+    ("buy, semi-furnished, Bangalore, budget 75 lakhs",
+     {"rent_or_buy": "buy", "furnishing": "semi-furnished", "location": "Bangalore", "budget": "75 lakhs"}),
+    ("family, East facing, Whitefield, 3BHK",
+     {"tenant_type": "family", "facing": "East facing", "location": "Whitefield", "bhk_type": "3BHK"}),
+    ("bachelors", {"tenant_type": "bachelors"}),
+    ("20,000 to 25,000", {"budget": "20000 to 25000"}),
+    ("unfurnished 1BHK, HSR Layout, west",
+     {"furnishing": "unfurnished", "bhk_type": "1BHK", "location": "HSR Layout", "facing": "west facing"}),
+    ("Middle floor", {"floor_pref": "Middle floor"}),
+    ("Rohith", {"tenant_name": "Rohith"}),
+]
+
+# Changes whenever the instruction, descriptions or examples do, so answers
+# cached for an older prompt are not reused
+PROMPT_VERSION = hashlib.sha1(json.dumps(
+    [PROMPT_INSTRUCTION, {slot.value: text for slot, text in SLOT_DESCRIPTIONS.items()}, SLOT_EXAMPLES],
+    sort_keys=True,
+).encode()).hexdigest()[:8]
+
+
+class SlotPromptCompiler:
+    """Builds the slot-extraction system prompt once per requested slot set.
+
+    Only the descriptions and examples relevant to the slots still being asked
+    for are included; example outputs are trimmed to those slots so the model
+    is never shown keys it must not return.
+    """
+
+    @staticmethod
+    def _ordered(slots: Iterable[str]) -> List[SlotID]:
+        requested = {SlotID(slot) for slot in slots}
+        return [slot.id for slot in _slot_schema.slots if slot.id in requested]
+
+    @staticmethod
+    def _examples(requested: FrozenSet[str], max_examples: Optional[int]) -> List[str]:
+        scored = []
+        for index, (utterance, output) in enumerate(SLOT_EXAMPLES):
+            trimmed = {key: value for key, value in output.items() if key in requested}
+            if trimmed:
+                # Prefer examples that exercise more of the requested slots
+                scored.append((-len(trimmed), index, utterance, trimmed))
+        scored.sort()
+        if max_examples is not None:
+            scored = scored[:max_examples]
+        # Restore corpus order so a given slot set always renders identically
+        scored.sort(key=lambda item: item[1])
+        return [
+            f"Example {n}:\nUser: {utterance}\nOutput: {json.dumps(trimmed, separators=(',', ':'))}"
+            for n, (_, _, utterance, trimmed) in enumerate(scored, start=1)
+        ]
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _compile(requested: FrozenSet[str], max_examples: Optional[int]) -> str:
+        ordered = SlotPromptCompiler._ordered(requested)
+        descriptions = "Slot keys:\n" + "\n".join(
+            f"- {slot.value}: {SLOT_DESCRIPTIONS[slot]}" for slot in ordered
+        )
+        examples = "\n".join(SlotPromptCompiler._examples(requested, max_examples))
+        parts = [PROMPT_INSTRUCTION, descriptions]
+        if examples:
+            parts.append(examples)
+        return "\n\n".join(parts)
+
+    @staticmethod
+    def system_prompt(slots: Iterable[str], max_examples: Optional[int] = 4) -> str:
+        """Compiled system prompt for the given slot ids"""
+        requested = frozenset(getattr(slot, "value", slot) for slot in slots)
+        return SlotPromptCompiler._compile(requested, max_examples)
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _encoding():
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model("gpt-4.1-nano")
+        except KeyError:
+            # Older tiktoken releases do not know the 4.1 family; same tokenizer as gpt-4o
+            return tiktoken.get_encoding("o200k_base")
+
+    @staticmethod
+    def token_count(text: str) -> int:
+        """Prompt size in tokens, as counted by tiktoken"""
+        return len(SlotPromptCompiler._encoding().encode(text))
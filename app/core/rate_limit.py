@@ -0,0 +1,135 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+from app.config import Config
+from app.core.redis_manager import redis_manager
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# All-or-nothing take of one token from every bucket in KEYS.
+# ARGV: now, then capacity and refill rate (tokens/s) per key.
+# Each bucket is a hash of two numbers: t (tokens) and ts (last update).
+# Returns {1, 0} if allowed, else {0, index of the empty bucket, retry after ms}.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', KEYS[i], 't', 'ts')
+    local t = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    t = math.min(capacity, t + math.max(0, now - ts) * rate)
+    if t < 1 then
+        return {0, i, math.ceil((1 - t) / rate * 1000)}
+    end
+    tokens[i] = t
+end
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    redis.call('HSET', KEYS[i], 't', tokens[i] - 1, 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil(capacity / rate * 1000) + 1000)
+end
+return {1, 0}
+"""
+
+
+class Bucket(NamedTuple):
+    key: str
+    capacity: int
+    refill_per_second: float
+
+
+class RateDecision(NamedTuple):
+    allowed: bool
+    limited_by: Optional[str] = None    # bucket key that was empty
+    retry_after: float = 0.0            # seconds until it has a token again
+    local: bool = False                 # decided by the in-process pre-filter
+
+
+class TokenBucketLimiter:
+    """Token buckets in Redis, one Lua call per decision.
+
+    Buckets refill continuously at capacity per window, so bursts up to
+    capacity are allowed and sustained traffic is held to the refill rate.
+    Denials are remembered per worker until the bucket's retry-after has
+    passed; a flood against one key is then rejected without touching Redis.
+    Nothing else can add tokens to a bucket, so the local rejection is never
+    wrong, only possibly early by the clock skew between instances.
+    """
+
+    def __init__(self, max_local_keys: int = 10000, local_prefilter: bool = True):
+        self.max_local_keys = max_local_keys
+        self.local_prefilter = local_prefilter
+        self._denied_until: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _locally_denied(self, buckets: List[Bucket], now: float) -> Optional[RateDecision]:
+        with self._lock:
+            for bucket in buckets:
+                until = self._denied_until.get(bucket.key)
+                if until is None:
+                    continue
+                if until > now:
+                    return RateDecision(False, bucket.key, until - now, local=True)
+                del self._denied_until[bucket.key]
+        return None
+
+    def _remember_denial(self, key: str, until: float):
+        with self._lock:
+            self._denied_until[key] = until
+            self._denied_until.move_to_end(key)
+            while len(self._denied_until) > self.max_local_keys:
+                self._denied_until.popitem(last=False)
+
+    def allow(self, buckets: List[Bucket]) -> RateDecision:
+        """Take one token from every bucket, or from none if any is empty"""
+        now = time.time()
+        if self.local_prefilter:
+            denied = self._locally_denied(buckets, now)
+            if denied:
+                return denied
+
+        args = [now]
+        for bucket in buckets:
+            args += [bucket.capacity, bucket.refill_per_second]
+        result = redis_manager.script(TOKEN_BUCKET_SCRIPT)(
+            keys=[bucket.key for bucket in buckets], args=args, client=redis_manager.redis
+        )
+        if result[0]:
+            return RateDecision(True)
+
+        key = buckets[result[1] - 1].key
+        retry_after = result[2] / 1000
+        if self.local_prefilter:
+            self._remember_denial(key, now + retry_after)
+        return RateDecision(False, key, retry_after)
+
+
+def _bucket(key: str, capacity: int, window: int) -> Bucket:
+    return Bucket(key, capacity, capacity / window)
+
+
+call_limiter = TokenBucketLimiter(Config.RATE_LIMIT_LOCAL_KEYS)
+
+
+def allow_call(user_mobile: str, virtual_number: str) -> RateDecision:
+    """Admission check for an incoming call: per caller and per dialled number"""
+    buckets: List[Bucket] = []
+    if user_mobile:
+        buckets.append(_bucket(f"ratelimit:caller:{user_mobile}",
+                               Config.RATE_LIMIT_CALLER_CAPACITY, Config.RATE_LIMIT_CALLER_WINDOW))
+    if virtual_number:
+        buckets.append(_bucket(f"ratelimit:number:{virtual_number}",
+                               Config.RATE_LIMIT_NUMBER_CAPACITY, Config.RATE_LIMIT_NUMBER_WINDOW))
+    if not buckets:
+        return RateDecision(True)
+    with metrics.stage("rate_limit"):
+        decision = call_limiter.allow(buckets)
+    # "allowed", or the bucket kind that refused the call ("caller", "number")
+    metrics.rate_limit_decision("allowed" if decision.allowed else decision.limited_by.split(":")[1])
+    return decision
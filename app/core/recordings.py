@@ -0,0 +1,203 @@
+import json
+import time
+import contextvars
+import logging
+from typing import Optional
+from app.config import Config
+from app.core.models import TranscriptionResult
+from app.core.redis_manager import redis_manager
+from app.core import deadline
+from app.core.services import CloudRunOptimizedService
+
+logger = logging.getLogger(__name__)
+# High-volume per-turn detail, sampled by LOG_SAMPLE_RATES
+verbose_logger = logging.getLogger(f"{__name__}.verbose")
+
+# Longest single BLPOP; must stay below the Redis socket timeout
+_MAX_BLOCK_SECONDS = 1.0
+
+
+def _wait_for_value(value_key: str, notify_key: str, timeout: float) -> Optional[bytes]:
+    """Wait until value_key is set, woken by pushes to notify_key; gives up at the request's deadline"""
+    client = redis_manager.redis
+    left = deadline.remaining()
+    if left is not None:
+        timeout = min(timeout, left)
+    wait_until = time.time() + timeout
+    while True:
+        value = client.get(value_key)
+        if value is not None:
+            return value
+        remaining = wait_until - time.time()
+        if remaining <= 0:
+            return None
+        popped = client.blpop([notify_key], timeout=min(remaining, _MAX_BLOCK_SECONDS))
+        if popped is not None:
+            # Hand the token on so any other waiter wakes up too
+            client.lpush(notify_key, popped[1])
+
+
+def _notify(value_key: str, notify_key: str, value, ttl: int) -> None:
+    """Store value_key and wake its waiters"""
+    pipe = redis_manager.redis.pipeline(transaction=False)
+    pipe.set(value_key, value, ex=ttl)
+    pipe.lpush(notify_key, 1)
+    pipe.expire(notify_key, ttl)
+    pipe.execute()
+
+
+class RecordingReadiness:
+    """Per-recording readiness notification between the two Twilio callbacks.
+
+    Twilio calls the Record action URL (/process-recording) as soon as the
+    caller stops talking, but the media is only downloadable once the
+    recordingStatusCallback (/recording-status) fires. The status callback
+    signals here and the action handler blocks on the signal, so the
+    download starts the moment the recording exists.
+    """
+
+    READY_KEY = "recording:ready:{}"
+    NOTIFY_KEY = "recording:notify:{}"
+
+    @staticmethod
+    def signal(recording_key: str, status: str = "completed") -> None:
+        """Mark a recording as available and wake any waiting handler"""
+        _notify(
+            RecordingReadiness.READY_KEY.format(recording_key),
+            RecordingReadiness.NOTIFY_KEY.format(recording_key),
+            status,
+            Config.RECORDING_READY_TTL
+        )
+
+    @staticmethod
+    def wait(recording_key: str, timeout: float) -> Optional[str]:
+        """Block until the recording is signalled; returns its status, or None on timeout"""
+        try:
+            status = _wait_for_value(
+                RecordingReadiness.READY_KEY.format(recording_key),
+                RecordingReadiness.NOTIFY_KEY.format(recording_key),
+                timeout
+            )
+            return status.decode() if status is not None else None
+        except Exception as e:
+            logger.warning(f"Readiness wait failed for {recording_key}: {e}")
+            return None
+
+
+class SpeculativeTranscription:
+    """Transcription started from /recording-status and shared with /process-recording.
+
+    Whichever callback claims a recording first runs download + STT; the
+    result is cached under the session/recording key so the other one (on
+    any instance) picks up the finished or in-flight result instead of
+    transcribing again.
+    """
+
+    CLAIM_KEY = "stt:claim:{}:{}"
+    RESULT_KEY = "stt:result:{}:{}"
+    DONE_KEY = "stt:done:{}:{}"
+
+    @staticmethod
+    def _claim(session_id: str, recording_key: str, timeout: float) -> bool:
+        """Take ownership of transcribing a recording"""
+        try:
+            return bool(redis_manager.redis.set(
+                SpeculativeTranscription.CLAIM_KEY.format(session_id, recording_key),
+                1, nx=True, ex=int(timeout) + 5
+            ))
+        except Exception as e:
+            # Without Redis coordination, transcribe locally
+            logger.warning(f"Transcription claim failed for {recording_key}: {e}")
+            return True
+
+    @staticmethod
+    def start(session_id: str, recording_key: str, recording_url: str, timeout: float) -> bool:
+        """Kick off download + transcription in the background unless already claimed"""
+        if not SpeculativeTranscription._claim(session_id, recording_key, timeout):
+            return False
+        executor, _ = CloudRunOptimizedService._runtime()
+        executor.submit(contextvars.copy_context().run,
+                        SpeculativeTranscription._run, session_id, recording_key, recording_url, timeout)
+        verbose_logger.info(f"Speculative transcription started for {session_id}/{recording_key}")
+        return True
+
+    @staticmethod
+    def _run(session_id: str, recording_key: str, recording_url: str, timeout: float):
+        """Background body: transcribe and publish the result (or the failure)"""
+        t0 = time.time()
+        try:
+            # Already on the STT executor, so run the flow directly
+            result = CloudRunOptimizedService._transcribe_flow(recording_url, timeout)
+            payload = result.model_dump_json()
+            verbose_logger.info(f"Speculative transcription for {recording_key} finished in {time.time() - t0:.3f}s")
+        except Exception as e:
+            logger.error(f"Speculative transcription failed for {recording_key}: {e}")
+            payload = json.dumps({"error": str(e)})
+
+        try:
+            _notify(
+                SpeculativeTranscription.RESULT_KEY.format(session_id, recording_key),
+                SpeculativeTranscription.DONE_KEY.format(session_id, recording_key),
+                payload,
+                Config.STT_RESULT_TTL
+            )
+        except Exception as e:
+            logger.error(f"Failed to publish transcription for {recording_key}: {e}")
+
+    @staticmethod
+    def _parse(raw: Optional[bytes]) -> Optional[TranscriptionResult]:
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        if "error" in data:
+            return None
+        return TranscriptionResult.model_validate(data)
+
+    @staticmethod
+    def get(session_id: str, recording_key: str) -> Optional[TranscriptionResult]:
+        """Finished speculative result, if any"""
+        try:
+            raw = redis_manager.redis.get(SpeculativeTranscription.RESULT_KEY.format(session_id, recording_key))
+            return SpeculativeTranscription._parse(raw)
+        except Exception as e:
+            logger.warning(f"Transcription lookup failed for {recording_key}: {e}")
+            return None
+
+    @staticmethod
+    def wait(session_id: str, recording_key: str, timeout: float) -> Optional[TranscriptionResult]:
+        """Wait for an in-flight speculative result; None if it failed or timed out"""
+        try:
+            raw = _wait_for_value(
+                SpeculativeTranscription.RESULT_KEY.format(session_id, recording_key),
+                SpeculativeTranscription.DONE_KEY.format(session_id, recording_key),
+                timeout
+            )
+            return SpeculativeTranscription._parse(raw)
+        except Exception as e:
+            logger.warning(f"Transcription wait failed for {recording_key}: {e}")
+            return None
+
+    @staticmethod
+    def resolve(session_id: str, recording_key: str, recording_url: str, timeout: float) -> TranscriptionResult:
+        """Transcription for a recording, reusing the speculative run when there is one"""
+        result = SpeculativeTranscription.get(session_id, recording_key)
+        if result is not None:
+            verbose_logger.info(f"Using speculative transcription for {recording_key}")
+            return result
+
+        # Wait for /recording-status to signal the media exists before downloading
+        ready_status = RecordingReadiness.wait(recording_key, Config.RECORDING_READY_TIMEOUT)
+        if ready_status is None:
+            logger.info(f"No readiness signal for {recording_key} after {Config.RECORDING_READY_TIMEOUT}s, falling back to polling")
+        elif ready_status != "completed":
+            logger.warning(f"Recording {recording_key} reported status {ready_status}")
+
+        if not SpeculativeTranscription._claim(session_id, recording_key, timeout):
+            # /recording-status is already transcribing this recording
+            result = SpeculativeTranscription.wait(session_id, recording_key, timeout)
+            if result is not None:
+                verbose_logger.info(f"Using in-flight speculative transcription for {recording_key}")
+                return result
+            logger.warning(f"Speculative transcription unavailable for {recording_key}, transcribing inline")
+
+        return CloudRunOptimizedService.transcribe_audio(recording_url, timeout)
@@ -0,0 +1,158 @@
+import time
+import logging
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.client import Pipeline
+from redis.commands.core import Script
+from redis.retry import Retry
+from app.config import Config
+from app.core.circuit_breaker import CircuitBreaker
+from app.core import metrics
+from app.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(redis.ConnectionError):
+    """No pooled connection came free within REDIS_POOL_TIMEOUT; Redis itself may be fine"""
+
+
+class GuardedConnectionPool(redis.BlockingConnectionPool):
+    """Blocking pool that tells an exhausted pool apart from an unreachable Redis"""
+
+    def get_connection(self, *args, **kwargs):
+        try:
+            return super().get_connection(*args, **kwargs)
+        except redis.ConnectionError as e:
+            # redis-py raises a plain ConnectionError when the pool's queue stays empty
+            if str(e) == "No connection available.":
+                raise PoolExhaustedError(f"No Redis connection free after {self.timeout}s") from e
+            raise
+
+
+class GuardedPipeline(Pipeline):
+    """Pipeline whose execute() goes through the manager's circuit breaker"""
+
+    breaker: CircuitBreaker = None
+
+    def execute(self, raise_on_error: bool = True):
+        # Pipeline.execute resets the command stack, so count before running it
+        commands = len(self.command_stack)
+        start = time.perf_counter()
+        try:
+            return self.breaker.call(super().execute, raise_on_error)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe_redis("PIPELINE", elapsed)
+            tracer.record("redis PIPELINE", time.time() - elapsed, elapsed, commands=commands)
+
+
+class GuardedRedis(redis.Redis):
+    """Redis client whose commands and pipelines go through a circuit breaker"""
+
+    breaker: CircuitBreaker = None
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return self.breaker.call(super().execute_command, *args, **options)
+        finally:
+            elapsed = time.perf_counter() - start
+            command = str(args[0]).upper()
+            metrics.observe_redis(command, elapsed)
+            tracer.record(f"redis {command}", time.time() - elapsed, elapsed)
+
+    def pipeline(self, transaction=True, shard_hint=None) -> Pipeline:
+        pipe = GuardedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipe.breaker = self.breaker
+        return pipe
+
+
+# Redis connection with retry logic and health monitoring
+class RedisManager:
+    """Process-wide Redis client.
+
+    Health is detected passively instead of with a PING per access: the pool
+    checks idle connections every health_check_interval seconds, commands are
+    retried once on a fresh connection after connection errors, and a
+    circuit breaker fails fast (CircuitOpenError) while Redis is unreachable,
+    probing again after REDIS_BREAKER_RESET seconds.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._pool = None
+        self._redis = None
+        self._scripts = {}
+        self.breaker = CircuitBreaker(
+            "redis",
+            failure_threshold=config.REDIS_BREAKER_THRESHOLD,
+            reset_timeout=config.REDIS_BREAKER_RESET,
+            failure_exceptions=(redis.ConnectionError, redis.TimeoutError),
+            # Connections held by BLPOP/XREADGROUP waits can exhaust the pool
+            # while Redis is healthy; that must not open the breaker
+            ignored_exceptions=(PoolExhaustedError,),
+        )
+        self._initialize_connection()
+    
+    def _initialize_connection(self):
+        """Initialize Redis connection with retry logic"""
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                # Blocking pool: under cooperative workers many requests share
+                # one process, so callers wait for a free connection instead
+                # of failing with "Too many connections"
+                self._pool = GuardedConnectionPool.from_url(
+                    self.config.REDIS_URL,
+                    max_connections=self.config.REDIS_MAX_CONNECTIONS,
+                    timeout=self.config.REDIS_POOL_TIMEOUT,
+                    socket_connect_timeout=self.config.REDIS_CONNECT_TIMEOUT,
+                    socket_timeout=self.config.REDIS_SOCKET_TIMEOUT,
+                    socket_keepalive=True,
+                    socket_keepalive_options={},
+                    health_check_interval=self.config.REDIS_HEALTH_CHECK_INTERVAL,
+                    # Reconnect and retry on a fresh connection instead of pinging up front
+                    retry=Retry(ExponentialBackoff(cap=0.5, base=0.05), self.config.REDIS_RETRIES),
+                    retry_on_error=[redis.ConnectionError, redis.TimeoutError],
+                )
+                client = GuardedRedis(connection_pool=self._pool, decode_responses=False)
+                client.breaker = self.breaker
+                # Test connection
+                client.ping()
+                self._redis = client
+                logger.info("Redis connection established successfully")
+                break
+            except Exception as e:
+                logger.error(f"Redis connection attempt {attempt + 1} failed: {e}")
+                if attempt == max_retries - 1:
+                    raise ConnectionError(f"Failed to connect to Redis after {max_retries} attempts")
+                time.sleep(2 ** attempt)  # Exponential backoff
+    
+    @property
+    def redis(self) -> redis.Redis:
+        """Shared Redis client"""
+        return self._redis
+    
+    def script(self, source: str) -> Script:
+        """Lua script run with EVALSHA (loaded on first use), one object per source"""
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = Script(self._redis, source)
+        return script
+
+    def ping(self) -> float:
+        """Round-trip time of one PING in milliseconds; raises if Redis is unreachable"""
+        start = time.time()
+        self._redis.ping()
+        return round((time.time() - start) * 1000, 2)
+
+    def is_healthy(self) -> bool:
+        """Check Redis health"""
+        try:
+            self.ping()
+            return True
+        except Exception:
+            return False
+
+redis_manager = RedisManager(Config())
@@ -0,0 +1,108 @@
+import re
+import logging
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-request fields in a template source: ${base_url}, ${ws_base}, ${session_id}
+FIELD = re.compile(r"\$\{(\w+)\}")
+REQUEST_FIELDS = ("base_url", "ws_base", "session_id")
+# Generated session ids (uuid4) need no escaping in XML or JSON
+SAFE_SESSION_ID = re.compile(r"[0-9A-Za-z-]{1,100}")
+
+
+class ResponseTemplate:
+    """A response source split around its ${...} request fields"""
+
+    __slots__ = ("_chunks", "_fields")
+
+    def __init__(self, source: str):
+        parts = FIELD.split(source)
+        self._chunks = parts[::2]
+        self._fields = parts[1::2]
+        unknown = set(self._fields) - set(REQUEST_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown template fields: {sorted(unknown)}")
+
+    def bind(self, values: Dict[str, str]) -> Tuple[bytes, ...]:
+        """Fill in everything but the session id: the byte chunks to join with it"""
+        pieces, text = [], [self._chunks[0]]
+        for field, chunk in zip(self._fields, self._chunks[1:]):
+            if field == "session_id":
+                pieces.append("".join(text).encode())
+                text = [chunk]
+            else:
+                text += [values[field], chunk]
+        pieces.append("".join(text).encode())
+        return tuple(pieces)
+
+
+class ResponseTemplates:
+    """One provider's responses, precompiled per shape and prompt.
+
+    `shapes` maps a shape name ("record", "hangup", ...) to a function that
+    takes the prompt (an audio URL, or text for spoken responses), validates
+    it and returns the response source with ${...} request fields. Every
+    known prompt is compiled when the catalog is built, anything else on
+    first use. The first response for a public base URL binds it into byte
+    chunks, so later responses are one bytes.join with the session id.
+    """
+
+    def __init__(self, name: str, shapes: Dict[str, Callable[[str], str]],
+                 escape: Callable[[str], str], prompts: Iterable[Tuple[str, str]] = (),
+                 max_entries: int = 4000):
+        self.name = name
+        self.shapes = shapes
+        self.escape = escape
+        self.max_entries = max_entries
+        self._templates: Dict[Tuple[str, str], ResponseTemplate] = {}
+        self._bound: Dict[Tuple[str, str, Optional[str]], Tuple[bytes, ...]] = {}
+        self._lock = threading.Lock()
+        for shape, prompt in prompts:
+            self._templates[(shape, prompt)] = ResponseTemplate(shapes[shape](prompt))
+        logger.info(f"{name}: {len(self._templates)} response templates compiled")
+
+    def _template(self, shape: str, prompt: str) -> ResponseTemplate:
+        template = self._templates.get((shape, prompt))
+        if template is None:
+            template = ResponseTemplate(self.shapes[shape](prompt))
+            with self._lock:
+                if len(self._templates) < self.max_entries:
+                    self._templates[(shape, prompt)] = template
+        return template
+
+    def _bind(self, shape: str, prompt: str, base_url: Optional[str]) -> Tuple[bytes, ...]:
+        values = {}
+        if base_url is not None:
+            if not base_url.startswith(("https://", "http://")) or len(base_url) > 400:
+                raise ValueError("Invalid base URL")
+            values["base_url"] = self.escape(base_url)
+            values["ws_base"] = self.escape("ws" + base_url[4:])  # https -> wss, http -> ws
+        bound = self._template(shape, prompt).bind(values)
+        with self._lock:
+            if len(self._bound) < self.max_entries:
+                self._bound[(shape, prompt, base_url)] = bound
+        return bound
+
+    def render(self, shape: str, prompt: str, base_url: Optional[str] = None,
+               session_id: Optional[str] = None) -> bytes:
+        with metrics.stage("render"):
+            return self._render(shape, prompt, base_url, session_id)
+
+    def _render(self, shape: str, prompt: str, base_url: Optional[str],
+                session_id: Optional[str]) -> bytes:
+        bound = self._bound.get((shape, prompt, base_url))
+        if bound is None:
+            bound = self._bind(shape, prompt, base_url)
+        if len(bound) == 1:
+            return bound[0]
+        if session_id and SAFE_SESSION_ID.fullmatch(session_id):
+            return session_id.encode().join(bound)
+        if not session_id or len(session_id) > 100:
+            raise ValueError("Invalid session ID")
+        return self.escape(session_id).encode().join(bound)
+
+    def stats(self) -> Dict[str, int]:
+        return {"templates": len(self._templates), "bound": len(self._bound)}
@@ -0,0 +1,103 @@
+from typing import Dict, Optional, Tuple
+from app.core.models import UserSession, SlotSchema
+
+# Bump when the field layout changes; decode() keeps reading older formats
+CODEC_VERSION = 1
+FORMAT_FIELD = "f"
+VERSION_FIELD = "v"
+
+# UserSession field -> hash field. Short names are append-only: never reuse
+# one for a different field. session_id is not stored, it is the key.
+FIELDS = {
+    "language": "l",
+    "call_start_time": "c",
+    "last_interaction_time": "t",
+    "interaction_count": "n",
+    "user_mobile": "u",
+    "virtual_number": "d",
+    "end_of_conversation": "e",
+    "slot_retry_count": "r",
+}
+
+# Slots are stored under their SlotSchema position (s0, s1, ...); new slots
+# must be appended to the schema. Keys outside the schema keep their name.
+SLOT_FIELDS = {slot.id.value: f"s{index}" for index, slot in enumerate(SlotSchema().slots)}
+EXTRA_SLOT_PREFIX = "x:"
+
+_DECODE_FIELDS = {short.encode(): name for name, short in FIELDS.items()}
+_DECODE_SLOTS = {short.encode(): slot for slot, short in SLOT_FIELDS.items()}
+_EXTRA = EXTRA_SLOT_PREFIX.encode()
+_FORMAT = str(CODEC_VERSION).encode()
+_VERSION = VERSION_FIELD.encode()
+
+# Layout written before the compact codec (full field names, "slot:<id>")
+_LEGACY_SLOT_PREFIX = "slot:"
+
+
+def slot_field(slot) -> str:
+    slot = getattr(slot, "value", slot)
+    return SLOT_FIELDS.get(slot) or EXTRA_SLOT_PREFIX + slot
+
+
+def _encode_value(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def encode(session: UserSession) -> Dict[str, str]:
+    """Hash fields for a session (without the version stamp)"""
+    mapping = {FORMAT_FIELD: str(CODEC_VERSION)}
+    for name, short in FIELDS.items():
+        value = getattr(session, name)
+        if value is not None:
+            mapping[short] = _encode_value(value)
+    for slot, value in session.slots_filled.items():
+        if value is not None:
+            mapping[slot_field(slot)] = str(value)
+    return mapping
+
+
+def decode(session_id: str, raw: Dict[bytes, bytes]) -> Tuple[Optional[int], UserSession]:
+    """(version, session) from HGETALL output.
+
+    Current-format hashes go straight from the stored strings to
+    pydantic-core's lax validation (numbers and "1"/"0" booleans coerced in
+    one pass); older layouts come back without a version so the caller
+    rewrites them.
+    """
+    if raw.get(FORMAT_FIELD.encode()) != _FORMAT:
+        return None, _decode_legacy(session_id, raw)
+
+    values = {"session_id": session_id}
+    slots = {}
+    version = None
+    for field, value in raw.items():
+        name = _DECODE_FIELDS.get(field)
+        if name is not None:
+            values[name] = value.decode()
+            continue
+        slot = _DECODE_SLOTS.get(field)
+        if slot is not None:
+            slots[slot] = value.decode()
+        elif field == _VERSION:
+            version = int(value)
+        elif field.startswith(_EXTRA):
+            slots[field[len(_EXTRA):].decode()] = value.decode()
+    values["slots_filled"] = slots
+    # model_construct would skip validation but runs in Python and is slower
+    return version, UserSession.model_validate(values)
+
+
+def _decode_legacy(session_id: str, raw: Dict[bytes, bytes]) -> UserSession:
+    fields, slots = {"session_id": session_id}, {}
+    for field, value in raw.items():
+        field, value = field.decode(), value.decode()
+        if field.startswith(_LEGACY_SLOT_PREFIX):
+            slots[field[len(_LEGACY_SLOT_PREFIX):]] = value
+        elif field != "version":
+            fields[field] = value
+    fields["slots_filled"] = slots
+    return UserSession.model_validate(fields)
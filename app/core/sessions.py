@@ -0,0 +1,284 @@
+import time
+import json
+import logging
+import redis
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.config import Config
+from app.core.models import UserSession
+from app.core.redis_manager import redis_manager
+from app.core import session_codec
+from app.utils.exceptions import SessionError
+
+logger = logging.getLogger(__name__)
+config = Config()
+
+SESSION_KEY = "session:{}"
+
+# One round trip per caller turn: expiry and max-interaction checks, the
+# interaction count, language and slot merge, version bump, TTL refresh.
+# ARGV: now, timeout, max interactions, language, expected version, then
+# (hash field, value) per slot. Field names are session_codec's.
+# Returns {status}, or {0, version, count} when the caller's copy was at the
+# expected version, else {0, version, count, HGETALL}.
+APPLY_TURN_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local last = redis.call('HGET', key, 't')
+if not last then
+    return {1}
+end
+if now - tonumber(last) > tonumber(ARGV[2]) then
+    redis.call('DEL', key)
+    return {2}
+end
+local count = redis.call('HINCRBY', key, 'n', 1)
+if count > tonumber(ARGV[3]) then
+    redis.call('DEL', key)
+    return {3}
+end
+redis.call('HSET', key, 't', ARGV[1])
+if ARGV[4] ~= '' then
+    redis.call('HSET', key, 'l', ARGV[4])
+end
+for i = 6, #ARGV, 2 do
+    redis.call('HSET', key, ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', key, ARGV[2])
+local version = redis.call('HINCRBY', key, 'v', 1)
+if tonumber(ARGV[5]) == version - 1 then
+    return {0, version, count}
+end
+return {0, version, count, redis.call('HGETALL', key)}
+"""
+
+_TURN_ERRORS = {1: "Session expired", 2: "Session expired", 3: "Maximum interactions exceeded"}
+
+
+def _new_version() -> int:
+    # Starts at the creation time in microseconds (exact in Lua's doubles),
+    # so a re-created session never reuses an old session's versions
+    return time.time_ns() // 1000
+
+
+class SessionCache:
+    """Per-worker copies of recent sessions, stamped with their Redis version.
+
+    A copy is only used after checking that the version stored in Redis still
+    matches, so a turn handled by another worker or instance in between is
+    always seen. Callers get a copy they are free to mutate.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, UserSession]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale": 0, "misses": 0}
+
+    @staticmethod
+    def _copy(session: UserSession) -> UserSession:
+        return session.model_copy(update={"slots_filled": dict(session.slots_filled)})
+
+    def get(self, session_id: str) -> Optional[Tuple[int, UserSession]]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+            return entry
+
+    def put(self, session_id: str, version: Optional[int], session: UserSession):
+        if version is None:
+            return
+        with self._lock:
+            current = self._entries.get(session_id)
+            if current is not None and current[0] > version:
+                return  # a concurrent turn already cached a newer copy
+            self._entries[session_id] = (version, self._copy(session))
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else None
+        return stats
+
+
+_session_cache = SessionCache(Config.SESSION_CACHE_SIZE)
+
+
+class SessionManager:
+    """Production-ready session management with comprehensive error handling.
+
+    A session is a Redis hash in session_codec's compact layout: scalar
+    UserSession fields, one field per filled slot and a version stamp bumped
+    by every write. Turns are
+    applied server side by APPLY_TURN_SCRIPT, so concurrent callbacks for the
+    same call never retry or rewrite the whole document. Each worker keeps
+    its last copy of a session in SessionCache and reuses it while the
+    version in Redis matches.
+    """
+
+    @staticmethod
+    def get_session(session_id: str) -> Optional[UserSession]:
+        """Get session data with validation and error handling"""
+        if not session_id or len(session_id) > 100:  # Validate session ID
+            raise SessionError("Invalid session ID")
+
+        try:
+            session_data = SessionManager._load(session_id)
+            if session_data is None:
+                return None
+
+            # Validate session hasn't expired
+            if time.time() - session_data.last_interaction_time > config.SESSION_TIMEOUT:
+                SessionManager.delete_session(session_id)
+                return None
+
+            # Check for too many interactions (potential abuse)
+            if session_data.interaction_count > config.MAX_INTERACTIONS:
+                logger.warning(f"Session {session_id} exceeded max interactions")
+                SessionManager.delete_session(session_id)
+                return None
+
+            return session_data
+
+        except ValueError as e:
+            logger.error(f"Invalid session data {session_id}: {e}")
+            SessionManager.delete_session(session_id)
+            return None
+        except Exception as e:
+            logger.error(f"Error retrieving session {session_id}: {e}")
+            return None
+
+    @staticmethod
+    def _load(session_id: str) -> Optional[UserSession]:
+        """Current session: the cached copy if its version is still current, else Redis"""
+        key = SESSION_KEY.format(session_id)
+        cached = _session_cache.get(session_id)
+        if cached is not None:
+            version = redis_manager.redis.hget(key, session_codec.VERSION_FIELD)
+            if version is not None and int(version) == cached[0]:
+                _session_cache.count("hits")
+                return SessionCache._copy(cached[1])
+            _session_cache.count("stale")
+            _session_cache.discard(session_id)
+        else:
+            _session_cache.count("misses")
+
+        try:
+            raw = redis_manager.redis.hgetall(key)
+        except redis.ResponseError as e:
+            if "WRONGTYPE" not in str(e):
+                raise
+            raw = SessionManager._migrate_legacy(session_id)
+        if not raw:
+            return None
+
+        version, session_data = session_codec.decode(session_id, raw)
+        if version is None:
+            # Written in an older layout: rewrite it so the turn script can update it
+            SessionManager.save_session(session_id, session_data)
+            logger.info(f"Session {session_id} rewritten in codec v{session_codec.CODEC_VERSION}")
+        else:
+            _session_cache.put(session_id, version, session_data)
+        return session_data
+
+    @staticmethod
+    def _migrate_legacy(session_id: str) -> Dict[bytes, bytes]:
+        """Convert a session written as one JSON blob (before the hash layout)"""
+        val = redis_manager.redis.get(SESSION_KEY.format(session_id))
+        if not val:
+            return {}
+        session_data = UserSession.model_validate(json.loads(val))
+        SessionManager.save_session(session_id, session_data)
+        logger.info(f"Session {session_id} migrated to hash layout")
+        return redis_manager.redis.hgetall(SESSION_KEY.format(session_id))
+
+    @staticmethod
+    def save_session(session_id: str, data: UserSession) -> bool:
+        """Write the whole session (used when a call starts)"""
+        if not session_id or not data:
+            return False
+
+        try:
+            # Validate data before saving
+            if not hasattr(data, 'session_id') or data.session_id != session_id:
+                raise SessionError("Session ID mismatch")
+
+            key = SESSION_KEY.format(session_id)
+            version = _new_version()
+            pipe = redis_manager.redis.pipeline()
+            pipe.delete(key)
+            pipe.hset(key, mapping={**session_codec.encode(data), session_codec.VERSION_FIELD: version})
+            pipe.expire(key, config.SESSION_TIMEOUT)
+            pipe.execute()
+            _session_cache.put(session_id, version, data)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving session {session_id}: {e}")
+            return False
+
+    @staticmethod
+    def apply_turn(session_id: str, slots: Dict[str, str], language: Optional[str] = None) -> UserSession:
+        """Count one interaction and merge its slots atomically; returns the updated session"""
+        now = round(time.time(), 3)
+        merged = {getattr(slot, "value", slot): str(value) for slot, value in slots.items() if value is not None}
+        cached = _session_cache.get(session_id)
+        args = [f"{now:.3f}", config.SESSION_TIMEOUT, config.MAX_INTERACTIONS, language or "",
+                cached[0] if cached else -1]
+        for slot, value in merged.items():
+            args += [session_codec.slot_field(slot), value]
+
+        result = redis_manager.script(APPLY_TURN_SCRIPT)(
+            keys=[SESSION_KEY.format(session_id)], args=args, client=redis_manager.redis
+        )
+        status = result[0]
+        if status:
+            _session_cache.discard(session_id)
+            raise SessionError(_TURN_ERRORS[status])
+
+        version, count = int(result[1]), int(result[2])
+        if len(result) > 3:
+            # Someone else wrote since our copy (or we had none): take Redis' view
+            fields = result[3]
+            _, session_data = session_codec.decode(session_id, dict(zip(fields[::2], fields[1::2])))
+        else:
+            # Our copy was current; apply the same update locally instead of re-reading
+            session = cached[1]
+            session_data = session.model_copy(update={
+                "interaction_count": count,
+                "last_interaction_time": now,
+                "language": language or session.language,
+                "slots_filled": {**session.slots_filled, **merged},
+            })
+        _session_cache.put(session_id, version, session_data)
+        return session_data
+
+    @staticmethod
+    def delete_session(session_id: str) -> bool:
+        """Delete session with error handling"""
+        _session_cache.discard(session_id)
+        try:
+            redis_manager.redis.delete(SESSION_KEY.format(session_id))
+            logger.info(f"Session {session_id} deleted")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting session {session_id}: {e}")
+            return False
+
+    @staticmethod
+    def cache_stats() -> Dict[str, object]:
+        return _session_cache.stats()
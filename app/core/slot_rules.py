@@ -0,0 +1,255 @@
+import re
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from app.core.models import SlotID, SlotSchema
+
+logger = logging.getLogger(__name__)
+_slot_schema = SlotSchema()
+
+
+class SlotMatch(NamedTuple):
+    value: str
+    confidence: float
+    span: Tuple[int, int]
+
+
+class FastPathResult(NamedTuple):
+    values: Dict[str, str]          # slot id -> normalized value
+    confidence: Dict[str, float]    # slot id -> rule confidence
+    needs_llm: bool                 # transcript carries information the rules did not explain
+
+
+# Rule helpers ---------------------------------------------------------------
+
+_NUMBER_WORDS = {
+    "one": 1, "single": 1, "two": 2, "double": 2, "three": 3, "four": 4, "five": 5,
+}
+_DIRECTIONS = r"(north|south|east|west)(?:[\s-]?(east|west))?"
+_MONTHS = (r"(january|february|march|april|may|june|july|august|september|"
+           r"october|november|december|jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec)")
+
+
+_RENT = re.compile(r"\b(rent|rental|renting|lease|kiraya|kiraye)\b")
+_BUY = re.compile(r"\b(buy|buying|purchase|purchasing|kharid\w*)\b")
+
+
+def _rent_or_buy(text: str, expected: bool) -> Optional[SlotMatch]:
+    rent, buy = _RENT.search(text), _BUY.search(text)
+    if rent and buy:
+        return None  # "rent or buy?" style answers go to the LLM
+    match = rent or buy
+    if not match:
+        return None
+    return SlotMatch("rent" if rent else "buy", 0.95, match.span())
+
+
+_BHK = re.compile(r"\b(\d|one|single|two|double|three|four|five)\s*-?\s*(bhk|b\s?h\s?k|bed\s?rooms?|beds?)\b")
+_BARE_BHK = re.compile(r"^\W*(\d|one|single|two|double|three|four|five)\W*$")
+
+
+def _bhk_type(text: str, expected: bool) -> Optional[SlotMatch]:
+    match = _BHK.search(text)
+    if match:
+        count = match.group(1)
+        # "2 bhk" is unambiguous; "2 bed" is slightly less so
+        confidence = 0.95 if "h" in match.group(2) else 0.9
+        return SlotMatch(f"{_NUMBER_WORDS.get(count, count)}BHK", confidence, match.span())
+    # A bare "one" or "2" only means bedrooms when that is what we asked for
+    match = _BARE_BHK.search(text) if expected else None
+    if match:
+        count = match.group(1)
+        return SlotMatch(f"{_NUMBER_WORDS.get(count, count)}BHK", 0.85, match.span())
+    return None
+
+
+_FACING = re.compile(rf"\b{_DIRECTIONS}\s*facing\b")
+_BARE_DIRECTION = re.compile(rf"^\W*{_DIRECTIONS}\W*$")
+
+
+def _facing_value(first: str, second: Optional[str]) -> str:
+    direction = first.capitalize() + (f"-{second.capitalize()}" if second else "")
+    return f"{direction} facing"
+
+
+def _facing(text: str, expected: bool) -> Optional[SlotMatch]:
+    match = _FACING.search(text)
+    if match:
+        return SlotMatch(_facing_value(match.group(1), match.group(2)), 0.95, match.span())
+    # A bare "east" only means facing when that is what we asked for
+    match = _BARE_DIRECTION.search(text) if expected else None
+    if match:
+        return SlotMatch(_facing_value(match.group(1), match.group(2)), 0.85, match.span())
+    return None
+
+
+_FURNISHING = [
+    (re.compile(r"\bsemi[\s-]?furnished\b"), "semi-furnished"),
+    (re.compile(r"\b(unfurnished|un-furnished|not furnished|non[\s-]?furnished)\b"), "unfurnished"),
+    (re.compile(r"\b(fully[\s-]?)?furnished\b"), "furnished"),
+]
+
+
+def _furnishing(text: str, expected: bool) -> Optional[SlotMatch]:
+    for pattern, value in _FURNISHING:
+        match = pattern.search(text)
+        if match:
+            return SlotMatch(value, 0.95, match.span())
+    return None
+
+
+_TENANT_TYPE = [
+    (re.compile(r"\b(bachelor boys|bachelor girls|bachelors?)\b"), "bachelors"),
+    (re.compile(r"\b(family|families)\b"), "family"),
+]
+
+
+def _tenant_type(text: str, expected: bool) -> Optional[SlotMatch]:
+    found = [(pattern.search(text), value) for pattern, value in _TENANT_TYPE]
+    found = [(m, v) for m, v in found if m]
+    if len(found) != 1:
+        return None
+    match, value = found[0]
+    return SlotMatch(value, 0.9, match.span())
+
+
+_FLOOR = re.compile(r"\b(ground|first|second|third|top|middle|upper|lower|higher|low|high|\d+(?:st|nd|rd|th)?)\s+floors?\b")
+_BARE_FLOOR = re.compile(r"^\W*(ground|top|middle|upper|lower|higher)\W*$")
+
+
+def _floor_pref(text: str, expected: bool) -> Optional[SlotMatch]:
+    match = _FLOOR.search(text)
+    if match:
+        return SlotMatch(f"{match.group(1).capitalize()} floor", 0.9, match.span())
+    match = _BARE_FLOOR.search(text) if expected else None
+    if match:
+        return SlotMatch(f"{match.group(1).capitalize()} floor", 0.85, match.span())
+    return None
+
+
+_AMOUNT = r"(\d[\d,]*(?:\.\d+)?)\s*(k|thousand|lakhs?|lacs?|l|crores?|cr)?\b"
+_BUDGET_RANGE = re.compile(rf"\b(?:between\s+)?{_AMOUNT}\s*(?:to|-|and)\s*{_AMOUNT}")
+_BUDGET_SINGLE = re.compile(rf"\b(?:(under|below|upto|up to|within|around|about|max|maximum)\s+)?{_AMOUNT}")
+_UNIT_NAMES = {"l": "lakhs", "lac": "lakhs", "lacs": "lakhs", "lakh": "lakhs", "lakhs": "lakhs",
+               "cr": "crore", "crore": "crore", "crores": "crore"}
+
+
+def _amount(number: str, unit: Optional[str]) -> Optional[Tuple[str, float]]:
+    """Normalize one amount; returns (text, rupees) or None if it is not money"""
+    try:
+        value = float(number.replace(",", ""))
+    except ValueError:
+        return None
+    if unit in ("k", "thousand"):
+        value *= 1000
+        unit = None
+    if unit:
+        name = _UNIT_NAMES[unit]
+        rupees = value * (100000 if name == "lakhs" else 10000000)
+        return f"{number.replace(',', '')} {name}", rupees
+    if value < 1000:
+        return None  # "2", "15" on their own are not budgets
+    return f"{int(value)}", value
+
+
+def _budget(text: str, expected: bool) -> Optional[SlotMatch]:
+    match = _BUDGET_RANGE.search(text)
+    if match:
+        unit_low, unit_high = match.group(2), match.group(4)
+        # "20 to 25 thousand" / "50 to 60 lakhs": the unit applies to both ends
+        low = _amount(match.group(1), unit_low or unit_high)
+        high = _amount(match.group(3), unit_high)
+        if low and high and low[1] <= high[1]:
+            return SlotMatch(f"{low[0]} to {high[0]}", 0.9, match.span())
+    for match in _BUDGET_SINGLE.finditer(text):
+        amount = _amount(match.group(2), match.group(3))
+        if not amount:
+            continue
+        prefix = match.group(1)
+        value = f"{prefix} {amount[0]}" if prefix else amount[0]
+        # Bare numbers are only trusted when the caller was asked for the budget
+        confidence = 0.9 if (match.group(3) or expected or "budget" in text) else 0.7
+        return SlotMatch(value, confidence, match.span())
+    return None
+
+
+_POSSESSION = [
+    re.compile(r"\b(immediately|immediate|right away|right now|asap|as soon as possible)\b"),
+    re.compile(r"\b(next|this|coming)\s+(week|month|year)\b"),
+    re.compile(r"\b(within|in|after)\s+(\d+|a|one|two|three)\s*(days?|weeks?|months?)\b"),
+    re.compile(rf"\b(from|by|in|after|before)\s+{_MONTHS}(\s+\d{{4}})?\b"),
+]
+
+
+def _possession_date(text: str, expected: bool) -> Optional[SlotMatch]:
+    for pattern in _POSSESSION:
+        match = pattern.search(text)
+        if match:
+            value = re.sub(r"(\d+)\s*(days?|weeks?|months?)", r"\1 \2", match.group(0))
+            return SlotMatch(value, 0.9, match.span())
+    return None
+
+
+# Only slots with a closed (or strongly patterned) value set have rules;
+# tenant_name, location and profession_details always go to the LLM
+_RULES: Dict[SlotID, Callable[[str, bool], Optional[SlotMatch]]] = {
+    SlotID.rent_or_buy: _rent_or_buy,
+    SlotID.bhk_type: _bhk_type,
+    SlotID.facing: _facing,
+    SlotID.furnishing: _furnishing,
+    SlotID.tenant_type: _tenant_type,
+    SlotID.floor_pref: _floor_pref,
+    SlotID.budget: _budget,
+    SlotID.possession_date: _possession_date,
+}
+
+# Words that carry no slot information once the rule matches are removed
+_FILLER = frozenset("""
+a an the i im i'm am is are we was it its it's my our me us you your to of for in on at and or
+with be would like want need needed looking look prefer preferred preference something some
+flat flats house home apartment property place one please yes yeah yep ok okay sure no not
+um uh hmm ah so just only any also actually basically sir madam maam ji hello hi thanks thank
+should can will that this which around about approximately budget floor facing type rupees rs
+inr per month monthly fine good great
+""".split())
+_WORD = re.compile(r"[a-z0-9']+")
+# "not the ground floor", "don't want furnished": leave these to the LLM
+_NEGATION = re.compile(r"\b(not|no|don't|dont|do not|never|except|without)\b[\w\s']{0,12}$")
+
+
+class FastPathSlotExtractor:
+    """Deterministic extractor for slots whose answers come from a closed set"""
+
+    @staticmethod
+    def extract(text: str, missing: List[str], expected: Optional[str] = None,
+                min_confidence: float = 0.85) -> FastPathResult:
+        """Resolve what the rules can; flags whether the LLM is still needed"""
+        normalized = " ".join(text.lower().split())
+        values: Dict[str, str] = {}
+        confidence: Dict[str, float] = {}
+        spans: List[Tuple[int, int]] = []
+
+        # Walk in schema order so SlotSchema stays the single source of slot order
+        for slot in _slot_schema.slots:
+            if slot.id not in missing:
+                continue
+            rule = _RULES.get(slot.id)
+            if not rule:
+                continue
+            match = rule(normalized, expected == slot.id)
+            if match and _NEGATION.search(normalized[:match.span[0]]):
+                match = match._replace(confidence=match.confidence / 2)
+            if match and match.confidence >= min_confidence:
+                values[slot.id.value] = match.value
+                confidence[slot.id.value] = match.confidence
+                spans.append(match.span)
+
+        # Anything left besides filler might be a name, area or profession.
+        # An answer no rule resolved ("yes", "one") still goes to the LLM:
+        # filler only means nothing once a rule has explained the rest.
+        residual = normalized
+        for start, end in sorted(spans, reverse=True):
+            residual = residual[:start] + " " + residual[end:]
+        leftover = [w for w in _WORD.findall(residual) if w not in _FILLER]
+        needs_llm = bool(leftover) or (not values and bool(_WORD.search(normalized)))
+
+        return FastPathResult(values, confidence, needs_llm)
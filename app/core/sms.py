@@ -0,0 +1,166 @@
+import time
+import logging
+import threading
+from typing import List, Optional
+from app.config import Config
+from app.core import metrics
+from app.core.jobs import post_call_jobs
+from app.core.rate_limit import Bucket, TokenBucketLimiter
+from app.core.redis_manager import redis_manager
+from app.utils.sms_utils import send_sms, TWILIO_ACCOUNT_SID
+
+logger = logging.getLogger(__name__)
+
+DIGEST_KEY = "sms:digest:{}"        # list of pending lead texts per virtual number
+DIGEST_DUE_KEY = "sms:digest:due"   # zset: virtual number -> time its digest is due
+
+# Claim one due digest: only the caller that removes it from the due set
+# gets (and clears) the pending texts. KEYS: due set, digest list; ARGV: number.
+CLAIM_DIGEST_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return {}
+end
+local texts = redis.call('LRANGE', KEYS[2], 0, -1)
+redis.call('DEL', KEYS[2])
+return texts
+"""
+
+
+class SmsRateLimited(Exception):
+    """No send slot within the dispatcher's wait budget; the job is retried later"""
+
+
+class SmsDispatcher:
+    """Lead SMS delivery within the provider's sending rates.
+
+    Every send takes a token from a per-account and a per-sender-number
+    bucket (TokenBucketLimiter, shared by all workers through Redis) and
+    waits for the next free slot rather than letting Twilio queue or reject
+    the message. With a digest window, leads for the same virtual number
+    are collected in Redis and sent as one message when the window closes,
+    so an agent with many calls gets one SMS per window instead of one per
+    call. The texts are sent through the post-call job queue, so a failed
+    send is retried like any other job.
+    """
+
+    def __init__(self, account_sid: str, account_rate: float, number_rate: float,
+                 max_wait: float = 10, digest_window: float = 0):
+        self.account_sid = account_sid
+        self.account_rate = account_rate
+        self.number_rate = number_rate
+        self.max_wait = max_wait
+        self.digest_window = digest_window
+        self.limiter = TokenBucketLimiter()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _buckets(self, virtual_number: str) -> List[Bucket]:
+        return [
+            Bucket(f"ratelimit:sms:account:{self.account_sid}", max(1, int(self.account_rate)), self.account_rate),
+            Bucket(f"ratelimit:sms:number:{virtual_number}", max(1, int(self.number_rate)), self.number_rate),
+        ]
+
+    def _wait_for_slot(self, virtual_number: str):
+        deadline = time.time() + self.max_wait
+        buckets = self._buckets(virtual_number)
+        while True:
+            decision = self.limiter.allow(buckets)
+            if decision.allowed:
+                return
+            if time.time() + decision.retry_after > deadline:
+                raise SmsRateLimited(f"{decision.limited_by}: no slot within {self.max_wait}s")
+            time.sleep(decision.retry_after)
+
+    def send(self, virtual_number: str, message: str) -> str:
+        """Send now, waiting for a rate slot; returns the message SID"""
+        self._wait_for_slot(virtual_number)
+        with metrics.stage("twilio_sms"):
+            return send_sms(virtual_number, message)
+
+    def submit(self, virtual_number: str, message: str) -> Optional[str]:
+        """Send a lead, or add it to the number's digest when digests are on"""
+        if self.digest_window <= 0:
+            return self.send(virtual_number, message)
+        pipe = redis_manager.redis.pipeline(transaction=True)
+        pipe.rpush(DIGEST_KEY.format(virtual_number), message)
+        pipe.expire(DIGEST_KEY.format(virtual_number), int(self.digest_window * 10) + 60)
+        pipe.zadd(DIGEST_DUE_KEY, {virtual_number: time.time() + self.digest_window}, nx=True)
+        pipe.execute()
+        return None
+
+    @staticmethod
+    def digest_text(texts: List[str]) -> str:
+        """One message for several leads: shared header lines once, unanswered slots dropped"""
+        if len(texts) == 1:
+            return texts[0]
+        leads = [text.splitlines() for text in texts]
+        shared = 0
+        while all(len(lines) > shared and lines[shared] == leads[0][shared] for lines in leads):
+            shared += 1
+        body = [
+            "\n".join(line for line in lines[shared:] if not line.endswith(": -"))
+            for lines in leads
+        ]
+        return "\n".join([f"{len(texts)} new leads", *leads[0][:shared]]) + "\n\n" + "\n\n".join(body)
+
+    def flush_due(self, now: Optional[float] = None) -> int:
+        """Queue one message per digest whose window has closed; returns how many"""
+        client = redis_manager.redis
+        due = client.zrangebyscore(DIGEST_DUE_KEY, "-inf", now or time.time(), start=0, num=100)
+        claim = redis_manager.script(CLAIM_DIGEST_SCRIPT)
+        flushed = 0
+        for number in due:
+            number = number.decode()
+            texts = claim(keys=[DIGEST_DUE_KEY, DIGEST_KEY.format(number)], args=[number], client=client)
+            if not texts:
+                continue  # another worker claimed it
+            try:
+                post_call_jobs.enqueue("sms_send", {
+                    "virtual_number": number,
+                    "message": self.digest_text([text.decode() for text in texts]),
+                })
+            except Exception:
+                # Put the leads back, due immediately, for the next flush
+                pipe = client.pipeline(transaction=True)
+                pipe.lpush(DIGEST_KEY.format(number), *reversed(texts))
+                pipe.zadd(DIGEST_DUE_KEY, {number: 0})
+                pipe.execute()
+                raise
+            flushed += 1
+        return flushed
+
+    def _run(self):
+        interval = min(5.0, max(0.5, self.digest_window / 10))
+        while not self._stopping.wait(interval):
+            try:
+                flushed = self.flush_due()
+                if flushed:
+                    logger.info(f"SMS digests queued: {flushed}")
+            except Exception as e:
+                logger.error(f"SMS digest flush failed: {e}")
+
+    def start(self):
+        """Start the digest scheduler in this process (no-op without a digest window)"""
+        if self.digest_window <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="sms-digest", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+
+sms_dispatcher = SmsDispatcher(
+    TWILIO_ACCOUNT_SID,
+    account_rate=Config.SMS_ACCOUNT_RATE,
+    number_rate=Config.SMS_NUMBER_RATE,
+    max_wait=Config.SMS_MAX_WAIT,
+    digest_window=Config.SMS_DIGEST_WINDOW,
+)
+
+
+@post_call_jobs.handler("sms_send")
+def send_queued_sms(virtual_number: str, message: str):
+    sid = sms_dispatcher.send(virtual_number, message)
+    logger.info(f"SMS sent: {sid}")
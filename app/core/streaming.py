@@ -0,0 +1,161 @@
+import json
+import logging
+import threading
+import contextvars
+from concurrent.futures import Future
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+from app.config import Config
+from app.core.services import CloudRunOptimizedService
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingResult(NamedTuple):
+    text: str
+    confidence: float
+    is_final: bool       # this segment's text will not change any more
+    speech_final: bool   # endpoint: the caller has finished the turn
+
+
+class DeepgramStreamingTranscriber:
+    """Deepgram live transcription for one Twilio media stream (8 kHz μ-law)"""
+
+    PARAMS = [
+        ("encoding", "mulaw"),
+        ("sample_rate", "8000"),
+        ("channels", "1"),
+        ("interim_results", "true"),
+        ("punctuate", "true"),
+        ("smart_format", "true"),
+    ]
+
+    def __init__(self, on_result: Callable[[StreamingResult], None], language: str = "en",
+                 url: Optional[str] = None, api_key: Optional[str] = None):
+        self._on_result = on_result
+        self._language = language
+        self._url = url or Config.DEEPGRAM_STREAMING_URL
+        self._api_key = api_key or Config.DEEPGRAM_API_KEY
+        self._ws = None
+        self._reader = None
+
+    def start(self):
+        """Open the live connection and start reading results"""
+        params = self.PARAMS + [
+            ("model", Config.DEEPGRAM_STREAMING_MODEL),
+            ("language", self._language),
+            ("endpointing", str(Config.STREAM_ENDPOINTING_MS)),
+            ("utterance_end_ms", str(Config.STREAM_UTTERANCE_END_MS)),
+        ]
+        self._ws = connect(
+            f"{self._url}?{urlencode(params)}",
+            additional_headers={"Authorization": f"Token {self._api_key}"},
+            open_timeout=Config.STREAM_CONNECT_TIMEOUT,
+        )
+        self._reader = threading.Thread(target=self._read, name="stt-stream", daemon=True)
+        self._reader.start()
+
+    def send(self, audio: bytes):
+        """Forward raw μ-law audio"""
+        self._ws.send(audio)
+
+    def finish(self, timeout: float = 2.0):
+        """Ask Deepgram to flush pending results, then wait for the reader to drain"""
+        try:
+            self._ws.send(json.dumps({"type": "CloseStream"}))
+        except ConnectionClosed:
+            pass
+        self._reader.join(timeout)
+
+    def close(self):
+        if self._ws is not None:
+            self._ws.close()
+
+    def _read(self):
+        try:
+            for message in self._ws:
+                result = self._parse(message)
+                if result:
+                    self._on_result(result)
+        except ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"Streaming STT reader failed: {e}", exc_info=True)
+
+    @staticmethod
+    def _parse(message) -> Optional[StreamingResult]:
+        if isinstance(message, bytes):
+            return None
+        data = json.loads(message)
+        kind = data.get("type")
+        if kind == "UtteranceEnd":
+            # Fallback endpoint when background noise keeps endpointing from firing
+            return StreamingResult("", 0.0, True, True)
+        if kind != "Results":
+            return None
+        alternative = (data.get("channel", {}).get("alternatives") or [{}])[0]
+        return StreamingResult(
+            alternative.get("transcript", "").strip(),
+            float(alternative.get("confidence") or 0.0),
+            bool(data.get("is_final")),
+            bool(data.get("speech_final")),
+        )
+
+
+class StreamingTurn:
+    """One caller turn assembled from streaming STT results.
+
+    Deepgram finalizes speech in segments (``is_final``) and marks the end of
+    the turn with ``speech_final``. Each time the stable text grows it is sent
+    to slot extraction in the background, so when the caller stops talking
+    the extraction for the full answer is usually already running or done.
+    """
+
+    def __init__(self, extract: Callable[[str], Dict[str, str]]):
+        self._extract = extract
+        # Results arrive on the transcriber's reader thread; extractions run in the call's context
+        self._context = contextvars.copy_context()
+        self._segments: List[str] = []
+        self._interim = ""
+        self._pending: Optional[Tuple[str, Future]] = None
+        self._lock = threading.Lock()
+        self.done = threading.Event()
+
+    @property
+    def text(self) -> str:
+        """Finalized text, plus any unfinished interim tail"""
+        with self._lock:
+            parts = self._segments + ([self._interim] if self._interim else [])
+        return " ".join(parts)
+
+    def on_result(self, result: StreamingResult):
+        with self._lock:
+            if not result.is_final:
+                self._interim = result.text
+                return
+            self._interim = ""
+            if result.text:
+                self._segments.append(result.text)
+            text = " ".join(self._segments)
+            if text and (self._pending is None or self._pending[0] != text):
+                executor, _ = CloudRunOptimizedService._runtime()
+                self._pending = (text, executor.submit(self._context.copy().run, self._extract, text))
+            endpoint = result.speech_final and bool(self._segments)
+        if endpoint:
+            self.done.set()
+
+    def slots(self) -> Dict[str, str]:
+        """Slot values for the turn, reusing the early extraction if the text has not changed since"""
+        text = self.text
+        if not text:
+            return {}
+        with self._lock:
+            pending = self._pending
+        if pending and pending[0] == text:
+            try:
+                return pending[1].result()
+            except Exception as e:
+                logger.warning(f"Early slot extraction failed, retrying inline: {e}")
+        return self._extract(text)
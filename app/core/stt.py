@@ -0,0 +1,370 @@
+import os
+import abc
+import time
+import logging
+import threading
+import contextvars
+import concurrent.futures
+from collections import deque
+from typing import Dict, List, Optional, Type
+import requests
+from app.config import Config
+from app.core.models import TranscriptionResult
+from app.core.circuit_breaker import CircuitBreaker
+from app.core import deadline
+from app.core import metrics
+from app.utils.exceptions import TranscriptionError, CircuitOpenError, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# name -> backend class, in registration order
+BACKENDS: Dict[str, Type["SttBackend"]] = {}
+
+
+def register(name: str):
+    """Make a backend class selectable in STT_PROVIDERS"""
+    def decorator(cls):
+        if getattr(cls, "__abstractmethods__", None):
+            raise TypeError(f"STT backend {cls.__name__} does not implement {', '.join(sorted(cls.__abstractmethods__))}")
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+class _Abandoned(BaseException):
+    """Stops a hedge that lost the race; the breaker takes it as no signal either way"""
+
+
+class _ServerError(requests.HTTPError):
+    """5xx or 429: the provider is failing or shedding load, not rejecting this request"""
+
+
+def _raise_for_status(resp: requests.Response):
+    """raise_for_status, telling provider trouble apart from a bad request or bad audio"""
+    if resp.status_code >= 500 or resp.status_code == 429:
+        raise _ServerError(f"{resp.status_code} from {resp.url}", response=resp)
+    resp.raise_for_status()
+
+
+class SttBackend(abc.ABC):
+    """One speech-to-text provider for a recorded turn.
+
+    transcribe() takes its time from the current deadline (deadline.timeout
+    per HTTP call) and should check `abandoned` between calls when it polls.
+    """
+
+    name = "backend"
+
+    def configured(self) -> bool:
+        return True
+
+    @abc.abstractmethod
+    def transcribe(self, http: requests.Session, audio: bytes, abandoned: threading.Event) -> TranscriptionResult:
+        """Transcript of `audio`; raises on any failure"""
+
+
+@register("deepgram")
+class DeepgramBackend(SttBackend):
+    """Deepgram pre-recorded /listen, one request"""
+
+    # Prerecorded options, sent as query parameters (repeated keys allowed)
+    PARAMS = [
+        ("model", "nova-2-phonecall"),
+        ("smart_format", "true"),
+        ("punctuate", "true"),
+        ("detect_language", "true"),
+        ("profanity_filter", "false"),  # Disable if interfering with technical terms
+        ("redact", "false"),
+        ("diarize", "false"),
+        ("numerals", "true"),           # Better number detection
+        # Keywords for better detection
+        ("keywords", "east facing:3"),  # Higher boost for directional terms
+        ("keywords", "facing:4"),
+        ("keywords", "software engineer:4"),  # High boost for professional terms
+        ("keywords", "Kondapur:3"),
+        ("keywords", "bachelors:4"),
+        # Additional search terms
+        ("search", "east"),
+        ("search", "facing"),
+        ("search", "software"),
+        ("search", "engineer"),
+    ]
+
+    def __init__(self):
+        self.api_key = Config.DEEPGRAM_API_KEY
+        self.url = Config.DEEPGRAM_API_URL
+
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def transcribe(self, http, audio, abandoned):
+        resp = http.post(
+            self.url,
+            params=self.PARAMS,
+            headers={"Authorization": f"Token {self.api_key}", "Content-Type": "audio/wav"},
+            data=audio,
+            timeout=deadline.timeout(Config.STT_TIMEOUT, "Deepgram"),
+        )
+        _raise_for_status(resp)
+        channel = resp.json()["results"]["channels"][0]
+        result = channel["alternatives"][0]
+        return TranscriptionResult(
+            text=result.get("transcript", ""),
+            language=channel.get("detected_language") or "en",
+            confidence=result.get("confidence", 1.0),
+        )
+
+
+@register("assemblyai")
+class AssemblyAIBackend(SttBackend):
+    """AssemblyAI v2 REST: upload, start a transcript, poll until it completes"""
+
+    POLL_INTERVAL = 0.25
+    WORD_BOOST = ["3bhk", "rent", "bachelors", "family", "east facing", "software engineer", "Hitech city"]
+
+    def __init__(self):
+        self.api_key = Config.ASSEMBLYAI_API_KEY
+        self.url = Config.ASSEMBLYAI_API_URL.rstrip("/")
+
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def transcribe(self, http, audio, abandoned):
+        headers = {"authorization": self.api_key}
+        resp = http.post(f"{self.url}/upload", headers=headers, data=audio,
+                         timeout=deadline.timeout(Config.STT_TIMEOUT, "AssemblyAI upload"))
+        _raise_for_status(resp)
+        upload_url = resp.json().get("upload_url")
+        if not upload_url:
+            raise TranscriptionError("No upload_url returned from AssemblyAI")
+
+        resp = http.post(f"{self.url}/transcript", headers=headers, json={
+            "audio_url": upload_url,
+            "language_detection": True,
+            "punctuate": True,
+            "format_text": True,
+            "speech_model": "nano",
+            "word_boost": self.WORD_BOOST,
+            "boost_param": "high",
+        }, timeout=deadline.timeout(Config.STT_TIMEOUT, "AssemblyAI transcript"))
+        _raise_for_status(resp)
+        transcript_id = resp.json().get("id")
+        if not transcript_id:
+            raise TranscriptionError("No transcript ID returned from AssemblyAI")
+
+        while True:
+            if abandoned.wait(self.POLL_INTERVAL):
+                raise _Abandoned()
+            resp = http.get(f"{self.url}/transcript/{transcript_id}", headers=headers,
+                            timeout=deadline.timeout(Config.STT_TIMEOUT, "AssemblyAI poll"))
+            _raise_for_status(resp)
+            data = resp.json()
+            if data.get("status") == "completed":
+                return TranscriptionResult(
+                    text=data.get("text") or "",
+                    language=(data.get("language_code") or "en").split("_")[0].lower(),
+                    confidence=data.get("confidence", 1.0),
+                )
+            if data.get("status") == "error":
+                raise TranscriptionError(f"AssemblyAI error: {data.get('error')}")
+
+
+class LatencyWindow:
+    """Latency and outcome of a provider's most recent attempts (this worker)"""
+
+    def __init__(self, size: int):
+        self._samples = deque(maxlen=size)   # (seconds, ok)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float, ok: bool):
+        with self._lock:
+            self._samples.append((seconds, ok))
+
+    def snapshot(self):
+        """(successful latencies sorted, attempts, failures)"""
+        with self._lock:
+            samples = list(self._samples)
+        latencies = sorted(seconds for seconds, ok in samples if ok)
+        return latencies, len(samples), len(samples) - len(latencies)
+
+
+class Provider:
+    """A configured backend with its circuit breaker and rolling stats"""
+
+    def __init__(self, backend: SttBackend):
+        self.backend = backend
+        self.name = backend.name
+        self.breaker = CircuitBreaker(
+            f"stt:{backend.name}",
+            failure_threshold=Config.STT_BREAKER_THRESHOLD,
+            reset_timeout=Config.STT_BREAKER_RESET,
+            # Only the provider being unreachable, slow or failing opens the
+            # circuit; a 4xx means it answered. DeadlineExceeded is raised
+            # before a call when the request's budget is spent
+            failure_exceptions=(requests.ConnectionError, requests.Timeout, _ServerError),
+            ignored_exceptions=(DeadlineExceeded,),
+        )
+        self.window = LatencyWindow(Config.STT_LATENCY_WINDOW)
+
+    def p90(self) -> float:
+        """Observed p90 latency, or STT_HEDGE_DELAY until there are STT_MIN_SAMPLES successes"""
+        latencies, _, _ = self.window.snapshot()
+        if len(latencies) < Config.STT_MIN_SAMPLES:
+            return Config.STT_HEDGE_DELAY
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+
+    def error_rate(self) -> float:
+        _, attempts, failures = self.window.snapshot()
+        return failures / attempts if attempts >= Config.STT_MIN_SAMPLES else 0.0
+
+    def score(self) -> float:
+        """Expected seconds to a usable transcript: p90 stretched by the error rate"""
+        return self.p90() / max(1.0 - self.error_rate(), 0.1)
+
+    def stats(self) -> dict:
+        latencies, attempts, failures = self.window.snapshot()
+        return {
+            "circuit": self.breaker.stats(),
+            "attempts": attempts,
+            "failures": failures,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            "p90_ms": round(self.p90() * 1000, 1),
+            "score_ms": round(self.score() * 1000, 1),
+        }
+
+
+class SttRouter:
+    """Transcribes a turn on the best provider, hedging on a second one.
+
+    Providers are ranked by score (p90 latency over success rate, from this
+    worker's recent attempts; configuration order breaks ties and ranks
+    providers without enough samples). The best provider with its circuit
+    closed gets the audio first. If it has not answered within its p90, the
+    next one gets it too, and the first good transcript wins; a provider
+    that fails hands over to the next at once. Losing hedges are abandoned.
+    """
+
+    # How often a transcription waiting on providers checks whether its caller gave up
+    CANCEL_CHECK_INTERVAL = 0.25
+
+    def __init__(self, backends: List[SttBackend], hedge: bool = True):
+        self.providers = [Provider(backend) for backend in backends if backend.configured()]
+        self.hedge = hedge
+        self._executor = None
+        self._owner_pid = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> concurrent.futures.ThreadPoolExecutor:
+        """Per-process executor for attempts, rebuilt after fork"""
+        pid = os.getpid()
+        if self._owner_pid != pid:
+            with self._lock:
+                if self._owner_pid != pid:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=Config.STT_MAX_WORKERS, thread_name_prefix="stt-attempt"
+                    )
+                    self._owner_pid = pid
+        return self._executor
+
+    def ranked(self) -> List[Provider]:
+        """Providers to try in order, skipping open circuits"""
+        available = [provider for provider in self.providers if provider.breaker.state != CircuitBreaker.OPEN]
+        return sorted(available, key=Provider.score)
+
+    def _attempt(self, provider: Provider, kind: str, http, audio: bytes,
+                 abandoned: threading.Event) -> TranscriptionResult:
+        start = time.monotonic()
+        outcome = "failed"
+        try:
+            with metrics.stage(provider.name):
+                result = provider.breaker.call(provider.backend.transcribe, http, audio, abandoned)
+            outcome = "ok"
+            return result
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            raise
+        except DeadlineExceeded:
+            outcome = "out_of_time"
+            raise
+        except _Abandoned:
+            outcome = "abandoned"
+            raise TranscriptionError(f"{provider.name} abandoned")
+        finally:
+            elapsed = time.monotonic() - start
+            if outcome in ("ok", "failed"):
+                provider.window.add(elapsed, outcome == "ok")
+            elif outcome == "abandoned":
+                # Slower than the winner; elapsed is a lower bound on its latency
+                provider.window.add(elapsed, True)
+            metrics.STT_ATTEMPTS.labels(provider.name, kind, outcome).inc()
+
+    def transcribe(self, http: requests.Session, audio: bytes, timeout: float = Config.STT_TIMEOUT,
+                   cancelled: Optional[threading.Event] = None) -> TranscriptionResult:
+        """Transcript from the first provider to answer, within `timeout` and the current deadline.
+
+        Setting `cancelled` (the caller stopped waiting) abandons every attempt.
+        """
+        queue = self.ranked()
+        if not queue:
+            raise CircuitOpenError("stt")
+        abandoned = threading.Event()
+        pending: Dict[concurrent.futures.Future, Provider] = {}
+        errors = []
+
+        with deadline.budget(timeout):
+            def submit(provider: Provider, kind: str) -> float:
+                # In a copy of this context: the attempt keeps the deadline, labels and trace
+                future = self._pool().submit(contextvars.copy_context().run,
+                                             self._attempt, provider, kind, http, audio, abandoned)
+                pending[future] = provider
+                return time.monotonic() + provider.p90()
+
+            hedge_at = submit(queue.pop(0), "primary")
+            try:
+                while True:
+                    wait = deadline.timeout(timeout, "transcription")
+                    if queue and self.hedge:
+                        wait = min(wait, max(0.0, hedge_at - time.monotonic()))
+                    if cancelled is not None:
+                        if cancelled.is_set():
+                            raise TranscriptionError("Transcription abandoned")
+                        wait = min(wait, self.CANCEL_CHECK_INTERVAL)
+                    done, _ = concurrent.futures.wait(pending, timeout=wait,
+                                                      return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        provider = pending.pop(future)
+                        try:
+                            return future.result()
+                        except Exception as e:
+                            logger.warning(f"STT provider {provider.name} failed: {e}")
+                            errors.append(f"{provider.name}: {e}")
+                    if not queue:
+                        if not pending:
+                            raise TranscriptionError("; ".join(errors))
+                        continue
+                    if not pending:
+                        hedge_at = submit(queue.pop(0), "failover")
+                    elif self.hedge and time.monotonic() >= hedge_at:
+                        provider = queue.pop(0)
+                        logger.info(f"Hedging transcription on {provider.name}")
+                        hedge_at = submit(provider, "hedge")
+            finally:
+                abandoned.set()
+
+    def stats(self) -> Dict[str, dict]:
+        return {provider.name: provider.stats() for provider in self.providers}
+
+
+def _backends(names: str) -> List[SttBackend]:
+    backends = []
+    for name in (name.strip() for name in names.split(",")):
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown STT provider {name!r} in STT_PROVIDERS (known: {', '.join(BACKENDS)})")
+        backends.append(BACKENDS[name]())
+    return backends
+
+
+stt_router = SttRouter(_backends(Config.STT_PROVIDERS), hedge=Config.STT_HEDGE)
+if not stt_router.providers:
+    raise ValueError(f"No STT provider in STT_PROVIDERS ({Config.STT_PROVIDERS}) has an API key set")
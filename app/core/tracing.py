@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+TRACE_KEY = "trace:{}"
+
+
+class TraceContext(NamedTuple):
+    trace_id: Optional[str]     # session id of the call
+    call_sid: Optional[str]
+    span_id: Optional[str]      # innermost open span, parent of the next one
+
+
+_context: contextvars.ContextVar[Optional[TraceContext]] = contextvars.ContextVar("trace_context", default=None)
+
+
+def _span_id() -> str:
+    return os.urandom(8).hex()
+
+
+class MemoryExporter:
+    """Spans of the most recent calls in this process"""
+
+    def __init__(self, max_calls: int = 1000, max_spans: int = 1000):
+        self.max_calls = max_calls
+        self.max_spans = max_spans
+        self._calls: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[dict]):
+        with self._lock:
+            for span in spans:
+                call = self._calls.setdefault(span["trace_id"], [])
+                if len(call) < self.max_spans:
+                    call.append(span)
+                self._calls.move_to_end(span["trace_id"])
+            while len(self._calls) > self.max_calls:
+                self._calls.popitem(last=False)
+
+    def spans(self, trace_id: str) -> List[dict]:
+        with self._lock:
+            return list(self._calls.get(trace_id, ()))
+
+
+class FileExporter:
+    """Spans appended to a JSON-lines file; lookups scan it (local debugging)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[dict]):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(span) + "\n" for span in spans)
+
+    def spans(self, trace_id: str) -> List[dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return [span for span in map(json.loads, f) if span["trace_id"] == trace_id]
+
+
+class RedisExporter:
+    """Spans in a list per call, so any worker can serve the timeline"""
+
+    def __init__(self, ttl: int, max_spans: int):
+        self.ttl = ttl
+        self.max_spans = max_spans
+
+    def export(self, spans: List[dict]):
+        from app.core.redis_manager import redis_manager
+        calls: Dict[str, List[str]] = {}
+        for span in spans:
+            calls.setdefault(span["trace_id"], []).append(json.dumps(span))
+        pipe = redis_manager.redis.pipeline(transaction=False)
+        for trace_id, items in calls.items():
+            key = TRACE_KEY.format(trace_id)
+            pipe.rpush(key, *items)
+            pipe.ltrim(key, 0, self.max_spans - 1)
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def spans(self, trace_id: str) -> List[dict]:
+        from app.core.redis_manager import redis_manager
+        return [json.loads(item) for item in redis_manager.redis.lrange(TRACE_KEY.format(trace_id), 0, -1)]
+
+
+class Tracer:
+    """Spans per call, keyed by session id and CallSid.
+
+    begin() or start_call() binds a call to the current context (request,
+    greenlet or thread); span() and record() then add spans under the
+    innermost open span. Work submitted to executors in a copy of the
+    context, and jobs enqueued with carrier()/resumed(), stay in the call's
+    trace. Without a bound call nothing is recorded. Finished spans are buffered and written
+    by a background thread, so exporting never runs on the request path.
+    """
+
+    def __init__(self, exporter=None, flush_interval: float = 0.5, max_buffer: int = 10000):
+        self.exporter = exporter
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def begin(self, session_id: Optional[str], call_sid: Optional[str] = None):
+        """Start of a request: drop whatever this context traced before, then trace the call if known"""
+        _context.set(TraceContext(session_id, call_sid, None) if session_id else None)
+
+    def start_call(self, session_id: str, call_sid: Optional[str] = None):
+        """Trace the rest of this request, open spans included, as part of a call"""
+        current = _context.get()
+        _context.set(TraceContext(session_id, call_sid or (current.call_sid if current else None),
+                                  current.span_id if current else None))
+
+    def current(self) -> Optional[TraceContext]:
+        return _context.get()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time a block as a child of the current span"""
+        if self.exporter is None:
+            yield
+            return
+        parent = _context.get()
+        span_id = _span_id()
+        token = _context.set(TraceContext(parent.trace_id if parent else None,
+                                          parent.call_sid if parent else None, span_id))
+        start, t0 = time.time(), time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            # The call may have been bound inside the span (a new session in /answer)
+            current = _context.get()
+            _context.reset(token)
+            if current and current.trace_id:
+                self._finish(current, span_id, parent.span_id if parent else None,
+                             name, start, time.perf_counter() - t0, attrs, error)
+
+    def record(self, name: str, start: float, duration: float, error: Optional[str] = None, **attrs):
+        """Add an already-timed operation (start as time.time()) under the current span"""
+        current = _context.get()
+        if current is None or not current.trace_id or self.exporter is None:
+            return
+        self._finish(current, _span_id(), current.span_id, name, start, duration, attrs, error)
+
+    def carrier(self) -> Optional[str]:
+        """The current trace position, serialized for a job"""
+        current = _context.get()
+        return json.dumps(current) if current else None
+
+    @contextmanager
+    def resumed(self, carrier: Optional[str]):
+        """Continue the trace a job was enqueued from"""
+        token = _context.set(TraceContext(*json.loads(carrier)) if carrier else None)
+        try:
+            yield
+        finally:
+            _context.reset(token)
+
+    def _finish(self, context: TraceContext, span_id: str, parent_id: Optional[str], name: str,
+                start: float, duration: float, attrs: Dict, error: Optional[str]):
+        span = {
+            "trace_id": context.trace_id,
+            "call_sid": context.call_sid,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "name": name,
+            "start": start,
+            "duration_ms": round(duration * 1000, 2),
+        }
+        if attrs:
+            span["attrs"] = attrs
+        if error:
+            span["error"] = error
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append(span)
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()  # threads do not survive a fork
+        threading.Thread(target=self._flush_loop, name="trace-flusher", daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Export buffered spans now"""
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if not spans:
+            return
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            logger.warning(f"Trace export failed, {len(spans)} spans lost: {e}")
+
+    def timeline(self, session_id: str) -> Optional[Dict[str, object]]:
+        """A call's spans as a tree per request, in order, with offsets from the first"""
+        if self.exporter is None:
+            return None
+        self.flush()
+        spans = sorted(self.exporter.spans(session_id), key=lambda span: span["start"])
+        if not spans:
+            return None
+        origin = spans[0]["start"]
+        nodes = {}
+        for span in spans:
+            node = {key: value for key, value in span.items() if key not in ("trace_id", "call_sid", "start")}
+            node["offset_ms"] = round((span["start"] - origin) * 1000, 2)
+            node["children"] = []
+            nodes[span["span_id"]] = node
+        roots, turn = [], 0
+        for span in spans:
+            node = nodes[span["span_id"]]
+            parent = nodes.get(span["parent_id"])
+            if parent is not None:
+                parent["children"].append(node)
+                continue
+            if span["name"] in ("process_recording", "stream_turn"):
+                turn += 1
+            node["turn"] = turn
+            roots.append(node)
+        return {
+            "session_id": session_id,
+            "call_sids": sorted({span["call_sid"] for span in spans if span["call_sid"]}),
+            "spans": len(spans),
+            "duration_ms": round((max(s["start"] + s["duration_ms"] / 1000 for s in spans) - origin) * 1000, 2),
+            "timeline": roots,
+        }
+
+
+def _exporter(kind: str):
+    if kind == "redis":
+        return RedisExporter(Config.TRACE_TTL, Config.TRACE_MAX_SPANS)
+    if kind == "memory":
+        return MemoryExporter(max_spans=Config.TRACE_MAX_SPANS)
+    if kind == "file":
+        return FileExporter(Config.TRACE_FILE)
+    return None
+
+
+tracer = Tracer(_exporter(Config.TRACE_EXPORTER.lower()))
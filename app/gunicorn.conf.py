@@ -0,0 +1,78 @@
+"""
+Gunicorn settings for the voice agent.
+
+A caller turn spends almost all of its wall time waiting on the network:
+Twilio recording download, Deepgram transcription and the OpenAI slot
+extraction call (typically 2-6s in total) against a few tens of
+milliseconds of CPU for JSON, pydantic and TwiML work. With sync workers
+each of those waits pins a whole process, so 4 workers meant 4 in-flight
+turns per instance.
+
+The default serving mode is therefore cooperative: gevent workers monkey
+patch sockets so ``CloudRunOptimizedService.transcribe_audio`` and
+``SlotFillingService.extract_slots_with_llm`` yield the worker while they
+wait, and one worker serves many calls concurrently.
+
+Concurrency target (per instance, 2 vCPU):
+    4 workers x 100 worker_connections = 400 open requests
+    design target: 200 concurrent in-flight caller turns
+    Cloud Run: deploy with --concurrency 200 so the autoscaler adds
+    instances before the greenlet pools are exhausted
+
+Set GUNICORN_WORKER_CLASS=sync to fall back to the previous behaviour.
+
+Metrics: every worker writes its Prometheus samples to files under
+PROMETHEUS_MULTIPROC_DIR (set here, before any worker imports
+prometheus_client), and /metrics on any worker aggregates all of them.
+"""
+import os
+import glob
+
+bind = f":{os.environ.get('PORT', '8080')}"
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gevent")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+# Concurrent requests per gevent worker
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "100"))
+# Cloud Run handles instance scaling and request deadlines
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "0"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "20"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/voice-agent-metrics")
+
+
+def on_starting(server):
+    # Samples from a previous run would be added to this one's
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
+def post_worker_init(worker):
+    # Job consumers run inside each worker; threads do not survive the fork
+    from app.core.jobs import post_call_jobs
+    from app.core.sms import sms_dispatcher
+    from app.core.dlq import recording_dlq, migrate_legacy_dlq
+    post_call_jobs.start()
+    sms_dispatcher.start()
+    recording_dlq.start()
+    try:
+        migrate_legacy_dlq()
+    except Exception as e:
+        worker.log.error(f"Legacy DLQ migration failed: {e}")
+
+
+def worker_exit(server, worker):
+    from app.core.jobs import post_call_jobs
+    from app.core.sms import sms_dispatcher
+    from app.core.dlq import recording_dlq
+    sms_dispatcher.stop()
+    recording_dlq.stop()
+    post_call_jobs.stop()
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live-gauge files; its counters and histograms stay in the totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,14 +1,21 @@
 from flask import Flask
-from app.api.routestwilio import voice_agent
+from app.api.routestwilio import voice_agent, sock
 from app.utils.logging_config import setup_logging  # If utils is sibling to app and also has __init__.py
 
 app = Flask(__name__)
 setup_logging(app)
 app.register_blueprint(voice_agent)
+sock.init_app(app)
 
 @app.route("/test")
 def hello():
     return "hello this is test working!"
 
 if __name__ == "__main__":
+    from app.core.jobs import post_call_jobs
+    from app.core.sms import sms_dispatcher
+    from app.core.dlq import recording_dlq
+    post_call_jobs.start()
+    sms_dispatcher.start()
+    recording_dlq.start()
     app.run(port=5000)
@@ -38,3 +38,15 @@ class SessionError(BaseAppException):
         if original_error:
             message += f": {str(original_error)}"
         super().__init__(message, status_code=500)
+
+class CircuitOpenError(BaseAppException):
+    def __init__(self, service_name):
+        message = f"{service_name} unavailable (circuit open)"
+        super().__init__(message, status_code=503)
+
+class DeadlineExceeded(BaseAppException, TimeoutError):
+    def __init__(self, operation="operation", budget=None):
+        message = f"No time left for {operation}"
+        if budget is not None:
+            message += f" (budget {budget:.1f}s)"
+        super().__init__(message, status_code=504)
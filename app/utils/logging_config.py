@@ -1,24 +1,160 @@
+import copy
+import json
+import atexit
 import logging
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
 from app.config import Config
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, in the shape Cloud Run's log agent parses"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        sample_rate = getattr(record, "sample_rate", None)
+        if sample_rate is not None:
+            entry["sample_rate"] = sample_rate
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep 1 in N INFO/DEBUG records of chosen loggers (and their children).
+
+    Rates are fractions per logger name, e.g. {"app.core.services.verbose": 0.1}.
+    Warnings and errors always pass. Kept records carry sample_rate so
+    counts can be scaled back up.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = {name: rate for name, rate in rates.items() if 0 <= rate < 1}
+        self._every: Dict[str, Optional[int]] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _every_n(self, name: str) -> Optional[int]:
+        every = self._every.get(name, False)
+        if every is not False:
+            return every
+        rate, logger_name = None, name
+        while logger_name:
+            if logger_name in self.rates:
+                rate = self.rates[logger_name]
+                break
+            logger_name = logger_name.rpartition(".")[0]
+        every = None if rate is None else (0 if rate == 0 else max(1, round(1 / rate)))
+        self._every[name] = every
+        return every
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        every = self._every_n(record.name)
+        if every is None:
+            return True
+        if every == 0:
+            return False
+        with self._lock:
+            count = self._counters.get(record.name, 0)
+            self._counters[record.name] = count + 1
+        if count % every:
+            return False
+        record.sample_rate = 1 / every
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread; drops them rather than block when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the arguments here; formatting (and tracebacks) happen on the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                self.queue.put_nowait(logging.makeLogRecord({
+                    "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": f"Log queue full: {dropped} records dropped",
+                }))
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """"app.core.services.verbose=0.1,app.api=0.5" -> {name: rate}"""
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.strip().partition("=")
+        if name and rate:
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+def _stop_listener():
+    """Flush what is still queued; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def setup_logging(app):
+    """Root logging through a queue: handlers write from a listener thread, off the request path"""
+    global _listener, _queue_handler
     log_level = getattr(logging, Config.LOG_LEVEL.upper())
-    log_format = logging.Formatter(Config.LOG_FORMAT)
+    log_format = JsonFormatter() if Config.LOG_JSON else logging.Formatter(Config.LOG_FORMAT)
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
 
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(log_format)
-    root_logger.addHandler(console_handler)
+    handlers = [console_handler]
 
     if not Config.TESTING:
         file_handler = RotatingFileHandler(
             "app.log", maxBytes=10485760, backupCount=5
         )
         file_handler.setFormatter(log_format)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    if _queue_handler is not None:
+        root_logger.removeHandler(_queue_handler)
+    _stop_listener()
+    log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(parse_sample_rates(Config.LOG_SAMPLE_RATES)))
+    root_logger.addHandler(_queue_handler)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.unregister(_stop_listener)
+    atexit.register(_stop_listener)
 
     logging.getLogger("requests").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# E.164 numbers have at most 15 digits. Keys carry the digit count above
+# them so leading zeros stay significant: "0123" and "123" are different keys
+_MAX_DIGITS = 15
+_LENGTH_UNIT = 10 ** _MAX_DIGITS
+
+
+def _number_key(number) -> Optional[int]:
+    """'+918012345678' -> 12 * 10**15 + 918012345678; None if it is not a phone number"""
+    text = str(number).strip()
+    digits = text.lstrip("+")
+    if not digits.isdigit() or len(digits) > _MAX_DIGITS:
+        return None
+    if text.startswith("+") and digits.startswith("0"):
+        return None  # not E.164 (no country code starts with 0); matched as an exact string
+    return len(digits) * _LENGTH_UNIT + int(digits)
+
+
+def _number_digits(key: int) -> str:
+    """Inverse of _number_key, without the '+'"""
+    length, value = divmod(key, _LENGTH_UNIT)
+    return str(value).zfill(length)
+
+
+class _Index(NamedTuple):
+    keys: array         # sorted virtual numbers, as _number_key integers
+    values: array       # personal number for keys[i], as a _number_key integer
+    other: Dict[str, str]  # entries that are not plain phone numbers
+    mtime: float
+
+
+class NumberMap:
+    """Virtual number -> personal number, loaded from number_map.json.
+
+    The map is held as two parallel sorted int64 arrays searched with
+    bisect: 16 bytes per entry in two objects, instead of a dict of
+    strings, so it stays small at 100k numbers. Each worker loads it on
+    its first lookup. The file's mtime is checked at most every
+    `check_interval` seconds and the index rebuilt when it changes; a
+    broken file keeps the previous index.
+    """
+
+    def __init__(self, path: str, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._index: Optional[_Index] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build(mapping: Dict[str, str], mtime: float = 0.0) -> _Index:
+        pairs, other = [], {}
+        for virtual, personal in mapping.items():
+            key, value = _number_key(virtual), _number_key(personal)
+            if key is None or value is None or not str(personal).strip().startswith("+"):
+                other[str(virtual)] = personal
+            else:
+                pairs.append((key, value))
+        pairs.sort()
+        return _Index(array("q", (k for k, _ in pairs)), array("q", (v for _, v in pairs)), other, mtime)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._index is not None and now < self._next_check:
+            return
+        with self._lock:
+            if self._index is not None and now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if self._index is not None and mtime == self._index.mtime:
+                    return
+                with open(self.path, "r") as f:
+                    index = self.build(json.load(f), mtime)
+            except (OSError, ValueError) as e:
+                if self._index is None:
+                    raise
+                logger.error(f"Keeping previous number map, reload of {self.path} failed: {e}")
+                return
+            self._index = index
+            logger.info(f"Number map loaded: {len(index.keys) + len(index.other)} numbers from {self.path}")
+
+    def get(self, virtual_number: str) -> Optional[str]:
+        self._refresh()
+        index = self._index
+        key = _number_key(virtual_number)
+        if key is None:
+            return index.other.get(str(virtual_number))
+        i = bisect_left(index.keys, key)
+        if i < len(index.keys) and index.keys[i] == key:
+            return f"+{_number_digits(index.values[i])}"
+        return index.other.get(str(virtual_number))
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._index.keys) + len(self._index.other)
@@ -0,0 +1,85 @@
+"""
+Recovery time after an STT outage.
+
+Dead-letters --failures recordings, then runs the replay consumers against
+a fake STT that fails for --outage seconds and afterwards answers in
+--stt-ms. Transcription and extraction are replaced by fakes; everything
+else (stream, consumer group, retries, lead hand-off) is the real DLQ.
+Reports how long after the outage ended the DLQ was empty and how many
+replay attempts it took. Needs Redis at REDIS_URL.
+
+    python -m benchmarks.dlq_replay [--failures 500] [--outage 5] [--stt-ms 300] \\
+        [--workers 16] [--retry-interval 2]
+"""
+import argparse
+import json
+import threading
+import time
+
+from app.core import dlq, services
+from app.core.jobs import JobQueue
+from app.core.models import TranscriptionResult, UserSession
+from app.core.redis_manager import redis_manager
+from app.utils.exceptions import TranscriptionError
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--failures", type=int, default=500)
+    parser.add_argument("--outage", type=float, default=5)
+    parser.add_argument("--stt-ms", type=float, default=300)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--retry-interval", type=float, default=2)
+    args = parser.parse_args()
+
+    outage_ends = time.time() + args.outage
+    attempts = [0]
+    lock = threading.Lock()
+
+    def fake_transcribe(url, timeout=13):
+        with lock:
+            attempts[0] += 1
+        if time.time() < outage_ends:
+            raise TranscriptionError("STT unavailable")
+        time.sleep(args.stt_ms / 1000)
+        return TranscriptionResult(text="two BHK in Kondapur", language="en", confidence=0.9)
+
+    services.CloudRunOptimizedService.transcribe_audio = staticmethod(fake_transcribe)
+    services.SlotFillingService.extract_slots_with_llm = staticmethod(lambda text, filled, lang: {"bhk_type": "2BHK"})
+
+    tag = time.time()
+    queue = JobQueue(f"bench-dlq-{tag}", workers=args.workers, visibility_timeout=args.retry_interval,
+                     max_attempts=1000)
+    queue.handler("replay_recording")(dlq.replay_recording)
+    leads = JobQueue(f"bench-leads-{tag}")
+    dlq.recording_dlq, dlq.post_call_jobs = queue, leads
+
+    session = UserSession(session_id="bench", user_mobile="+919800000000", virtual_number="+918000000000",
+                          slots_filled={"rent_or_buy": "rent"}, language="en", last_interaction_time=time.time())
+    for n in range(args.failures):
+        dlq.add_failed_recording(session, f"https://api.twilio.com/recordings/RE{n}", "STT unavailable")
+
+    queue.start()
+    try:
+        while True:
+            stats = queue.stats()
+            if not stats["backlog"] and time.time() > outage_ends:
+                break
+            time.sleep(0.05)
+        recovered = time.time() - outage_ends
+        handed_off = redis_manager.redis.xlen(leads.stream)
+    finally:
+        queue.stop()
+        redis_manager.redis.delete(queue.stream, queue.dead_stream, leads.stream)
+
+    print(json.dumps({
+        "failures": args.failures,
+        "recovered_after_outage_s": round(recovered, 2),
+        "replay_attempts": attempts[0],
+        "leads_handed_off": handed_off,
+        "dead": stats["dead"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
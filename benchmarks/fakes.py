@@ -0,0 +1,350 @@
+"""
+Local stand-ins for third-party services, for benchmarks and manual testing.
+
+FakeStreamingSTT speaks the subset of Deepgram's live transcription protocol
+the app uses: binary μ-law frames in, JSON ``Results`` out (interim results,
+``is_final`` segments and a ``speech_final`` endpoint), ``CloseStream`` to
+flush. The transcript is "heard" over ``speech_seconds`` of received audio.
+
+The HTTP fakes play one scripted caller (CALL_SCRIPT, one answer per slot):
+FakeRecordingHost serves ``/rec/<call>/<turn>`` recordings that carry their
+turn number, FakeDeepgram transcribes them to that turn's answer and
+FakeOpenAI returns the answer's slots from ``/v1/chat/completions``. Each
+takes a Latency ("median_ms[:sigma[:error_rate]]", lognormal) and answers
+with a 5xx at the error rate. FakeAssemblyAI is the asynchronous
+alternative to FakeDeepgram: its latency is the time until a polled
+transcript completes.
+
+    python -m benchmarks.fakes stt --port 8765 --transcript "I want a 2 BHK"
+    python -m benchmarks.fakes deepgram --port 8081 --latency 300:0.4:0.01
+"""
+import argparse
+import json
+import math
+import random
+import socket
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.server import serve
+
+MULAW_BYTES_PER_SECOND = 8000
+
+
+class FakeStreamingSTT:
+    """Deepgram-compatible live transcription server with a scripted transcript"""
+
+    def __init__(self, transcript, speech_seconds=1.0, host="127.0.0.1", port=0):
+        self.words = transcript.split()
+        self.speech_seconds = speech_seconds
+        self._server = serve(self._handle, host, port)
+        self.port = self._server.socket.getsockname()[1]
+        self.url = f"ws://{host}:{self.port}/v1/listen"
+        self.connections = 0
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="fake-stt", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    def _result(self, words, is_final, speech_final):
+        return json.dumps({
+            "type": "Results",
+            "is_final": is_final,
+            "speech_final": speech_final,
+            "channel": {"alternatives": [{"transcript": " ".join(words), "confidence": 0.98}]},
+        })
+
+    def _handle(self, ws):
+        self.connections += 1
+        half = max(1, len(self.words) // 2)
+        received = 0
+        interim_sent = segment_sent = endpoint_sent = False
+        try:
+            for message in ws:
+                if isinstance(message, str):
+                    if json.loads(message).get("type") == "CloseStream":
+                        if not endpoint_sent:
+                            ws.send(self._result(self.words[half:] if segment_sent else self.words, True, True))
+                        ws.send(json.dumps({"type": "Metadata"}))
+                        return
+                    continue
+
+                received += len(message)
+                heard = received / MULAW_BYTES_PER_SECOND / self.speech_seconds
+                if heard >= 0.25 and not interim_sent:
+                    ws.send(self._result(self.words[:half], False, False))
+                    interim_sent = True
+                if heard >= 0.5 and not segment_sent:
+                    ws.send(self._result(self.words[:half], True, False))
+                    segment_sent = True
+                if heard >= 1.0 and not endpoint_sent:
+                    ws.send(self._result(self.words[half:], True, True))
+                    endpoint_sent = True
+        except ConnectionClosed:
+            pass
+
+
+# What the simulated caller says on each turn, in the order the agent asks
+CALL_SCRIPT = [
+    ("My name is Amit", {"tenant_name": "Amit"}),
+    ("I want to rent", {"rent_or_buy": "rent"}),
+    ("Kondapur or Gachibowli", {"location": "Kondapur, Gachibowli"}),
+    ("two BHK", {"bhk_type": "2BHK"}),
+    ("family", {"tenant_type": "family"}),
+    ("east facing", {"facing": "East facing"}),
+    ("ground floor", {"floor_pref": "Ground"}),
+    ("twenty five to thirty thousand", {"budget": "25000 to 30000"}),
+    ("semi furnished", {"furnishing": "semi-furnished"}),
+    ("from next month", {"possession_date": "next month"}),
+    ("I am a software engineer", {"profession_details": "Software Engineer"}),
+]
+_SCRIPT_SLOTS = {text: slots for text, slots in CALL_SCRIPT}
+
+
+class Latency:
+    """Lognormal delay around a median, plus an error rate"""
+
+    def __init__(self, median_ms: float = 0, sigma: float = 0, error_rate: float = 0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """"300:0.4:0.01" -> 300 ms median, sigma 0.4, 1% errors"""
+        parts = [float(part) for part in spec.split(":")]
+        return cls(*parts)
+
+    def sample(self):
+        """(seconds, ok) for one request"""
+        seconds = self.median_ms / 1000 * math.exp(random.gauss(0, self.sigma)) if self.median_ms else 0.0
+        return seconds, random.random() >= self.error_rate
+
+    def wait(self) -> bool:
+        """Sleep for one sample; False if this request should fail"""
+        seconds, ok = self.sample()
+        if seconds:
+            time.sleep(seconds)
+        return ok
+
+    def __repr__(self):
+        return f"{self.median_ms:g}:{self.sigma:g}:{self.error_rate:g}"
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class FakeHTTPService:
+    """Threaded HTTP(S) server; subclasses implement respond()"""
+
+    name = "fake"
+
+    def __init__(self, latency: Latency = None, host="127.0.0.1", port=0, certfile=None, keyfile=None):
+        self.latency = latency or Latency()
+        self.requests = 0
+        self.errors = 0
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                service.requests += 1
+                if service.latency.wait():
+                    status, content_type, payload = service.respond(self.command, self.path, body)
+                else:
+                    service.errors += 1
+                    status, content_type, payload = 503, "application/json", b'{"error": "injected"}'
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass    # the client gave up (a timeout, or a hedge that lost)
+
+            do_GET = do_POST = _handle
+
+        self._server = _Server((host, port), Handler)
+        scheme = "http"
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+            scheme = "https"
+        self.port = self._server.socket.getsockname()[1]
+        self.url = f"{scheme}://{host}:{self.port}"
+
+    def respond(self, method: str, path: str, body: bytes):
+        raise NotImplementedError
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name=self.name, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    def stats(self):
+        return {"requests": self.requests, "errors": self.errors, "latency": repr(self.latency)}
+
+
+class FakeRecordingHost(FakeHTTPService):
+    """Twilio recording media: /rec/<call>/<turn> is a WAV-sized body tagged with its turn"""
+
+    name = "fake-recordings"
+
+    def __init__(self, latency: Latency = None, size: int = 32000, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.size = size
+
+    def respond(self, method, path, body):
+        turn = int(path.rstrip("/").rsplit("/", 1)[-1].split(".")[0])
+        tag = b"RIFF" + b"T%04d" % turn
+        return 200, "audio/wav", tag + bytes(self.size - len(tag))
+
+
+class FakeDeepgram(FakeHTTPService):
+    """Pre-recorded /v1/listen: the recording's turn number picks the transcript"""
+
+    name = "fake-deepgram"
+
+    def respond(self, method, path, body):
+        turn = int(body[5:9]) if body[:5] == b"RIFFT" else 0
+        text = CALL_SCRIPT[turn % len(CALL_SCRIPT)][0]
+        return 200, "application/json", json.dumps({"results": {"channels": [{
+            "detected_language": "en",
+            "alternatives": [{"transcript": text, "confidence": 0.97}],
+        }]}}).encode()
+
+
+class FakeAssemblyAI(FakeHTTPService):
+    """AssemblyAI v2: /upload, /transcript and polling /transcript/<id>.
+
+    Requests answer at once; the latency is the transcription itself, drawn
+    when the transcript is created, and its error rate ends it with status
+    "error" (as AssemblyAI reports failures) instead of an HTTP error.
+    """
+
+    name = "fake-assemblyai"
+
+    def __init__(self, latency: Latency = None, **kwargs):
+        super().__init__(Latency(), **kwargs)
+        self.processing = latency or Latency()
+        self._uploads = {}
+        self._transcripts = {}
+        self._lock = threading.Lock()
+
+    def respond(self, method, path, body):
+        with self._lock:
+            if path.endswith("/upload"):
+                upload_id = f"upload-{len(self._uploads)}"
+                self._uploads[upload_id] = int(body[5:9]) if body[:5] == b"RIFFT" else 0
+                return 200, "application/json", json.dumps({"upload_url": f"{self.url}/files/{upload_id}"}).encode()
+            if path.endswith("/transcript"):
+                request = json.loads(body)
+                turn = self._uploads.get(request["audio_url"].rsplit("/", 1)[-1], 0)
+                transcript_id = f"transcript-{len(self._transcripts)}"
+                seconds, ok = self.processing.sample()
+                self._transcripts[transcript_id] = (time.time() + seconds, ok, turn)
+                return 200, "application/json", json.dumps({"id": transcript_id, "status": "queued"}).encode()
+            ready_at, ok, turn = self._transcripts[path.rsplit("/", 1)[-1]]
+        if time.time() < ready_at:
+            return 200, "application/json", b'{"status": "processing"}'
+        if not ok:
+            self.errors += 1
+            return 200, "application/json", b'{"status": "error", "error": "injected"}'
+        return 200, "application/json", json.dumps({
+            "status": "completed",
+            "text": CALL_SCRIPT[turn % len(CALL_SCRIPT)][0],
+            "language_code": "en",
+            "confidence": 0.95,
+        }).encode()
+
+    def stats(self):
+        return {"requests": self.requests, "transcripts": len(self._transcripts), "errors": self.errors,
+                "latency": repr(self.processing)}
+
+
+class FakeOpenAI(FakeHTTPService):
+    """/v1/chat/completions returning the scripted slots for the user's words"""
+
+    name = "fake-openai"
+
+    def respond(self, method, path, body):
+        request = json.loads(body)
+        text = request["messages"][-1]["content"].removeprefix("User: ")
+        return 200, "application/json", json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(_SCRIPT_SLOTS.get(text, {}))},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode()
+
+
+def start_fake_redis() -> str:
+    """In-process Redis stand-in (fakeredis, with lupa for scripts); returns its URL"""
+    from fakeredis import TcpFakeServer
+
+    class Server(TcpFakeServer):
+        def get_request(self):
+            # Replies go out in several small writes; without this Nagle holds them ~40ms
+            conn, address = super().get_request()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return conn, address
+
+    server = Server(("127.0.0.1", 0), server_type="redis")
+    server.daemon_threads = True   # open connections would otherwise keep the process alive at exit
+    threading.Thread(target=server.serve_forever, name="fake-redis", daemon=True).start()
+    host, port = server.server_address
+    return f"redis://{host}:{port}/0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="service", required=True)
+    stt = sub.add_parser("stt", help="streaming speech-to-text")
+    stt.add_argument("--port", type=int, default=8765)
+    stt.add_argument("--transcript", default="I want a 2 BHK")
+    stt.add_argument("--speech-seconds", type=float, default=1.0)
+    services = {"recordings": FakeRecordingHost, "deepgram": FakeDeepgram, "assemblyai": FakeAssemblyAI,
+                "openai": FakeOpenAI}
+    for name in services:
+        http = sub.add_parser(name, help=f"{name} HTTP fake")
+        http.add_argument("--port", type=int, default=0)
+        http.add_argument("--latency", type=Latency.parse, default=Latency())
+        http.add_argument("--certfile")
+        http.add_argument("--keyfile")
+    args = parser.parse_args()
+
+    if args.service == "stt":
+        server = FakeStreamingSTT(args.transcript, args.speech_seconds, port=args.port)
+        print(f"fake streaming STT on {server.url}")
+        server._server.serve_forever()
+        return
+    server = services[args.service](args.latency, port=args.port, certfile=args.certfile, keyfile=args.keyfile)
+    print(f"fake {args.service} on {server.url}")
+    server._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Fast-path slot extraction benchmark.
+
+Replays a transcript corpus (one caller answer per line, with the slot the
+caller was prompted for) through FastPathSlotExtractor and reports how many
+turns still need the LLM, how accurate the rule values are, how many
+answers were dropped (nothing resolved and the LLM skipped), and the
+latency saved per turn given an LLM round-trip time.
+
+    python -m benchmarks.fast_path_slots [--corpus PATH] [--llm-latency-ms 650]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from app.core.models import SlotSchema
+from app.core.slot_rules import FastPathSlotExtractor
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "slot_transcripts.jsonl")
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def missing_from(asked):
+    """Slots still open when the caller is prompted for `asked` (schema order)"""
+    order = [slot.id.value for slot in SlotSchema().slots]
+    return order[order.index(asked):]
+
+
+def run(corpus, llm_latency_ms, repeat):
+    llm_calls = dropped = 0
+    resolved = correct = 0
+    timings = []
+
+    for item in corpus:
+        missing = missing_from(item["asked"])
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = FastPathSlotExtractor.extract(item["text"], missing, expected=item["asked"])
+            timings.append(time.perf_counter() - t0)
+
+        if result.needs_llm:
+            llm_calls += 1
+        elif item["expect"] and not result.values:
+            dropped += 1
+        for slot, value in result.values.items():
+            resolved += 1
+            if item["expect"].get(slot, "").lower() == value.lower():
+                correct += 1
+
+    turns = len(corpus)
+    fast_ms = statistics.mean(timings) * 1000
+    saved_ms = (turns - llm_calls) / turns * llm_latency_ms - fast_ms
+    return {
+        "turns": turns,
+        "llm_calls_before": turns,
+        "llm_calls_after": llm_calls,
+        "llm_call_rate": round(llm_calls / turns, 3),
+        "rule_values": resolved,
+        "rule_precision": round(correct / resolved, 3) if resolved else None,
+        "dropped_answers": dropped,
+        "fast_path_mean_ms": round(fast_ms, 4),
+        "fast_path_p99_ms": round(sorted(timings)[int(len(timings) * 0.99) - 1] * 1000, 4),
+        "assumed_llm_latency_ms": llm_latency_ms,
+        "mean_latency_saved_per_turn_ms": round(saved_ms, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--llm-latency-ms", type=float, default=650.0,
+                        help="observed gpt-4.1-nano round trip to credit per skipped call")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    report = run(load_corpus(args.corpus), args.llm_latency_ms, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
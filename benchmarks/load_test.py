@@ -0,0 +1,264 @@
+"""
+Capacity of the voice agent under simulated calls.
+
+Starts the local fakes from benchmarks.fakes (recording host over TLS,
+Deepgram and OpenAI, each with a --*-latency of "median_ms[:sigma[:error_rate]]",
+and with --assemblyai-latency AssemblyAI as the second STT provider),
+runs the app under gunicorn with app/gunicorn.conf.py pointed at them, and
+drives --calls calls, --concurrency at a time. Each call is /answer, then
+--turns caller turns: the recording-status callback and the
+/process-recording action fired together, as Twilio does when a recording
+ends, with --think-ms of prompt and speech before each. Uses REDIS_URL, or
+an in-process fake Redis with --fake-redis (needs fakeredis and lupa).
+
+Reports calls and turns per second, turn latency (the /process-recording
+response time the caller waits through) p50/p95/p99, failed turns, and
+worker saturation: requests in flight sampled from /metrics against the
+workers x worker_connections the server was started with.
+
+    python -m benchmarks.load_test [--calls 200] [--concurrency 50] [--turns 11] \\
+        [--think-ms 500] [--workers 2] [--worker-class gevent] [--fake-redis] \\
+        [--deepgram-latency 300:0.4] [--openai-latency 400:0.5:0.01] [--recording-latency 80:0.3] \\
+        [--assemblyai-latency 400:0.3]
+    python -m benchmarks.load_test --app-url http://127.0.0.1:8080 ...   # app already running
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.fakes import (
+    CALL_SCRIPT, FakeAssemblyAI, FakeDeepgram, FakeOpenAI, FakeRecordingHost, Latency, start_fake_redis,
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESSION_ID = re.compile(rb"session_id=([0-9A-Za-z-]+)")
+IN_FLIGHT = re.compile(r'^voice_agent_requests_in_flight\{[^}]*\} ([0-9.e+-]+)$', re.M)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 1)
+
+
+def self_signed_cert(directory):
+    """Certificate for 127.0.0.1 so the app downloads recordings over https, as it requires"""
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def start_app(args, env, directory):
+    port = 18000 + os.getpid() % 1000
+    env = dict(env, PORT=str(port), GUNICORN_WORKERS=str(args.workers),
+               GUNICORN_WORKER_CLASS=args.worker_class,
+               GUNICORN_WORKER_CONNECTIONS=str(args.worker_connections),
+               PROMETHEUS_MULTIPROC_DIR=os.path.join(directory, "metrics"))
+    os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"])
+    app_log = open(os.path.join(directory, "app.out"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "app/gunicorn.conf.py", "app.main:app"],
+        env=env, cwd=REPO_ROOT, stdout=app_log, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/", timeout=1).ok:
+                return process, url
+        except requests.RequestException:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.2)
+    process.kill()
+    with open(app_log.name) as f:
+        raise RuntimeError("app did not start:\n" + f.read()[-3000:])
+
+
+class CallSimulator:
+    """One simulated caller per call; records per-turn latency and failures"""
+
+    def __init__(self, app_url, recordings_url, turns, think):
+        self.app_url = app_url
+        self.recordings_url = recordings_url
+        self.turns = turns
+        self.think = think
+        self.answer_latency = []
+        self.turn_latency = []
+        self.failures = {}
+        self.completed = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._callbacks = ThreadPoolExecutor(64, thread_name_prefix="status-callback")
+
+    def _http(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _fail(self, kind):
+        with self._lock:
+            self.failures[kind] = self.failures.get(kind, 0) + 1
+
+    def _post(self, path, data):
+        start = time.perf_counter()
+        response = self._http().post(f"{self.app_url}{path}", data=data, timeout=60)
+        return response, time.perf_counter() - start
+
+    def _status_callback(self, session_id, data):
+        try:
+            self._post(f"/recording-status?session_id={session_id}", data)
+        except requests.RequestException:
+            self._fail("status_callback_error")
+
+    def call(self, n):
+        call_sid = f"CA{uuid.uuid4().hex}"
+        caller = {"From": f"+9198{n:08d}", "To": "+918000000000", "CallSid": call_sid}
+        try:
+            response, elapsed = self._post("/answer", caller)
+        except requests.RequestException:
+            self._fail("answer_error")
+            return
+        match = SESSION_ID.search(response.content)
+        if response.status_code != 200 or not match:
+            self._fail(f"answer_{response.status_code}")
+            return
+        with self._lock:
+            self.answer_latency.append(elapsed)
+        session_id = match.group(1).decode()
+
+        for turn in range(self.turns):
+            time.sleep(self.think)
+            recording = {"RecordingUrl": f"{self.recordings_url}/rec/{call_sid}/{turn}",
+                         "RecordingSid": f"RE{call_sid[2:]}{turn:02d}", "CallSid": call_sid}
+            self._callbacks.submit(self._status_callback, session_id, dict(recording, RecordingStatus="completed"))
+            try:
+                response, elapsed = self._post(f"/process-recording?session_id={session_id}",
+                                               dict(caller, **recording))
+            except requests.RequestException:
+                self._fail("turn_error")
+                return
+            if response.status_code != 200 or b"error_audio" in response.content:
+                self._fail(f"turn_{response.status_code}")
+                return
+            with self._lock:
+                self.turn_latency.append(elapsed)
+            if b"<Hangup" in response.content:
+                break
+        with self._lock:
+            self.completed += 1
+
+
+def sample_in_flight(app_url, stop, samples):
+    while not stop.is_set():
+        try:
+            text = requests.get(f"{app_url}/metrics", timeout=2).text
+            # Minus this scrape itself
+            samples.append(max(0.0, sum(float(value) for value in IN_FLIGHT.findall(text)) - 1))
+        except requests.RequestException:
+            pass
+        stop.wait(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=len(CALL_SCRIPT))
+    parser.add_argument("--think-ms", type=float, default=500)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--worker-class", default="gevent")
+    parser.add_argument("--worker-connections", type=int, default=100)
+    parser.add_argument("--recording-latency", type=Latency.parse, default=Latency(80, 0.3))
+    parser.add_argument("--deepgram-latency", type=Latency.parse, default=Latency(300, 0.4))
+    parser.add_argument("--openai-latency", type=Latency.parse, default=Latency(400, 0.5))
+    parser.add_argument("--assemblyai-latency", type=Latency.parse,
+                        help="also run the AssemblyAI fake, as the second STT provider")
+    parser.add_argument("--fake-redis", action="store_true")
+    parser.add_argument("--app-url", help="drive an app that is already running (and pointed at the fakes)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = self_signed_cert(directory)
+        recordings = FakeRecordingHost(args.recording_latency, certfile=cert, keyfile=key).start()
+        deepgram = FakeDeepgram(args.deepgram_latency).start()
+        openai = FakeOpenAI(args.openai_latency).start()
+        fakes = {"recordings": recordings, "deepgram": deepgram, "openai": openai}
+        stt_env = {}
+        if args.assemblyai_latency:
+            fakes["assemblyai"] = FakeAssemblyAI(args.assemblyai_latency).start()
+            stt_env = {"ASSEMBLYAI_API_URL": f"{fakes['assemblyai'].url}/v2", "ASSEMBLYAI_API_KEY": "fake"}
+
+        process = None
+        app_url = args.app_url
+        if not app_url:
+            env = dict(
+                os.environ,
+                REDIS_URL=start_fake_redis() if args.fake_redis else os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+                DEEPGRAM_API_URL=f"{deepgram.url}/v1/listen", DEEPGRAM_API_KEY="fake",
+                OPENAI_BASE_URL=f"{openai.url}/v1", OPENAI_API_KEY="fake",
+                REQUESTS_CA_BUNDLE=cert,
+                # Every call comes from the same number here
+                RATE_LIMIT_CALLER_CAPACITY="1000000", RATE_LIMIT_NUMBER_CAPACITY="1000000",
+                SLOT_CACHE_ENABLED="False", TESTING="True", LOG_LEVEL="WARNING",
+                **stt_env,
+            )
+            process, app_url = start_app(args, env, directory)
+
+        simulator = CallSimulator(app_url, recordings.url, args.turns, args.think_ms / 1000)
+        stop, in_flight = threading.Event(), []
+        sampler = threading.Thread(target=sample_in_flight, args=(app_url, stop, in_flight), daemon=True)
+        sampler.start()
+        start = time.time()
+        try:
+            with ThreadPoolExecutor(args.concurrency, thread_name_prefix="caller") as callers:
+                list(callers.map(simulator.call, range(args.calls)))
+            elapsed = time.time() - start
+        finally:
+            stop.set()
+            if process:
+                process.terminate()
+                process.wait(30)
+
+    turns = simulator.turn_latency
+    capacity = args.workers * args.worker_connections if args.worker_class == "gevent" else args.workers
+    print(json.dumps({
+        "calls": args.calls,
+        "completed_calls": simulator.completed,
+        "elapsed_s": round(elapsed, 1),
+        "calls_per_s": round(simulator.completed / elapsed, 2),
+        "turns_per_s": round(len(turns) / elapsed, 2),
+        "turn_latency_ms": {"p50": percentile(turns, 0.5), "p95": percentile(turns, 0.95),
+                            "p99": percentile(turns, 0.99),
+                            "mean": round(statistics.mean(turns) * 1000, 1) if turns else None},
+        "answer_latency_ms": {"p50": percentile(simulator.answer_latency, 0.5),
+                              "p99": percentile(simulator.answer_latency, 0.99)},
+        "failures": simulator.failures,
+        "saturation": {
+            "in_flight_peak": max(in_flight, default=0),
+            "in_flight_mean": round(statistics.mean(in_flight), 1) if in_flight else 0,
+            "capacity": capacity,
+        },
+        "fakes": {name: fake.stats() for name, fake in fakes.items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
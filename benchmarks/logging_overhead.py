@@ -0,0 +1,96 @@
+"""
+Logging cost on the request path.
+
+Emits the log lines of one recording turn (a few INFO lines plus the
+per-turn verbose detail) --requests times, --gap-ms apart, once with the
+handlers called inline (console + rotating file, the previous setup) and
+once through setup_logging's queue, listener thread and sampling. Output goes to a
+temporary directory with the console sent to /dev/null. Reports p50/p99
+microseconds per request as seen by the caller.
+
+    python -m benchmarks.logging_overhead [--requests 5000] [--verbose-lines 8] [--gap-ms 1]
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+from flask import Flask
+
+from app.config import Config
+from app.utils import logging_config
+
+
+def one_request(n, logger, verbose_logger, verbose_lines):
+    logger.info(f"New session: CA{n} (+919800000000 -> +918000000000)")
+    for line in range(verbose_lines):
+        verbose_logger.info(f"Current slots: {{'rent_or_buy': 'rent', 'location': 'Kondapur'}} ({line})")
+    logger.info(f"Session CA{n}: 'two BHK in Kondapur' [en]")
+
+
+def measure(requests, verbose_lines, gap):
+    logger = logging.getLogger("app.api.routestwilio")
+    verbose_logger = logging.getLogger("app.api.routestwilio.verbose")
+    timings = []
+    for n in range(requests):
+        t0 = time.perf_counter()
+        one_request(n, logger, verbose_logger, verbose_lines)
+        timings.append((time.perf_counter() - t0) * 1e6)
+        time.sleep(gap)     # the rest of the request
+    timings.sort()
+    return {
+        "p50_us": round(statistics.median(timings), 1),
+        "p99_us": round(timings[int(len(timings) * 0.99) - 1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--verbose-lines", type=int, default=8)
+    parser.add_argument("--gap-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    devnull = open(os.devnull, "w")
+    stdout = sys.stdout
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+
+        # Before: handlers called on the request thread
+        console = logging.StreamHandler(devnull)
+        file_handler = RotatingFileHandler("sync.log", maxBytes=10485760, backupCount=5)
+        for handler in (console, file_handler):
+            handler.setFormatter(logging.Formatter(Config.LOG_FORMAT))
+            root.addHandler(handler)
+        inline = measure(args.requests, args.verbose_lines, args.gap_ms / 1000)
+        for handler in (console, file_handler):
+            root.removeHandler(handler)
+            handler.close()
+
+        # After: queue + listener thread + sampling
+        sys.stdout = devnull
+        try:
+            logging_config.setup_logging(Flask(__name__))
+            queued = measure(args.requests, args.verbose_lines, args.gap_ms / 1000)
+            logging_config._stop_listener()
+        finally:
+            sys.stdout = stdout
+
+    print(json.dumps({
+        "requests": args.requests,
+        "lines_per_request": args.verbose_lines + 2,
+        "inline_handlers": inline,
+        "queued_sampled": queued,
+        "dropped": logging_config._queue_handler.dropped,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
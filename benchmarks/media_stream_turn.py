@@ -0,0 +1,93 @@
+"""
+Streaming turn latency benchmark.
+
+Runs the app in stream mode against FakeStreamingSTT, places a call through
+/answer, then plays a Twilio Media Stream (20 ms μ-law frames in real time)
+to /media-stream. Reports the time from the end of the caller's speech to
+the socket close (when Twilio would request /stream-turn) and the end to
+end time until the next prompt's TwiML is ready. Needs Redis at REDIS_URL.
+
+    python -m benchmarks.media_stream_turn [--turns 5] [--transcript "I want a 2 BHK"]
+"""
+import argparse
+import base64
+import json
+import os
+import re
+import statistics
+import threading
+import time
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+from werkzeug.serving import make_server
+
+from benchmarks.fakes import FakeStreamingSTT
+
+FRAME = base64.b64encode(b"\xff" * 160).decode()   # 20 ms of μ-law silence
+FRAME_SECONDS = 0.02
+
+
+def play_turn(base_url, session_id, speech_seconds, trailing_seconds):
+    """Stream one turn; returns (speech end, socket closed) timestamps"""
+    ws = connect(f"{base_url.replace('http', 'ws', 1)}/media-stream")
+    ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+    ws.send(json.dumps({"event": "start", "streamSid": "MZbench",
+                        "start": {"customParameters": {"session_id": session_id}}}))
+    speech_end = None
+    frames = int((speech_seconds + trailing_seconds) / FRAME_SECONDS)
+    try:
+        for n in range(1, frames + 1):
+            ws.send(json.dumps({"event": "media", "media": {"payload": FRAME}}))
+            if speech_end is None and n * FRAME_SECONDS >= speech_seconds:
+                speech_end = time.perf_counter()
+            time.sleep(FRAME_SECONDS)
+        ws.send(json.dumps({"event": "stop"}))
+        ws.recv()
+    except ConnectionClosed:
+        pass
+    return speech_end, time.perf_counter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--transcript", default="I want a 2 BHK",
+                        help="what the fake caller says each turn")
+    parser.add_argument("--speech-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    stt = FakeStreamingSTT(args.transcript, args.speech_seconds).start()
+    os.environ.update({"CONVERSATION_MODE": "stream", "DEEPGRAM_STREAMING_URL": stt.url,
+                       "DEEPGRAM_API_KEY": os.environ.get("DEEPGRAM_API_KEY", "bench")})
+    from app.main import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    client = app.test_client()
+
+    to_close, to_twiml = [], []
+    for n in range(args.turns):
+        twiml = client.post("/answer", data={"From": f"+9190000{n:05d}", "To": "+919999900000"}).get_data(as_text=True)
+        session_id = re.search(r'name="session_id" value="([^"]+)"', twiml).group(1)
+
+        speech_end, closed = play_turn(base_url, session_id, args.speech_seconds, trailing_seconds=3.0)
+        next_twiml = client.post(f"/stream-turn?session_id={session_id}").get_data(as_text=True)
+        to_close.append((closed - speech_end) * 1000)
+        to_twiml.append((time.perf_counter() - speech_end) * 1000)
+        if n == 0:
+            print(next_twiml.strip())
+
+    server.shutdown()
+    stt.stop()
+    print(json.dumps({
+        "turns": args.turns,
+        "transcript": args.transcript,
+        "speech_end_to_socket_close_ms": round(statistics.median(to_close), 1),
+        "speech_end_to_next_prompt_ms": round(statistics.median(to_twiml), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Cost of the stage metrics on the request path.
+
+Times --iterations of metrics.stage() around an empty block and of
+metrics.observe_redis() (what every Redis command now pays), in this
+process' registry or, with PROMETHEUS_MULTIPROC_DIR set, the mmap files
+gunicorn workers share. Also reports how long /metrics takes to render.
+
+    python -m benchmarks.metrics_overhead [--iterations 100000]
+    PROMETHEUS_MULTIPROC_DIR=$(mktemp -d) python -m benchmarks.metrics_overhead
+"""
+import argparse
+import json
+import os
+import time
+
+from app.core import metrics
+
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) / iterations * 1e6, 2)
+
+
+def empty_stage():
+    with metrics.stage("bench"):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    metrics.bind("bench", "en")
+    results = {
+        "multiprocess": bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR")),
+        "stage_us": per_call_us(empty_stage, args.iterations),
+        "redis_observe_us": per_call_us(lambda: metrics.observe_redis("GET", 0.0004), args.iterations),
+    }
+    start = time.perf_counter()
+    body, _ = metrics.exposition()
+    results["exposition_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    results["exposition_bytes"] = len(body)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Virtual number lookup benchmark.
+
+Writes a number_map.json with --entries virtual numbers and looks up random
+numbers (90% mapped) with:
+
+  reload_per_lookup  the previous get_personal_number: open + json.load per SMS
+  dict               the parsed JSON dict, loaded once
+  number_map         NumberMap: sorted int64 arrays + bisect, mtime refresh
+
+Reports lookups per second and the memory held by the loaded structure.
+
+    python -m benchmarks.number_map [--entries 100000] [--lookups 200000]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from app.utils.number_map import NumberMap
+
+
+def measured(load):
+    tracemalloc.start()
+    value = load()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def rate(fn, numbers):
+    start = time.perf_counter()
+    for number in numbers:
+        fn(number)
+    return round(len(numbers) / (time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    virtual = [f"+9180{n:08d}" for n in rng.sample(range(10 ** 8), args.entries)]
+    mapping = {number: f"+9198{rng.randrange(10 ** 8):08d}" for number in virtual}
+    numbers = [rng.choice(virtual) if rng.random() < 0.9 else f"+9170{rng.randrange(10 ** 8):08d}"
+               for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "number_map.json")
+        with open(path, "w") as f:
+            json.dump(mapping, f)
+
+        def reload_lookup(number):
+            with open(path) as f:
+                return json.load(f).get(number)
+
+        def load_index():
+            index = NumberMap(path)
+            len(index)  # loads on first use
+            return index
+
+        loaded, dict_bytes = measured(lambda: json.load(open(path)))
+        number_map, map_bytes = measured(load_index)
+        assert all(number_map.get(n) == loaded.get(n) for n in numbers[:5000])
+
+        report = {
+            "entries": args.entries,
+            "reload_per_lookup": {"lookups_per_second": rate(reload_lookup, numbers[:max(1, args.lookups // 2000)])},
+            "dict": {"lookups_per_second": rate(loaded.get, numbers), "memory_bytes": dict_bytes},
+            "number_map": {"lookups_per_second": rate(number_map.get, numbers), "memory_bytes": map_bytes},
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
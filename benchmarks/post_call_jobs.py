@@ -0,0 +1,121 @@
+"""
+Post-call work under a burst of completed calls.
+
+Completes --calls calls at once, each needing --work-ms of I/O-bound
+post-call work (summary + SMS API call), and compares:
+
+  thread_per_call  the previous cleanup: one daemon thread per completed call
+  job_queue        JobQueue on a Redis stream with --workers consumers
+
+Reports peak live threads, time to hand off the burst (what the request
+thread pays), time until all work is done, jobs per second, and for the queue
+the largest backlog seen. Needs Redis at REDIS_URL.
+
+    python -m benchmarks.post_call_jobs [--calls 2000] [--work-ms 50] [--workers 16]
+"""
+import argparse
+import json
+import threading
+import time
+
+from app.core.jobs import JobQueue
+from app.core.redis_manager import redis_manager
+
+
+class Probe:
+    """Samples live threads (and queue backlog) while a run is in progress"""
+
+    def __init__(self, queue=None):
+        self.queue = queue
+        self.peak_threads = 0
+        self.peak_backlog = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            if self.queue:
+                self.peak_backlog = max(self.peak_backlog, redis_manager.redis.xlen(self.queue.stream))
+            self._stop.wait(0.01)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def thread_per_call(calls, work):
+    done = threading.Semaphore(0)
+
+    def cleanup(n):
+        work()
+        done.release()
+
+    with Probe() as probe:
+        start = time.perf_counter()
+        for n in range(calls):
+            threading.Thread(target=cleanup, args=(n,), daemon=True).start()
+        handed_off = time.perf_counter() - start
+        for _ in range(calls):
+            done.acquire()
+        elapsed = time.perf_counter() - start
+    return report(calls, handed_off, elapsed, probe)
+
+
+def job_queue(calls, work, workers):
+    queue = JobQueue(f"bench-{time.time()}", workers=workers, visibility_timeout=30)
+    done = threading.Semaphore(0)
+
+    @queue.handler("lead_summary")
+    def cleanup(n):
+        work()
+        done.release()
+
+    queue.start()
+    try:
+        with Probe(queue) as probe:
+            start = time.perf_counter()
+            for n in range(calls):
+                queue.enqueue("lead_summary", {"n": n})
+            handed_off = time.perf_counter() - start
+            for _ in range(calls):
+                done.acquire()
+            elapsed = time.perf_counter() - start
+        result = report(calls, handed_off, elapsed, probe)
+        result["peak_backlog"] = probe.peak_backlog
+        result["stats"] = queue.stats()
+        return result
+    finally:
+        queue.stop()
+        redis_manager.redis.delete(queue.stream, queue.dead_stream)
+
+
+def report(calls, handed_off, elapsed, probe):
+    return {
+        "peak_threads": probe.peak_threads,
+        "handoff_ms": round(handed_off * 1000, 1),
+        "drain_s": round(elapsed, 2),
+        "jobs_per_second": round(calls / elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--work-ms", type=float, default=50)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    work = lambda: time.sleep(args.work_ms / 1000)
+    print(json.dumps({
+        "thread_per_call": thread_per_call(args.calls, work),
+        "job_queue": job_queue(args.calls, work, args.workers),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
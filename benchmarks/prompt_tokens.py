@@ -0,0 +1,54 @@
+"""
+Slot-extraction prompt size benchmark.
+
+Counts system-prompt tokens with tiktoken for every missing-slot set a call
+walks through (the schema order suffixes) plus each single-slot prompt, and
+compares them with the full prompt the service used to send on every turn
+(all descriptions, all eight examples). Also times compiled vs cached
+prompt assembly.
+
+    python -m benchmarks.prompt_tokens [--max-examples 4]
+"""
+import argparse
+import json
+import timeit
+
+from app.core.models import SlotSchema
+from app.core.prompts import SLOT_EXAMPLES, SlotPromptCompiler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-examples", type=int, default=4)
+    args = parser.parse_args()
+
+    order = [slot.id.value for slot in SlotSchema().slots]
+    full = SlotPromptCompiler.system_prompt(order, max_examples=len(SLOT_EXAMPLES))
+    full_tokens = SlotPromptCompiler.token_count(full)
+
+    rows = []
+    scenarios = [("call turn %d" % (i + 1), order[i:]) for i in range(len(order))]
+    scenarios += [(f"only {slot}", [slot]) for slot in order]
+    for name, slots in scenarios:
+        prompt = SlotPromptCompiler.system_prompt(slots, args.max_examples)
+        tokens = SlotPromptCompiler.token_count(prompt)
+        rows.append({"scenario": name, "slots": len(slots), "tokens": tokens,
+                     "saved_pct": round(100 * (1 - tokens / full_tokens), 1)})
+
+    walk = [row["tokens"] for row in rows[:len(order)]]
+    SlotPromptCompiler._compile.cache_clear()
+    cold = timeit.timeit(lambda: (SlotPromptCompiler._compile.cache_clear(),
+                                  SlotPromptCompiler.system_prompt(order[3:], args.max_examples)), number=2000)
+    warm = timeit.timeit(lambda: SlotPromptCompiler.system_prompt(order[3:], args.max_examples), number=2000)
+
+    print(json.dumps({
+        "full_prompt_tokens": full_tokens,
+        "mean_tokens_per_call_turn": round(sum(walk) / len(walk), 1),
+        "assembly_us_uncached": round(cold / 2000 * 1e6, 2),
+        "assembly_us_cached": round(warm / 2000 * 1e6, 2),
+        "scenarios": rows,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
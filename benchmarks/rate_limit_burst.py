@@ -0,0 +1,125 @@
+"""
+Call admission under a robocall burst.
+
+Fires --calls /answer admission checks from --callers spoofed caller IDs at a
+single virtual number across --threads threads, and compares:
+
+  zset_log          the previous per-caller sliding-window log (ZADD str(now),
+                    ZREMRANGEBYSCORE, ZCARD, EXPIRE in one pipeline)
+  bucket            TokenBucketLimiter, caller + number buckets in one EVALSHA
+  bucket_prefilter  the same with the per-worker denial cache (production)
+
+Reports calls admitted, Redis round trips and commands sent, and the mean
+decision time. Needs Redis at REDIS_URL.
+
+    python -m benchmarks.rate_limit_burst [--calls 5000] [--callers 50] [--threads 16]
+"""
+import argparse
+import json
+import threading
+import time
+
+from app.config import Config
+from app.core.rate_limit import Bucket, TokenBucketLimiter
+from app.core.redis_manager import redis_manager
+
+
+class Counter:
+    def __init__(self):
+        self.round_trips = 0
+        self.commands = 0
+        self._lock = threading.Lock()
+
+    def add(self, round_trips, commands):
+        with self._lock:
+            self.round_trips += round_trips
+            self.commands += commands
+
+
+def zset_log(counter, caller, number, now_tag):
+    client = redis_manager.redis
+    now = int(time.time())
+    key = f"bench:ratelimit:{now_tag}:{caller}"
+    pipe = client.pipeline()
+    pipe.zadd(key, {str(now): now})
+    pipe.zremrangebyscore(key, 0, now - Config.RATE_LIMIT_CALLER_WINDOW)
+    pipe.zcard(key)
+    pipe.expire(key, Config.RATE_LIMIT_CALLER_WINDOW * 2)
+    _, _, count, _ = pipe.execute()
+    counter.add(1, 4)
+    return count <= Config.RATE_LIMIT_CALLER_CAPACITY
+
+
+def token_bucket(limiter, counter, caller, number, now_tag):
+    buckets = [
+        Bucket(f"bench:ratelimit:{now_tag}:caller:{caller}", Config.RATE_LIMIT_CALLER_CAPACITY,
+               Config.RATE_LIMIT_CALLER_CAPACITY / Config.RATE_LIMIT_CALLER_WINDOW),
+        Bucket(f"bench:ratelimit:{now_tag}:number:{number}", Config.RATE_LIMIT_NUMBER_CAPACITY,
+               Config.RATE_LIMIT_NUMBER_CAPACITY / Config.RATE_LIMIT_NUMBER_WINDOW),
+    ]
+    decision = limiter.allow(buckets)
+    if not decision.local:
+        counter.add(1, 1)
+    return decision.allowed
+
+
+def run(name, check, calls, callers, threads):
+    counter = Counter()
+    admitted = [0]
+    lock = threading.Lock()
+    tag = f"{name}:{time.time()}"
+    per_thread = calls // threads
+
+    def worker(n):
+        allowed = 0
+        for i in range(per_thread):
+            caller = f"+9180000{(n * per_thread + i) % callers:05d}"
+            if check(counter, caller, "+919999900000", tag):
+                allowed += 1
+        with lock:
+            admitted[0] += allowed
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for key in redis_manager.redis.scan_iter(f"bench:ratelimit:{tag}:*"):
+        redis_manager.redis.delete(key)
+    total = per_thread * threads
+    return {
+        "calls": total,
+        "admitted": admitted[0],
+        "redis_round_trips": counter.round_trips,
+        "redis_commands": counter.commands,
+        "mean_decision_us": round(elapsed / total * threads * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--callers", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    plain = TokenBucketLimiter(local_prefilter=False)
+    prefilter = TokenBucketLimiter()
+    report = {
+        "limits": {
+            "caller": f"{Config.RATE_LIMIT_CALLER_CAPACITY}/{Config.RATE_LIMIT_CALLER_WINDOW}s",
+            "number": f"{Config.RATE_LIMIT_NUMBER_CAPACITY}/{Config.RATE_LIMIT_NUMBER_WINDOW}s",
+        },
+        "zset_log": run("zset", zset_log, args.calls, args.callers, args.threads),
+        "bucket": run("bucket", lambda *a: token_bucket(plain, *a), args.calls, args.callers, args.threads),
+        "bucket_prefilter": run("prefilter", lambda *a: token_bucket(prefilter, *a),
+                                args.calls, args.callers, args.threads),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
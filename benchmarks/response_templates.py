@@ -0,0 +1,139 @@
+"""
+Voice response generation throughput.
+
+Builds the response for a listening turn (prompt + Record with per-session
+callback URLs) and for the end of a call, for both providers:
+
+  twiml_fstring   the previous TwiMLGenerator: URL validation and an f-string
+                  per response, wrapped in a Flask Response
+  twiml_template  TwiMLGenerator over the precompiled byte templates
+  exoml_jsonify   the previous ExomlGenerator: validated dict through jsonify
+  exoml_template  ExomlGenerator over the precompiled JSON byte templates
+
+Reports, per thread, bodies per second, complete Flask responses per second
+(what a route returns) and the body size. exoml_jsonify's body is the dict
+only; jsonify serializes it while building the response. Importing the route
+modules needs DEEPGRAM_API_KEY set (any value) and Redis at REDIS_URL.
+
+    python -m benchmarks.response_templates [--number 50000]
+"""
+import argparse
+import json
+import timeit
+import uuid
+
+from flask import Flask, Response, jsonify
+
+from app.api import routesexotel, routestwilio
+from app.core.models import SlotID
+
+BASE_URL = "https://voice-agent.example.run.app"
+
+
+def validate(url):
+    return url and (url.startswith('https://') or url.startswith('http://')) and len(url) < 500
+
+
+def twiml_fstring_listen(audio_url, session_id, max_length):
+    record_action_url = f"{BASE_URL}/process-recording?session_id={session_id}"
+    recording_callback_url = f"{BASE_URL}/recording-status?session_id={session_id}"
+    if not all([validate(audio_url), validate(record_action_url), validate(recording_callback_url),
+                1 <= max_length <= 120]):
+        raise ValueError("Invalid TwiML parameters")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <Response>
+            <Play>{audio_url}</Play>
+            <Record maxLength="{max_length}" action="{record_action_url}"
+                   recordingStatusCallback="{recording_callback_url}"
+                   playBeep="true" timeout="5" />
+        </Response>"""
+
+
+def twiml_fstring_hangup(audio_url):
+    if not validate(audio_url):
+        raise ValueError("Invalid audio URL")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+        <Response>
+            <Play>{audio_url}</Play>
+            <Hangup/>
+        </Response>"""
+
+
+def exoml_jsonify_listen(audio_url, session_id, max_length):
+    record_action_url = f"{BASE_URL}/process-recording?session_id={session_id}"
+    recording_callback_url = f"{BASE_URL}/recording-status?session_id={session_id}"
+    if not all([validate(audio_url), validate(record_action_url), validate(recording_callback_url),
+                1 <= max_length <= 3600]):
+        raise ValueError("Invalid Exoml parameters")
+    return {"Exoml": [
+        {"Play": {"url": audio_url}},
+        {"Record": {"max_length": max_length, "finish_on_key": "#", "play_beep": True, "timeout": 5,
+                    "action": record_action_url, "status_callback": recording_callback_url}},
+    ]}
+
+
+def exoml_jsonify_hangup(audio_url):
+    if not validate(audio_url):
+        raise ValueError("Invalid audio URL")
+    return {"Exoml": [{"Play": {"url": audio_url}}, {"Hangup": {}}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=50000)
+    args = parser.parse_args()
+
+    twilio, exotel = routestwilio, routesexotel
+    audio = twilio.AudioUrlBuilder.get_slot_audio_url(SlotID.location, "hi")
+    confirmation = twilio.AudioUrlBuilder.get_confirmation_audio_url("hi")
+    session_id = str(uuid.uuid4())
+    max_length = twilio.config.MAX_RECORD_LENGTH
+
+    twiml = lambda body: Response(body, mimetype="application/xml")
+    twiml_gen, exoml_gen = twilio.TwiMLGenerator, exotel.ExomlGenerator
+    # name -> (wrap body into the route's response, listen body, hangup body)
+    cases = {
+        "twiml_fstring": (
+            twiml,
+            lambda: twiml_fstring_listen(audio, session_id, max_length),
+            lambda: twiml_fstring_hangup(confirmation),
+        ),
+        "twiml_template": (
+            twiml,
+            lambda: twiml_gen.create_listen_response(audio, BASE_URL, session_id),
+            lambda: twiml_gen.create_play_hangup_response(confirmation),
+        ),
+        "exoml_jsonify": (
+            jsonify,
+            lambda: exoml_jsonify_listen(audio, session_id, max_length),
+            lambda: exoml_jsonify_hangup(confirmation),
+        ),
+        "exoml_template": (
+            exotel.exoml_response,
+            lambda: exoml_gen.create_play_record_response(audio, BASE_URL, session_id),
+            lambda: exoml_gen.create_play_hangup_response(confirmation),
+        ),
+    }
+
+    def per_second(fn):
+        return round(args.number / timeit.timeit(fn, number=args.number))
+
+    with Flask(__name__).app_context():
+        # Same document either way
+        assert json.loads(exoml_gen.create_play_record_response(audio, BASE_URL, session_id)) == \
+            exoml_jsonify_listen(audio, session_id, max_length)
+
+        report = {}
+        for name, (wrap, listen, hangup) in cases.items():
+            report[name] = {}
+            for kind, body in (("listen", listen), ("hangup", hangup)):
+                report[name][kind] = {
+                    "bodies_per_second": per_second(body),
+                    "responses_per_second": per_second(lambda: wrap(body())),
+                    "bytes": len(wrap(body()).get_data()),
+                }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Session encoding microbenchmark.
+
+Encodes and decodes a mid-call session (six slots filled) with:
+
+  json_blob     json.dumps(model_dump()) / model_validate(json.loads()), the
+                original one-key-per-session format
+  hash_named    hash with full field names and "slot:<id>" keys, validated
+                on read (the first hash layout)
+  hash_compact  session_codec v1: short field names, slot-index keys,
+                stored strings validated directly on read
+
+Bytes are the payload Redis stores: the JSON string, or the sum of hash
+field and value lengths. With --redis, MEMORY USAGE is also reported.
+
+    python -m benchmarks.session_codec [--number 20000] [--redis]
+"""
+import argparse
+import json
+import time
+import timeit
+import uuid
+
+from app.core import session_codec
+from app.core.models import UserSession
+
+
+def sample_session():
+    return UserSession(
+        session_id=str(uuid.uuid4()),
+        language="en",
+        slots_filled={
+            "tenant_name": "Amit", "rent_or_buy": "rent", "location": "Kondapur, Gachibowli",
+            "bhk_type": "2BHK", "tenant_type": "family", "facing": "East facing",
+        },
+        call_start_time=time.time() - 60,
+        last_interaction_time=time.time(),
+        interaction_count=6,
+        user_mobile="+919876543210",
+        virtual_number="+918012345678",
+    )
+
+
+def named_hash(session):
+    data = session.model_dump()
+    slots = data.pop("slots_filled")
+    data.pop("session_id")
+    mapping = {k: ("1" if v is True else "0" if v is False else str(v)) for k, v in data.items() if v is not None}
+    mapping.update({f"slot:{k}": v for k, v in slots.items()})
+    mapping["version"] = "1760781234123456"
+    return mapping
+
+
+def named_decode(session_id, raw):
+    fields, slots = {"session_id": session_id}, {}
+    for field, value in raw.items():
+        field, value = field.decode(), value.decode()
+        if field.startswith("slot:"):
+            slots[field[5:]] = value
+        elif field != "version":
+            fields[field] = value
+    fields["slots_filled"] = slots
+    return UserSession.model_validate(fields)
+
+
+def as_raw(mapping):
+    """What HGETALL returns for a mapping"""
+    return {k.encode(): str(v).encode() for k, v in mapping.items()}
+
+
+def hash_bytes(mapping):
+    return sum(len(str(k)) + len(str(v)) for k, v in mapping.items())
+
+
+def redis_memory(session_id, store):
+    from app.core.redis_manager import redis_manager
+    key = f"bench:codec:{session_id}"
+    client = redis_manager.redis
+    client.delete(key)
+    if isinstance(store, dict):
+        client.hset(key, mapping=store)
+    else:
+        client.set(key, store)
+    try:
+        return client.memory_usage(key)
+    except Exception:
+        return None
+    finally:
+        client.delete(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--redis", action="store_true", help="also measure MEMORY USAGE on REDIS_URL")
+    args = parser.parse_args()
+
+    session = sample_session()
+    sid = session.session_id
+    blob = json.dumps(session.model_dump())
+    named = named_hash(session)
+    compact = {**session_codec.encode(session), session_codec.VERSION_FIELD: "1760781234123456"}
+    named_raw, compact_raw = as_raw(named), as_raw(compact)
+    assert named_decode(sid, named_raw) == session
+    decoded = session_codec.decode(sid, compact_raw)[1]
+    assert decoded.slots_filled == session.slots_filled and decoded.interaction_count == 6
+
+    def per_call_us(fn):
+        return round(timeit.timeit(fn, number=args.number) / args.number * 1e6, 2)
+
+    report = {
+        "json_blob": {
+            "bytes": len(blob),
+            "encode_us": per_call_us(lambda: json.dumps(session.model_dump())),
+            "decode_us": per_call_us(lambda: UserSession.model_validate(json.loads(blob))),
+        },
+        "hash_named": {
+            "bytes": hash_bytes(named),
+            "encode_us": per_call_us(lambda: named_hash(session)),
+            "decode_us": per_call_us(lambda: named_decode(sid, named_raw)),
+        },
+        "hash_compact": {
+            "bytes": hash_bytes(compact),
+            "encode_us": per_call_us(lambda: session_codec.encode(session)),
+            "decode_us": per_call_us(lambda: session_codec.decode(sid, compact_raw)),
+        },
+    }
+    if args.redis:
+        for name, store in (("json_blob", blob), ("hash_named", named), ("hash_compact", compact)):
+            report[name]["redis_memory_usage"] = redis_memory(sid, store)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
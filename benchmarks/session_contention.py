@@ -0,0 +1,152 @@
+"""
+Session update contention benchmark.
+
+Hammers a handful of sessions from many threads, each turn reading the
+session and writing one slot, and compares:
+
+  json_watch  the previous layout: one JSON blob, WATCH/GET/SET retry loop
+              for the interaction count (sleeping 100 ms per conflict), then
+              a full-document SET with the merged slots
+  hash_lua    SessionManager.apply_turn: one EVALSHA per turn on a hash
+
+Reports throughput, per-turn latency, WATCH retries and lost updates
+(interaction counts or slots missing at the end). Needs Redis at REDIS_URL.
+
+    python -m benchmarks.session_contention [--threads 16] [--sessions 4] [--turns 50]
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import uuid
+
+import redis
+
+from app.core import sessions as session_store
+from app.core.models import UserSession
+from app.core.redis_manager import redis_manager
+from app.core.sessions import SessionManager
+
+# Benchmark sessions take far more turns than a real call is allowed
+session_store.config.MAX_INTERACTIONS = 10 ** 6
+
+
+class JsonWatchSessions:
+    """The blob-per-session store this benchmark compares against"""
+
+    def __init__(self, client):
+        self.client = client
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def create(self, session):
+        self.client.set(f"bench:session:{session.session_id}", json.dumps(session.model_dump()), ex=3600)
+
+    def turn(self, session_id, slot, value):
+        key = f"bench:session:{session_id}"
+        session = UserSession.model_validate(json.loads(self.client.get(key)))
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    current = json.loads(pipe.get(key))
+                    current["interaction_count"] += 1
+                    current["last_interaction_time"] = time.time()
+                    pipe.multi()
+                    pipe.set(key, json.dumps(current), ex=3600)
+                    pipe.execute()
+                    session.interaction_count = current["interaction_count"]
+                    session.last_interaction_time = current["last_interaction_time"]
+                    break
+                except redis.WatchError:
+                    with self._lock:
+                        self.retries += 1
+                    time.sleep(0.1)
+        session.slots_filled[slot] = value
+        self.client.set(key, json.dumps(session.model_dump()), ex=3600)
+
+    def load(self, session_id):
+        return UserSession.model_validate(json.loads(self.client.get(f"bench:session:{session_id}")))
+
+
+class HashLuaSessions:
+    retries = 0
+
+    def create(self, session):
+        SessionManager.save_session(session.session_id, session)
+
+    def turn(self, session_id, slot, value):
+        SessionManager.get_session(session_id)
+        SessionManager.apply_turn(session_id, {slot: value})
+
+    def load(self, session_id):
+        return SessionManager.get_session(session_id)
+
+
+def run(store, threads, sessions, turns):
+    ids = [str(uuid.uuid4()) for _ in range(sessions)]
+    for session_id in ids:
+        store.create(UserSession(session_id=session_id))
+
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(n):
+        session_id = ids[n % sessions]
+        local = []
+        for t in range(turns):
+            t0 = time.perf_counter()
+            store.turn(session_id, f"bench_{n}_{t}", "x")
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    expected_per_session = {session_id: 0 for session_id in ids}
+    for n in range(threads):
+        expected_per_session[ids[n % sessions]] += turns
+    lost_counts = lost_slots = 0
+    for session_id in ids:
+        final = store.load(session_id)
+        lost_counts += expected_per_session[session_id] - final.interaction_count
+        lost_slots += expected_per_session[session_id] - len(final.slots_filled)
+        redis_manager.redis.delete(f"session:{session_id}", f"bench:session:{session_id}")
+
+    latencies.sort()
+    return {
+        "turns": len(latencies),
+        "turns_per_sec": round(len(latencies) / elapsed, 1),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "watch_retries": store.retries,
+        "lost_interaction_counts": lost_counts,
+        "lost_slot_writes": lost_slots,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--sessions", type=int, default=4, help="threads are spread over this many sessions")
+    parser.add_argument("--turns", type=int, default=50, help="turns per thread")
+    args = parser.parse_args()
+
+    report = {
+        "threads": args.threads,
+        "sessions": args.sessions,
+        "json_watch": run(JsonWatchSessions(redis_manager.redis), args.threads, args.sessions, args.turns),
+        "hash_lua": run(HashLuaSessions(), args.threads, args.sessions, args.turns),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
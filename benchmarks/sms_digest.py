@@ -0,0 +1,74 @@
+"""
+Lead SMS volume with and without digests.
+
+Replays --leads completed calls spread over --seconds across --numbers
+virtual numbers (a few busy agents get most of the calls) through
+SmsDispatcher, once sending every lead and once with a --window digest.
+Twilio is replaced by a counter; reports API calls and billed segments
+(153 characters per concatenated GSM-7 segment). Needs Redis at REDIS_URL.
+
+    python -m benchmarks.sms_digest [--leads 300] [--seconds 6] [--window 2]
+"""
+import argparse
+import json
+import math
+import random
+import time
+
+from app.core import sms
+from app.core.jobs import JobQueue
+from app.core.redis_manager import redis_manager
+
+LEAD = ("Below is the Tenant requirements:\ntenant mobile number: +9198{n:08d}\n"
+        "tenant_name: Amit\nrent_or_buy: rent\nlocation: Kondapur\nbhk_type: 2BHK\n"
+        "tenant_type: family\nfacing: -\nfloor_pref: -\nbudget: 25000\nfurnishing: -")
+
+
+def run(args, window):
+    sent = []
+    sms.send_sms = lambda number, message: sent.append(message) or f"SM{len(sent)}"
+    queue = JobQueue(f"bench-sms-{time.time()}", workers=4, visibility_timeout=30)
+    queue.handler("sms_send")(lambda virtual_number, message: sent.append(message))
+    sms.post_call_jobs = queue
+    dispatcher = sms.SmsDispatcher(f"ACbench{time.time()}", account_rate=1000, number_rate=1000,
+                                   digest_window=window)
+    rng = random.Random(3)
+    numbers = [f"+9180{n:08d}" for n in range(args.numbers)]
+    weights = [1 / (rank + 1) for rank in range(args.numbers)]   # a few busy agents
+    queue.start()
+    try:
+        start = time.time()
+        for n in range(args.leads):
+            time.sleep(max(0, start + n * args.seconds / args.leads - time.time()))
+            dispatcher.submit(rng.choices(numbers, weights)[0], LEAD.format(n=n))
+            dispatcher.flush_due()
+        if window:
+            time.sleep(window)
+            dispatcher.flush_due()
+        deadline = time.time() + 10
+        while queue.stats()["backlog"] and time.time() < deadline:
+            time.sleep(0.1)
+    finally:
+        queue.stop()
+        redis_manager.redis.delete(queue.stream, queue.dead_stream)
+    return {
+        "api_calls": len(sent),
+        "segments": sum(math.ceil(len(message) / 153) for message in sent),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=300)
+    parser.add_argument("--numbers", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=6)
+    parser.add_argument("--window", type=float, default=2)
+    args = parser.parse_args()
+    print(json.dumps({
+        "per_lead": run(args, 0),
+        "digest": run(args, args.window),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Hot-path microbenchmark suite, saved per version for regression checks.
+
+Times sessions (get/save/apply_turn, and Exotel's update_interaction),
+rate limiting (allow_call, Exotel's token_bucket), TwiML/Exoml rendering,
+AudioUrlBuilder, next_missing_slot and the slot-extraction work before the
+OpenAI request (prompt build, fast path, cache key; the client is replaced
+by an instant fake). Redis-backed cases run against an in-process fake
+Redis unless --redis-url is given, so compare results from the same kind
+of Redis.
+
+Each case is calibrated to --min-time per round and run for --rounds
+rounds; the median per-call time is what --compare checks. Results go to
+benchmarks/results/<git sha>.json (or --save). --compare exits 1 if any
+case is more than --threshold slower than the saved run.
+
+    python -m benchmarks.suite [--filter render] [--rounds 7] [--min-time 0.1]
+    python -m benchmarks.suite --compare benchmarks/results/<sha>.json [--threshold 0.15]
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from benchmarks.fakes import start_fake_redis
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+# name -> setup(); setup returns the zero-argument callable to time
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _session(session_id=None, slots=None):
+    from app.core.models import UserSession
+    return UserSession(
+        session_id=session_id or str(uuid.uuid4()), user_mobile="+919876543210",
+        virtual_number="+918012345678", language="en", last_interaction_time=time.time(),
+        slots_filled=slots if slots is not None else {"tenant_name": "Amit", "rent_or_buy": "rent",
+                                                      "location": "Kondapur", "bhk_type": "2BHK"},
+    )
+
+
+@benchmark("session.get_session.cached")
+def _():
+    from app.core.sessions import SessionManager
+    session = _session()
+    SessionManager.save_session(session.session_id, session)
+    return lambda: SessionManager.get_session(session.session_id)
+
+
+@benchmark("session.get_session.redis")
+def _():
+    from app.core import sessions
+    session = _session()
+    sessions.SessionManager.save_session(session.session_id, session)
+
+    def run():
+        sessions._session_cache.discard(session.session_id)
+        sessions.SessionManager.get_session(session.session_id)
+    return run
+
+
+@benchmark("session.save_session")
+def _():
+    from app.core.sessions import SessionManager
+    session = _session()
+    return lambda: SessionManager.save_session(session.session_id, session)
+
+
+@benchmark("session.apply_turn")
+def _():
+    from app.core import sessions
+    sessions.config.MAX_INTERACTIONS = 1 << 30
+    session = _session()
+    sessions.SessionManager.save_session(session.session_id, session)
+    return lambda: sessions.SessionManager.apply_turn(session.session_id, {"tenant_type": "family"}, "en")
+
+
+@benchmark("session.exotel_update_interaction")
+def _():
+    from app.api import routesexotel
+    routesexotel.config.MAX_INTERACTIONS = 1 << 30
+    session = _session()
+    key = f"session:{session.session_id}"
+    routesexotel.redis_manager.redis.set(key, json.dumps(session.model_dump()))
+    return lambda: routesexotel.SessionManager.update_interaction(key, session)
+
+
+@benchmark("rate_limit.allow_call.redis")
+def _():
+    from app.core.rate_limit import allow_call
+    callers = iter(range(10 ** 9))
+    return lambda: allow_call(f"+9197{next(callers):08d}", "")
+
+
+@benchmark("rate_limit.allow_call.denied_locally")
+def _():
+    from app.config import Config
+    from app.core.rate_limit import allow_call
+    for _ in range(Config.RATE_LIMIT_CALLER_CAPACITY + 1):
+        allow_call("+919700000000", "")
+    return lambda: allow_call("+919700000000", "")
+
+
+@benchmark("rate_limit.exotel_token_bucket")
+def _():
+    from app.api import routesexotel
+    return lambda: routesexotel.SessionManager.token_bucket(routesexotel.redis_manager.redis,
+                                                            "+919700000001", 5, 300)
+
+
+@benchmark("render.twiml.listen")
+def _():
+    from app.api.routestwilio import AudioUrlBuilder, TwiMLGenerator
+    audio_url = AudioUrlBuilder.get_slot_audio_url("bhk_type", "en")
+    session_id = str(uuid.uuid4())
+    return lambda: TwiMLGenerator.create_listen_response(audio_url, "https://agent.example.com", session_id)
+
+
+@benchmark("render.twiml.hangup")
+def _():
+    from app.api.routestwilio import AudioUrlBuilder, TwiMLGenerator
+    audio_url = AudioUrlBuilder.get_confirmation_audio_url("hi")
+    return lambda: TwiMLGenerator.create_play_hangup_response(audio_url)
+
+
+@benchmark("render.exoml.record")
+def _():
+    from app.api.routesexotel import AudioUrlBuilder, ExomlGenerator
+    audio_url = AudioUrlBuilder.get_slot_audio_url("bhk_type", "en")
+    session_id = str(uuid.uuid4())
+    return lambda: ExomlGenerator.create_play_record_response(audio_url, "https://agent.example.com", session_id)
+
+
+@benchmark("audio_url.slot")
+def _():
+    from app.api.routestwilio import AudioUrlBuilder
+    return lambda: AudioUrlBuilder.get_slot_audio_url("bhk_type", "te")
+
+
+@benchmark("audio_url.confirmation")
+def _():
+    from app.api.routestwilio import AudioUrlBuilder
+    return lambda: AudioUrlBuilder.get_confirmation_audio_url("ta")
+
+
+@benchmark("slots.next_missing_slot")
+def _():
+    from app.core.services import SlotFillingService
+    filled = _session().slots_filled
+    return lambda: SlotFillingService.next_missing_slot(filled)
+
+
+@benchmark("slots.prompt.compiled")
+def _():
+    from app.config import Config
+    from app.core.prompts import SlotPromptCompiler
+    requested = ["tenant_type", "facing", "floor_pref", "budget"]
+    return lambda: SlotPromptCompiler.system_prompt(requested, Config.PROMPT_MAX_EXAMPLES)
+
+
+@benchmark("slots.prompt.uncached")
+def _():
+    from app.config import Config
+    from app.core.prompts import SlotPromptCompiler
+    requested = ["tenant_type", "facing", "floor_pref", "budget"]
+
+    def run():
+        SlotPromptCompiler._compile.cache_clear()
+        SlotPromptCompiler.system_prompt(requested, Config.PROMPT_MAX_EXAMPLES)
+    return run
+
+
+@benchmark("slots.extract_before_llm")
+def _():
+    from types import SimpleNamespace
+    from app.config import Config
+    from app.core import services
+    reply = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"tenant_name": "Amit"}'))])
+    services.client.chat.completions.create = lambda **kwargs: reply
+    Config.SLOT_CACHE_ENABLED = False
+    return lambda: services.SlotFillingService.extract_slots_with_llm("My name is Amit", {}, "en")
+
+
+def measure(fn, rounds, min_time):
+    """Median, min and max seconds per call over `rounds` calibrated rounds"""
+    fn()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    per_call = [elapsed / number]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - start) / number)
+    return {
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "min_us": round(min(per_call) * 1e6, 3),
+        "max_us": round(max(per_call) * 1e6, 3),
+        "calls_per_round": number,
+    }
+
+
+def git_revision():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=REPO_ROOT, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, cwd=REPO_ROOT).stdout.strip()
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline, threshold):
+    """Print before/after per case; returns the cases that got slower than the threshold"""
+    regressions = []
+    print(f"{'case':40} {'before us':>12} {'after us':>12} {'change':>8}")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:40} {'-':>12} {result['median_us']:12.3f} {'new':>8}")
+            continue
+        change = result["median_us"] / before["median_us"] - 1
+        flag = "  SLOWER" if change > threshold else ""
+        print(f"{name:40} {before['median_us']:12.3f} {result['median_us']:12.3f} {change:+8.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="*", help="glob or substring of case names")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per round")
+    parser.add_argument("--redis-url", help="real Redis instead of the in-process fake")
+    parser.add_argument("--save", help="results file (default benchmarks/results/<git sha>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    # Before anything imports the app: its Redis client connects at import
+    os.environ["REDIS_URL"] = args.redis_url or start_fake_redis()
+    os.environ.setdefault("DEEPGRAM_API_KEY", "bench")
+    os.environ.setdefault("TESTING", "True")
+    os.environ.setdefault("TRACE_EXPORTER", "off")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    pattern = args.filter if any(c in args.filter for c in "*?[") else f"*{args.filter}*"
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+        results[name] = measure(setup(), args.rounds, args.min_time)
+        print(f"{name:40} {results[name]['median_us']:12.3f} us", file=sys.stderr)
+
+    revision = git_revision()
+    report = {
+        "revision": revision,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "redis": "real" if args.redis_url else "fake",
+        "results": results,
+    }
+    path = args.save or os.path.join(RESULTS_DIR, f"{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {path}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("redis") != report["redis"]:
+            print(f"note: baseline used {baseline.get('redis')} Redis, this run {report['redis']}")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()